@@ -1,8 +1,10 @@
-import matplotlib.pyplot as plt
+import numpy as np
 from assembly_construction.component import Component
 
 
 class Bar(Component):
+    convex = True
+
     def __init__(self, x_center, y_center, x_length, y_length, plot_color='k', material=None):
         """
         Bar Constructor
@@ -22,11 +24,32 @@ class Bar(Component):
         self._x_length = x_length
         self._y_length = y_length
 
+    def set_lengths(self, x_length, y_length):
+        """ resizes the bar, use ComponentAssembly.edit_component for bars of an assembly """
+        assert isinstance(x_length, float) or isinstance(x_length, int)
+        assert isinstance(y_length, float) or isinstance(y_length, int)
+        self._x_length = x_length
+        self._y_length = y_length
+
+    def get_bounding_box(self):
+        return (self._x_position - self._x_length / 2, self._x_position + self._x_length / 2,
+                self._y_position - self._y_length / 2, self._y_position + self._y_length / 2)
+
     def is_point_within(self, x, y):
         """ Checks if input position (x,y) is within the rod """
         return abs(x - self._x_position) <= self._x_length / 2 and abs(y - self._y_position) <= self._y_length / 2
 
+    @classmethod
+    def are_points_within(cls, components, component_index, x, y):
+        """ Vectorized is_point_within over bars, see Component.are_points_within """
+        x_position = np.array([bar._x_position for bar in components])[component_index]
+        y_position = np.array([bar._y_position for bar in components])[component_index]
+        x_length = np.array([bar._x_length for bar in components])[component_index]
+        y_length = np.array([bar._y_length for bar in components])[component_index]
+        return np.logical_and(np.abs(x - x_position) <= x_length / 2, np.abs(y - y_position) <= y_length / 2)
+
     def plot(self):
+        import matplotlib.pyplot as plt
         plt.gca().add_patch(
             plt.Rectangle((self._x_position - self._x_length / 2, self._y_position - self._y_length / 2),
                           self._x_length, self._y_length, color=self._plot_color,
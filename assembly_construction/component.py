@@ -1,8 +1,21 @@
+import numpy as np
 from abc import ABC, abstractmethod
 from assembly_construction.material import Material
 
 
 class Component(ABC):
+    # True if the shape is convex, so a rectangle whose corners are within the component lies entirely within it
+    convex = False
+
+    # attributes holding the sources of a component, which the operators of FEM models do not depend on
+    source_attributes = ('_volumetric_power_density', '_volumetric_neutron_source')
+
+    # number of source changes of all components, so loads built from the sources can tell when to rebuild
+    _source_version = 0
+
+    # number of material changes of all components, so material tables and operators can tell when to rebuild
+    _material_version = 0
+
     def __init__(self, x_position, y_position, plot_color, material=None):
         """
         Component Constructor
@@ -41,13 +54,42 @@ class Component(ABC):
     def get_volumetric_neutron_source(self):
         return self._volumetric_neutron_source
 
+    def get_bounding_box(self):
+        """ :return: (x_min, x_max, y_min, y_max) enclosing the component, None if unbounded or unknown """
+        return None
+
+    @staticmethod
+    def get_source_version():
+        """ :return: counter incremented by every source setter of any component """
+        return Component._source_version
+
+    @staticmethod
+    def get_material_version():
+        """ :return: counter incremented by every material change of any component """
+        return Component._material_version
+
     """ Setters """
 
     def set_volumetric_power_density(self, power_density):
         self._volumetric_power_density = power_density
+        Component._source_version += 1
 
     def set_volumetric_neutron_source(self, neutron_source):
         self._volumetric_neutron_source = neutron_source
+        Component._source_version += 1
+
+    def set_position(self, x_position, y_position):
+        """ moves the component, use ComponentAssembly.edit_component for components of an assembly """
+        assert isinstance(x_position, float) or isinstance(x_position, int)
+        assert isinstance(y_position, float) or isinstance(y_position, int)
+        self._x_position = x_position
+        self._y_position = y_position
+
+    def set_material(self, material):
+        """ changes the material, see get_material_version """
+        assert material is None or isinstance(material, Material)
+        self._material = material
+        Component._material_version += 1
 
     """ Abstract Methods """
 
@@ -59,6 +101,23 @@ class Component(ABC):
     def plot(self):
         pass
 
+    """ Vectorized Methods """
+
+    @classmethod
+    def are_points_within(cls, components, component_index, x, y):
+        """
+        Vectorized is_point_within over components of this class
+        :param components: list of components of this class
+        :param component_index: array mapping each position to its component in components
+        :param x: array of x positions
+        :param y: array of y positions
+        :return: boolean array, True where (x[i], y[i]) is within components[component_index[i]]
+        """
+        within = np.zeros(len(component_index), dtype=bool)
+        for i, (j, xi, yi) in enumerate(zip(component_index, x, y)):
+            within[i] = components[j].is_point_within(xi, yi)
+        return within
+
 
 class UnshapedComponent(Component):
     def __init__(self, plot_color=None, material=None):
@@ -67,5 +126,9 @@ class UnshapedComponent(Component):
     def is_point_within(self, x, y):
         return True
 
+    @classmethod
+    def are_points_within(cls, components, component_index, x, y):
+        return np.ones(len(component_index), dtype=bool)
+
     def plot(self):
         pass
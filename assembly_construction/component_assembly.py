@@ -1,43 +1,71 @@
-import matplotlib.pyplot as plt
-from scipy.spatial import KDTree
+import numpy as np
+from inspect import ismethod
+from os import replace
+from weakref import WeakMethod
 from assembly_construction.component import Component
+from assembly_construction.material import Material
+from assembly_construction import serialization
 
 
 class ComponentAssembly(object):
-    def __init__(self, xlim=(-1, 1), ylim=(-1, 1), default_component=None):
+    def __init__(self, xlim=(-1, 1), ylim=(-1, 1), default_component=None, raster_resolution=None):
         """
         ComponentAssembly Constructor
         :param xlim: x limits for pyplot
         :param ylim: y limits for pyplot
+        :param raster_resolution: number of raster cells per axis of the lookup grid of find_components, see
+        set_raster_resolution, no lookup grid if None
         """
         self._xlim = xlim
         self._ylim = ylim
         self._default_component = default_component
 
-        self._component_points = []  # list of all component center points
-        self._point_to_component_hash_map = {}  # hash map mapping component center point to component object
-        self._point_kd_tree = None  # KDTree for efficient find 2D nearest component 
-        self._kd_tree_updated = False  # flag the keeps track of when the KDTree must be updated
+        self._components = []  # list of all components in order of addition, concentric components included
+        self._version = 0  # number of component additions and edits, see get_version
+        self._material_table_cache = None  # material_table() of the (get_version(), material version) pair below
+        self._material_table_version = None
+        self._index = None  # bounding box index of the components, see _update_index
+        self._index_updated = False  # flag that keeps track of when the bounding box index must be rebuilt
+
+        self._raster_resolution = None
+        self._raster = None  # component id of each raster cell, -1 for cells needing exact containment tests
+        self._raster_updated = False  # flag that keeps track of when the raster must be rebuilt
+        self.set_raster_resolution(raster_resolution)
 
         # hash map maps control variable to applicable list of components sets
         self._component_sets = {}
 
+        self._subscribers = []  # references to the callbacks notified of component edits, see subscribe
+
+    def __getstate__(self):
+        """ subscribers are not pickled """
+        state = dict(vars(self))
+        state['_subscribers'] = []
+        return state
+
     def __iter__(self):
-        components = self._point_to_component_hash_map.values()
-        return iter(components)
+        return iter(self._components)
+
+    def get_default_component(self):
+        """ get component of positions not within any added component """
+        return self._default_component
 
     def get_domain_limits(self):
         """ get domain limits """
         return self._xlim[0], self._xlim[1], self._ylim[0], self._ylim[1]
 
+    def get_version(self):
+        """ get number of component additions and edits, see material_table """
+        return self._version
+
     def add_component(self, component, component_set=None):
         """ Adds input component to ComponentAssembly"""
         assert isinstance(component, Component)  # checks input
 
-        point = component.get_position()
-        self._component_points.append(point)
-        self._point_to_component_hash_map[point] = component
-        self._kd_tree_updated = False  # KDTree must be updated upon next nearest component query
+        self._components.append(component)
+        self._version += 1
+        self._index_updated = False  # bounding box index must be rebuilt upon next query
+        self._raster_updated = False  # raster must be rebuilt upon next find_components
 
         # add component to set if applicable
         if component_set is not None:
@@ -45,37 +73,478 @@ class ComponentAssembly(object):
                 self._component_sets[component_set] = []
             self._component_sets[component_set].append(component)
 
+    def subscribe(self, callback):
+        """
+        Registers callback(component, regions) to be called after each edit_component, regions being the bounding boxes
+        (x_min, x_max, y_min, y_max) of the component before and after the edit, outside of which no position changes
+        component, or None if the component has no bounding box. Bound methods are referenced weakly, so subscribed
+        models are garbage collected as usual.
+        """
+        self._subscribers.append(WeakMethod(callback) if ismethod(callback) else lambda: callback)
+
+    def edit_component(self, component, edit):
+        """
+        Applies edit to a component of the assembly, e.g. moving or resizing it, and notifies the subscribers
+        :param component: component of this assembly
+        :param edit: function mutating component, e.g. lambda rod: rod.set_radius(0.2)
+        """
+        assert any(assembly_component is component for assembly_component in self._components), \
+            'component is not in the assembly'
+        old_bounding_box = component.get_bounding_box()
+
+        edit(component)  # the component keeps its position in list(self) and its component id
+
+        self._version += 1
+        self._index_updated = False
+        self._raster_updated = False
+
+        bounding_box = component.get_bounding_box()
+        regions = None if old_bounding_box is None or bounding_box is None else [old_bounding_box, bounding_box]
+        for reference in list(self._subscribers):
+            callback = reference()
+            if callback is None:
+                self._subscribers.remove(reference)
+            else:
+                callback(component, regions)
+
+    def move_component(self, component, x_position, y_position):
+        """ moves a component of the assembly to (x_position, y_position), see edit_component """
+        self.edit_component(component, lambda edited_component: edited_component.set_position(x_position, y_position))
+
+    def set_component_material(self, component, material):
+        """ changes the material of a component of the assembly, see edit_component """
+        self.edit_component(component, lambda edited_component: edited_component.set_material(material))
+
     def find_component(self, x, y):
         """
-        Finds and returns component in fuel assembly corresponding to input (x,y) or returns None if no component
-        corresponds to input (x,y)
+        Finds and returns component in fuel assembly corresponding to input (x,y) or returns the default component if
+        no component corresponds to input (x,y), see find_components
         """
+        if len(self._components) == 0:
+            return self._default_component
+        component_ids, components = self.find_components(np.array([[x, y]], dtype=float))
+        return components[component_ids[0]]
 
-        """ update kd tree if needed """
-        if not self._kd_tree_updated:
-            if len(self._component_points) == 0:
-                return self._default_component
-            self._point_kd_tree = KDTree(self._component_points)
-            self._kd_tree_updated = True  # set flag to denote that tree need not be updated
+    def set_raster_resolution(self, raster_resolution):
+        """
+        Enables the lookup grid of find_components, a raster over the domain limits built on the next query. Positions
+        in raster cells entirely within one component and intersecting no other, or outside the bounding boxes of all
+        components, are classified in O(1). Only positions in the remaining boundary cells go through the bounding box
+        index and exact containment tests.
+        :param raster_resolution: number of raster cells per axis, None to disable the lookup grid
+        """
+        assert raster_resolution is None or (isinstance(raster_resolution, int) and raster_resolution > 0), \
+            'raster_resolution must be None or int > 0'
+        self._raster_resolution = raster_resolution
+        self._raster = None
+        self._raster_updated = False
+
+    def find_components(self, xy):
+        """
+        Vectorized find_component: the bounding box index gives the candidate components of all positions, then one
+        containment test per component class finds the candidates containing each position. Where components overlap,
+        the one with the smallest bounding box wins, e.g. a pin within a duct. With a raster resolution set, positions
+        in raster cells of a single component are looked up instead. Positions are searched in chunks of
+        _query_chunk_size, so memory stays bounded however many positions are classified.
+        :param xy: (n, 2) array of positions
+        :return: array of the component id of each position and the list mapping component id to component, the ids
+        indexing list(self) followed by the default component
+        """
+        components = list(self)
+        default_component_id = len(components)
+        components.append(self._default_component)
 
-        distance, nearest_point_index = self._point_kd_tree.query((x, y))
-        nearest_point = self._component_points[nearest_point_index]
-        nearest_component = self._point_to_component_hash_map[nearest_point]
+        xy = np.asarray(xy, dtype=float)
+        component_ids = np.full(xy.shape[0], default_component_id, dtype=int)
+        if default_component_id == 0 or xy.shape[0] == 0:
+            return component_ids, components
 
-        if nearest_component.is_point_within(x, y):
-            return nearest_component
+        unresolved = np.arange(xy.shape[0])
+        if self._raster_resolution is not None:
+            raster_component_ids = self._raster_lookup(xy, components)
+            resolved = raster_component_ids >= 0
+            component_ids[resolved] = raster_component_ids[resolved]
+            unresolved = np.flatnonzero(~resolved)
+
+        self._update_index(components[:-1])
+
+        # group components by class so each class runs a single vectorized containment test
+        component_classes = {}
+        for component_id, component in enumerate(components[:-1]):
+            component_classes.setdefault(type(component), []).append(component_id)
+        class_indices = {}  # index of each component into the components of its class, -1 for other classes
+        for component_class, class_component_ids in component_classes.items():
+            class_indices[component_class] = np.full(default_component_id, -1, dtype=int)
+            class_indices[component_class][class_component_ids] = np.arange(len(class_component_ids))
+
+        for chunk_start in range(0, unresolved.shape[0], self._query_chunk_size):
+            chunk = unresolved[chunk_start:chunk_start + self._query_chunk_size]
+            points, candidates = self._index_candidates(xy[chunk, :2])
+            points = chunk[points]
+
+            within = np.zeros(points.shape[0], dtype=bool)
+            for component_class, class_component_ids in component_classes.items():
+                class_index = class_indices[component_class]
+                in_class = np.flatnonzero(class_index[candidates] >= 0)
+                within[in_class] = component_class.are_points_within(
+                    [components[component_id] for component_id in class_component_ids],
+                    class_index[candidates[in_class]], xy[points[in_class], 0], xy[points[in_class], 1])
+
+            # the containing candidate of smallest bounding box area, the later added one for equal areas
+            points, candidates = points[within], candidates[within]
+            if np.any(points[1:] == points[:-1]):  # points are sorted, repeated where candidates overlap
+                order = np.lexsort((-candidates, self._index['areas'][candidates], points))
+                points, first = np.unique(points[order], return_index=True)
+                candidates = candidates[order][first]
+            component_ids[points] = candidates
+        return component_ids, components
+
+    # number of bounding boxes above which a cell of the bounding box index is split into quadrants
+    _index_cell_capacity = 8
+
+    # maximum number of times a grid cell of the bounding box index is split
+    _index_max_depth = 16
+
+    # number of positions find_components looks up in the bounding box index at once
+    _query_chunk_size = 65536
+
+    def _update_index(self, components):
+        """
+        Rebuilds the bounding box index of components, list(self), if a component was added or edited since the last
+        query. The index is a uniform grid over the bounding boxes of all components, about one cell per component,
+        whose cells are split into quadrants, quadtree fashion, while they intersect more than _index_cell_capacity
+        bounding boxes and splitting separates them, so clustered components get finer cells. Each leaf cell lists the
+        components whose bounding box intersects it in compressed sparse row form, so a query costs O(1) plus the
+        depth of its cell plus the number of candidates. Components without bounding box are candidates everywhere.
+        """
+        if self._index_updated:
+            return
+
+        boxes = np.array([component.get_bounding_box() or (np.nan,) * 4 for component in components], dtype=float)
+        bounded = ~np.isnan(boxes[:, 0])
+        areas = np.full((len(components),), np.inf)
+        areas[bounded] = (boxes[bounded, 1] - boxes[bounded, 0]) * (boxes[bounded, 3] - boxes[bounded, 2])
+
+        bounded_ids = np.flatnonzero(bounded)
+        n = int(np.clip(np.ceil(np.sqrt(bounded_ids.shape[0])), 1, 1024))  # grid cells per axis
+        if bounded_ids.shape[0] > 0:
+            x0, x1 = boxes[bounded, 0].min(), boxes[bounded, 1].max()
+            y0, y1 = boxes[bounded, 2].min(), boxes[bounded, 3].max()
         else:
-            return self._default_component
+            x0, x1, y0, y1 = 0., 1., 0., 1.
+        hx, hy = max(x1 - x0, 1e-300) / n, max(y1 - y0, 1e-300) / n
+
+        # grid cell ranges [i0, i1) x [j0, j1) of each bounding box, expanded to one entry per (cell, component)
+        i0 = np.clip(np.floor((boxes[bounded_ids, 0] - x0) / hx).astype(int), 0, n - 1)
+        i1 = np.clip(np.floor((boxes[bounded_ids, 1] - x0) / hx).astype(int), 0, n - 1) + 1
+        j0 = np.clip(np.floor((boxes[bounded_ids, 2] - y0) / hy).astype(int), 0, n - 1)
+        j1 = np.clip(np.floor((boxes[bounded_ids, 3] - y0) / hy).astype(int), 0, n - 1) + 1
+        counts = (i1 - i0) * (j1 - j0)
+        entries = np.repeat(np.arange(bounded_ids.shape[0]), counts)
+        offsets = np.arange(entries.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (j0[entries] + offsets // (i1 - i0)[entries]) * n + i0[entries] + offsets % (i1 - i0)[entries]
+        cell_components = bounded_ids[entries]
+
+        # the grid cells are cells 0 to n * n - 1, the quadrants qx + 2 qy of a split cell, qx and qy being 1 above
+        # its midpoint, are the 4 cells from children[cell] on, and leaf cells have no children
+        cell_x0, cell_y0 = x0 + hx * np.tile(np.arange(n), n), y0 + hy * np.repeat(np.arange(n), n)
+        cell_hx, cell_hy = np.full((n * n,), hx), np.full((n * n,), hy)
+        children = np.full((n * n,), -1, dtype=int)
+        new_cells = np.arange(n * n)
+        for depth in range(self._index_max_depth):
+            sizes = np.bincount(cells, minlength=children.shape[0])
+            full = new_cells[sizes[new_cells] > self._index_cell_capacity]
+            if full.shape[0] == 0:
+                break
+
+            # quadrant ranges [qx0, qx1] x [qy0, qy1] of the entries of full cells, expanded to one entry per quadrant
+            full_rank = np.full(children.shape, -1, dtype=int)
+            full_rank[full] = np.arange(full.shape[0])
+            in_full = np.flatnonzero(full_rank[cells] >= 0)
+            parents = cells[in_full]
+            mid_x, mid_y = cell_x0[parents] + cell_hx[parents] / 2, cell_y0[parents] + cell_hy[parents] / 2
+            in_full_boxes = boxes[cell_components[in_full]]
+            qx0, qx1 = (in_full_boxes[:, 0] >= mid_x).astype(int), (in_full_boxes[:, 1] >= mid_x).astype(int)
+            qy0, qy1 = (in_full_boxes[:, 2] >= mid_y).astype(int), (in_full_boxes[:, 3] >= mid_y).astype(int)
+            widths = qx1 - qx0 + 1
+            counts = widths * (qy1 - qy0 + 1)
+            entries = np.repeat(np.arange(in_full.shape[0]), counts)
+            offsets = np.arange(entries.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+            quadrants = qx0[entries] + offsets % widths[entries] + 2 * (qy0[entries] + offsets // widths[entries])
+
+            # cells whose quadrants all get every entry, e.g. of components around the midpoint, are not split
+            entry_ranks = full_rank[parents[entries]]
+            quadrant_sizes = np.bincount(entry_ranks * 4 + quadrants, minlength=4 * full.shape[0]).reshape(-1, 4)
+            separated = quadrant_sizes.min(axis=1) < sizes[full]
+            if not separated.any():
+                break
+            split = full[separated]
+            split_rank = np.cumsum(separated) - 1  # rank of each full cell among the split cells
+
+            new_cells = children.shape[0] + np.arange(4 * split.shape[0])
+            children[split] = new_cells[::4]
+            children = np.concatenate([children, np.full(new_cells.shape, -1, dtype=int)])
+            qx, qy = np.tile([0, 1, 0, 1], split.shape[0]), np.tile([0, 0, 1, 1], split.shape[0])
+            cell_x0 = np.concatenate([cell_x0, np.repeat(cell_x0[split], 4) + qx * np.repeat(cell_hx[split] / 2, 4)])
+            cell_y0 = np.concatenate([cell_y0, np.repeat(cell_y0[split], 4) + qy * np.repeat(cell_hy[split] / 2, 4)])
+            cell_hx = np.concatenate([cell_hx, np.repeat(cell_hx[split] / 2, 4)])
+            cell_hy = np.concatenate([cell_hy, np.repeat(cell_hy[split] / 2, 4)])
+
+            # the entries of split cells move to their quadrants
+            moved = separated[entry_ranks]
+            kept = np.ones(cells.shape, dtype=bool)
+            kept[in_full[separated[full_rank[parents]]]] = False
+            cells = np.concatenate([cells[kept], new_cells[4 * split_rank[entry_ranks[moved]] + quadrants[moved]]])
+            cell_components = np.concatenate([cell_components[kept], cell_components[in_full[entries[moved]]]])
+
+        order = np.argsort(cells, kind='stable')
+        self._index = {'limits': (x0, y0, hx, hy, n), 'boxes': boxes, 'areas': areas, 'children': children,
+                       'cell_mid_x': cell_x0 + cell_hx / 2, 'cell_mid_y': cell_y0 + cell_hy / 2,
+                       'cell_starts': np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=children.shape[0]))]),
+                       'cell_components': cell_components[order],
+                       'unbounded': np.flatnonzero(~bounded)}
+        self._index_updated = True
+
+    def _index_candidates(self, xy):
+        """
+        :param xy: (n, 2) array of positions
+        :return: arrays of (position index, component id) pairs, sorted by position, of the components whose bounding
+        box contains the position and of all components without bounding box
+        """
+        x0, y0, hx, hy, n = self._index['limits']
+        # positions outside the grid fall into the border cells and then fail the bounding box test
+        i = np.clip(np.floor((xy[:, 0] - x0) / hx), 0, n - 1).astype(int)
+        j = np.clip(np.floor((xy[:, 1] - y0) / hy), 0, n - 1).astype(int)
+        cells = j * n + i
+
+        # descend into the quadrant of each position until reaching a leaf cell
+        children, mid_x, mid_y = self._index['children'], self._index['cell_mid_x'], self._index['cell_mid_y']
+        split = np.flatnonzero(children[cells] >= 0)
+        while split.shape[0] > 0:
+            parents = cells[split]
+            cells[split] = children[parents] + (xy[split, 0] >= mid_x[parents]) + 2 * (xy[split, 1] >= mid_y[parents])
+            split = split[children[cells[split]] >= 0]
+
+        starts = self._index['cell_starts'][cells]
+        counts = self._index['cell_starts'][cells + 1] - starts
+        points = np.repeat(np.arange(xy.shape[0]), counts)
+        offsets = np.arange(points.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidates = self._index['cell_components'][np.repeat(starts, counts) + offsets]
+
+        boxes = self._index['boxes'][candidates]
+        in_box = (xy[points, 0] >= boxes[:, 0]) & (xy[points, 0] <= boxes[:, 1]) \
+            & (xy[points, 1] >= boxes[:, 2]) & (xy[points, 1] <= boxes[:, 3])
+        points, candidates = points[in_box], candidates[in_box]
+
+        unbounded = self._index['unbounded']
+        if unbounded.shape[0] > 0:
+            points = np.concatenate([points, np.repeat(np.arange(xy.shape[0]), unbounded.shape[0])])
+            candidates = np.concatenate([candidates, np.tile(unbounded, xy.shape[0])])
+            order = np.argsort(points, kind='stable')
+            points, candidates = points[order], candidates[order]
+        return points, candidates
+
+    def _raster_lookup(self, xy, components):
+        """ :return: component id of the raster cell of each position, -1 for boundary cells and outside the domain """
+        x0, x1, y0, y1 = self.get_domain_limits()
+        n = self._raster_resolution
+        if not self._raster_updated:
+            self._raster = self._build_raster(components, x0, x1, y0, y1, n)
+            self._raster_updated = True
+
+        i = np.floor((xy[:, 0] - x0) / (x1 - x0) * n).astype(int)
+        j = np.floor((xy[:, 1] - y0) / (y1 - y0) * n).astype(int)
+        inside = (i >= 0) & (i < n) & (j >= 0) & (j < n)
+        raster_component_ids = np.full(xy.shape[0], -1, dtype=int)
+        raster_component_ids[inside] = self._raster[j[inside], i[inside]]
+        return raster_component_ids
+
+    @staticmethod
+    def _build_raster(components, x0, x1, y0, y1, n):
+        """
+        :param components: list(self) followed by the default component
+        :return: (n, n) array of the component id of each raster cell, row j and column i spanning
+        [y0 + j hy, y0 + (j + 1) hy] x [x0 + i hx, x0 + (i + 1) hx], -1 for cells needing exact containment tests
+        """
+        hx, hy = (x1 - x0) / n, (y1 - y0) / n
+        default_component_id = len(components) - 1
+        overlaps = np.zeros((n, n), dtype=int)  # number of component bounding boxes intersecting each cell
+        owner = np.full((n, n), default_component_id, dtype=int)
+        for component_id, component in enumerate(components[:-1]):
+            bounding_box = component.get_bounding_box()
+            if bounding_box is None:
+                overlaps += 2  # unknown extent, every cell needs exact tests
+                continue
+            i0, i1 = np.clip(np.floor((np.array(bounding_box[:2]) - x0) / hx).astype(int) + [0, 1], 0, n)
+            j0, j1 = np.clip(np.floor((np.array(bounding_box[2:]) - y0) / hy).astype(int) + [0, 1], 0, n)
+            overlaps[j0:j1, i0:i1] += 1
+            owner[j0:j1, i0:i1] = component_id
+
+        raster = np.where(overlaps == 0, default_component_id, -1)
+
+        # cells intersecting a single bounding box belong to its component if the component is convex and contains the
+        # cell corners, the component classes running one vectorized containment test each
+        j, i = np.nonzero(overlaps == 1)
+        corners_x = x0 + hx * (i[:, np.newaxis] + np.array([0, 1, 0, 1]))
+        corners_y = y0 + hy * (j[:, np.newaxis] + np.array([0, 0, 1, 1]))
+        cell_owner = owner[j, i]
+        component_classes = {}
+        for component_id in np.unique(cell_owner):
+            component_classes.setdefault(type(components[component_id]), []).append(component_id)
+        for component_class, class_component_ids in component_classes.items():
+            if not component_class.convex:
+                continue
+            class_index = np.full(default_component_id, -1, dtype=int)
+            class_index[class_component_ids] = np.arange(len(class_component_ids))
+            cells = np.flatnonzero(class_index[cell_owner] >= 0)
+            within = component_class.are_points_within(
+                [components[component_id] for component_id in class_component_ids],
+                np.repeat(class_index[cell_owner[cells]], 4), corners_x[cells].ravel(), corners_y[cells].ravel())
+            covered = cells[within.reshape(-1, 4).all(axis=1)]
+            raster[j[covered], i[covered]] = cell_owner[covered]
+        return raster
+
+    def material_table(self):
+        """
+        Dense material property table of the components, for gathering coefficients of many positions by fancy
+        indexing, e.g. table[component_material_ids[component_ids]] for the component ids of find_components
+        :return: (number of materials + 1, number of properties) array of the properties of each distinct material in
+        Material.property_names order, NaN for properties that are not set and in the last row, array of the material
+        id of each component of list(self) followed by the default component, -1 selecting the last row for
+        components without material, and the list of the materials, cached until the next component addition, edit or
+        material change
+        """
+        version = self._version, Component.get_material_version()
+        if self._material_table_version != version:
+            self._material_table_cache = self._build_material_table()
+            self._material_table_version = version
+        return self._material_table_cache
+
+    def _build_material_table(self):
+        """ :return: material_table() of the current components """
+        materials, material_ids = [], {}
+        component_material_ids = np.array([-1 if component is None else serialization.material_id(
+            materials, material_ids, component.get_material()) for component in self._components
+            + [self._default_component]], dtype=int)
+        return self._material_table(materials), component_material_ids, materials
+
+    @staticmethod
+    def _material_table(materials):
+        """ :return: property table of materials followed by a row of NaN, see material_table """
+        table = np.full((len(materials) + 1, len(Material.property_names)), np.nan)
+        table[:-1] = serialization.serialize_materials(materials)[1]
+        return table
 
     def get_component_set(self, component_set):
         """ return set of components of component_set """
         return self._component_sets[component_set]
 
+    def get_component_sets(self):
+        """ return hash map of component set name to its list of components """
+        return self._component_sets
+
+    def has_component_set(self, component_set):
+        """ return True if any component was added to component_set """
+        return component_set in self._component_sets
+
+    """ Serialization """
+
+    def serialize(self, sources=True):
+        """
+        Describes the assembly by a JSON serializable header and numpy arrays: the domain, the components as one array
+        per class and attribute, the component sets as component ids and the table of the distinct materials
+        :param sources: if False, the component sources are left out, for content_hash(sources=False) only
+        :return: header, dict of name to array
+        """
+        materials, material_ids = [], {}
+        header = {'format': serialization.FORMAT_VERSION, 'class': serialization.class_path(type(self)),
+                  'xlim': list(self._xlim), 'ylim': list(self._ylim), 'raster_resolution': self._raster_resolution,
+                  'has_default_component': self._default_component is not None}
+        components = list(self)
+        stored_components = self._serialized_components(components)
+        if self._default_component is not None:
+            stored_components = stored_components + [self._default_component]
+        header['components'], arrays = serialization.serialize_components(
+            stored_components, materials, material_ids, exclude=() if sources else Component.source_attributes)
+
+        component_ids = {id(component): component_id for component_id, component in enumerate(components)}
+        names = sorted(self._component_sets)
+        header['component_sets'] = [[name, len(self._component_sets[name])] for name in names]
+        arrays['component_set_ids'] = np.array([component_ids[id(component)] for name in names
+                                                for component in self._component_sets[name]], dtype=int)
+
+        self._serialize_state(header, arrays, materials, material_ids, sources)
+        header['materials'], arrays['material_properties'] = serialization.serialize_materials(materials)
+        return header, arrays
+
+    def _serialized_components(self, components):
+        """ :return: components of list(self) stored by serialize, the others are restored by _deserialize_state """
+        return components
+
+    def _serialize_state(self, header, arrays, materials, material_ids, sources):
+        """
+        adds the state of subclasses to header and arrays, see serialization.material_id for the materials, without
+        the component sources unless sources
+        """
+        pass
+
+    def _deserialize_state(self, header, arrays, materials):
+        """ restores the state of subclasses before the stored components are added """
+        pass
+
+    @staticmethod
+    def deserialize(header, arrays):
+        """ :return: ComponentAssembly, of its original class, described by the header and arrays of serialize """
+        assert header['format'] == serialization.FORMAT_VERSION, 'unknown serialization format'
+        materials = serialization.deserialize_materials(header['materials'], arrays['material_properties'])
+        stored_components = serialization.deserialize_components(header['components'], arrays, materials)
+        default_component = stored_components.pop() if header['has_default_component'] else None
+
+        # subclasses are restored without calling their constructors, e.g. premade assemblies take no arguments
+        cls = serialization.import_class(header['class'])
+        fuel_assembly = cls.__new__(cls)
+        ComponentAssembly.__init__(fuel_assembly, xlim=tuple(header['xlim']), ylim=tuple(header['ylim']),
+                                   default_component=default_component,
+                                   raster_resolution=header['raster_resolution'])
+        fuel_assembly._deserialize_state(header, arrays, materials)
+        for component in stored_components:
+            fuel_assembly.add_component(component)
+
+        components = list(fuel_assembly)
+        component_set_ids = iter(arrays['component_set_ids'].tolist())
+        fuel_assembly._component_sets = {name: [components[next(component_set_ids)] for i in range(count)]
+                                         for name, count in header['component_sets']}
+        return fuel_assembly
+
+    def content_hash(self, sources=True):
+        """
+        :param sources: if False, assemblies differing only in their component sources have the same hash
+        :return: sha256 hex digest of serialize(), equal for equal assemblies across processes and sessions
+        """
+        return serialization.content_hash(*self.serialize(sources))
+
+    def save(self, file):
+        """ writes the assembly to the .npz file, a path or a binary file object, see load """
+        header, arrays = self.serialize()
+        if isinstance(file, str):
+            temporary_path = file + '.tmp.npz'  # write then rename so readers never see partial files
+            serialization.write(temporary_path, header, arrays)
+            replace(temporary_path, file)
+        else:
+            serialization.write(file, header, arrays)
+
+    @staticmethod
+    def load(file):
+        """ :return: ComponentAssembly written by save to the .npz file, a path or a binary file object """
+        return ComponentAssembly.deserialize(*serialization.read(file))
+
     def plot(self):
         """
         plot fuel assembly with pyplot
         """
-        for component in self._point_to_component_hash_map.values():
+        import matplotlib.pyplot as plt
+
+        for component in self._components:
             component.plot()
 
         plt.xlim(self._xlim)
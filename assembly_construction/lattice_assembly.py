@@ -0,0 +1,328 @@
+import numpy as np
+from assembly_construction.component_assembly import ComponentAssembly
+from assembly_construction.component import Component
+from assembly_construction import serialization
+from assembly_construction.rod import Rod
+
+
+class LatticeAssembly(ComponentAssembly):
+    def __init__(self, pitch, layout, radii, materials, component_sets=None, plot_colors=None, center=(0, 0),
+                 default_component=None, xlim=None, ylim=None, raster_resolution=None):
+        """
+        LatticeAssembly Constructor
+        Square lattice of cylindrical pins, e.g. the 17 by 17 pin grid of a fuel assembly or the pin grid of several
+        assemblies, np.block or np.tile of their layouts. Pins are stored as arrays of centers, radii, material ids and
+        pin types, a pin in lattice cell (row, column) being found by index arithmetic instead of a bounding box index
+        query, and exposed as LatticePin components reading and writing these arrays.
+        :param pitch: distance between the centers of neighbouring pins
+        :param layout: (rows, columns) int array of the pin type of each lattice cell, -1 for cells without a pin,
+        row 0 being the top row as printed
+        :param radii: pin radius of each pin type, at most pitch / 2 so pins stay within their lattice cell, or a
+        number for every pin type
+        :param materials: Material of each pin type
+        :param component_sets: component set name of each pin type, None for pins in no component set
+        :param plot_colors: pyplot color of each pin type, 'k' if None
+        :param center: (x, y) center of the lattice
+        :param default_component: component of positions not within any pin
+        :param xlim: x limits of the domain, the lattice extent if None
+        :param ylim: y limits of the domain, the lattice extent if None
+        :param raster_resolution: see ComponentAssembly, only used for components added besides the lattice
+        """
+        layout = np.asarray(layout)
+        n_types = len(materials)
+        radii = np.full((n_types,), radii, dtype=float) if np.isscalar(radii) else np.asarray(radii, dtype=float)
+        component_sets = [None] * n_types if component_sets is None else component_sets
+        plot_colors = ['k'] * n_types if plot_colors is None else plot_colors
+
+        """ Check Constructor Inputs """
+        assert (isinstance(pitch, float) or isinstance(pitch, int)) and pitch > 0, 'pitch must be > 0'
+        assert layout.ndim == 2 and np.issubdtype(layout.dtype, np.integer), 'layout must be a 2D int array'
+        assert np.all((layout >= -1) & (layout < n_types)), 'layout entries must be pin types or -1'
+        assert radii.shape == (n_types,) and len(component_sets) == n_types and len(plot_colors) == n_types, \
+            'radii, component_sets and plot_colors must have one entry per pin type'
+        assert np.all((radii > 0) & (radii <= pitch / 2)), 'pin radii must be in (0, pitch / 2]'
+
+        rows, columns = layout.shape
+        x0 = center[0] - columns * pitch / 2
+        y1 = center[1] + rows * pitch / 2
+        super().__init__(xlim=(x0, x0 + columns * pitch) if xlim is None else xlim,
+                         ylim=(y1 - rows * pitch, y1) if ylim is None else ylim,
+                         default_component=default_component, raster_resolution=raster_resolution)
+
+        self._pitch = pitch
+        self._lattice_origin = (x0, y1)  # top left corner of lattice cell (0, 0)
+        self._layout = layout
+        self._materials = list(materials)
+        self._plot_colors = list(plot_colors)
+
+        """ Struct of arrays of the pins, in row major order of the layout """
+        row, column = np.nonzero(layout >= 0)
+        self._pin_types = layout[row, column]
+        self._cell_centers = np.column_stack([x0 + (column + 0.5) * pitch, y1 - (row + 0.5) * pitch])
+        self._centers = self._cell_centers.copy()
+        self._radii = radii[self._pin_types]
+        self._material_ids = self._pin_types.copy()
+        self._volumetric_power_densities = np.zeros((len(row),))
+        self._volumetric_neutron_sources = np.zeros((len(row),))
+
+        # pin index of each lattice cell, -1 for cells without a pin
+        self._cell_to_pin = np.full(layout.shape, -1, dtype=int)
+        self._cell_to_pin[row, column] = np.arange(len(row))
+
+        self._pins = [LatticePin(self, index) for index in range(len(row))]
+        for pin in self._pins:
+            self.add_component(pin, component_set=component_sets[self._pin_types[pin._index]])
+
+    """ Getters """
+
+    def get_pitch(self):
+        return self._pitch
+
+    def get_layout(self):
+        return self._layout
+
+    def get_pins(self):
+        """ :return: list of the LatticePin of each pin, the pin index being its position in list(self) """
+        return self._pins
+
+    def get_pin(self, row, column):
+        """ :return: LatticePin of lattice cell (row, column), None if the cell has no pin """
+        index = self._cell_to_pin[row, column]
+        return None if index < 0 else self._pins[index]
+
+    def get_pin_centers(self):
+        """ :return: (number of pins, 2) array of the pin centers """
+        return self._centers
+
+    def get_pin_radii(self):
+        return self._radii
+
+    def get_pin_material_ids(self):
+        """ :return: array of the index of the material of each pin into get_materials() """
+        return self._material_ids
+
+    def get_materials(self):
+        return self._materials
+
+    """ Setters """
+
+    def set_volumetric_power_densities(self, power_densities, pins=None):
+        """ sets the volumetric power density of pins, all pins if None, to the number or array power_densities """
+        self._volumetric_power_densities[slice(None) if pins is None else self.pin_indices(pins)] = power_densities
+        Component._source_version += 1
+
+    def set_volumetric_neutron_sources(self, neutron_sources, pins=None):
+        """ sets the volumetric neutron source of pins, all pins if None, to the number or array neutron_sources """
+        self._volumetric_neutron_sources[slice(None) if pins is None else self.pin_indices(pins)] = neutron_sources
+        Component._source_version += 1
+
+    def pin_indices(self, pins):
+        """ :return: array of the pin index of each LatticePin in pins, e.g. of a component set """
+        return np.array([pin._index for pin in pins], dtype=int)
+
+    def material_id(self, material):
+        """ :return: index of material into get_materials(), appending it if it is new """
+        for material_id, lattice_material in enumerate(self._materials):
+            if lattice_material is material:
+                return material_id
+        self._materials.append(material)
+        return len(self._materials) - 1
+
+    def _build_material_table(self):
+        """ See ComponentAssembly, the material ids of the pins are taken from the lattice arrays """
+        materials, material_ids = [], {}
+        lattice_material_ids = np.array([serialization.material_id(materials, material_ids, material)
+                                         for material in self._materials], dtype=int)
+        other_material_ids = [-1 if component is None else serialization.material_id(
+            materials, material_ids, component.get_material())
+            for component in self._components[len(self._pins):] + [self._default_component]]
+        component_material_ids = np.concatenate([lattice_material_ids[self._material_ids],
+                                                 np.array(other_material_ids, dtype=int)])
+        return self._material_table(materials), component_material_ids, materials
+
+    """ Serialization """
+
+    def _serialized_components(self, components):
+        """ pins are stored as the lattice arrays, see ComponentAssembly.serialize """
+        return components[len(self._pins):]
+
+    def _serialize_state(self, header, arrays, materials, material_ids, sources):
+        header['lattice'] = {'pitch': self._pitch, 'lattice_origin': list(self._lattice_origin),
+                             'plot_colors': self._plot_colors}
+        arrays['lattice_materials'] = np.array([serialization.material_id(materials, material_ids, material)
+                                                   for material in self._materials], dtype=int)
+        names = ['layout', 'pin_types', 'cell_centers', 'centers', 'radii', 'material_ids', 'cell_to_pin']
+        if sources:
+            names += ['volumetric_power_densities', 'volumetric_neutron_sources']
+        for name in names:
+            arrays['lattice_' + name] = getattr(self, '_' + name)
+
+    def _deserialize_state(self, header, arrays, materials):
+        self._pitch = header['lattice']['pitch']
+        self._lattice_origin = tuple(header['lattice']['lattice_origin'])
+        self._plot_colors = header['lattice']['plot_colors']
+        self._materials = [materials[material_id] for material_id in arrays['lattice_materials']]
+        for name in ['layout', 'pin_types', 'cell_centers', 'centers', 'radii', 'material_ids',
+                     'volumetric_power_densities', 'volumetric_neutron_sources', 'cell_to_pin']:
+            setattr(self, '_' + name, arrays['lattice_' + name])
+
+        self._pins = [LatticePin(self, index) for index in range(len(self._pin_types))]
+        for pin in self._pins:
+            self.add_component(pin)
+
+    """ Search """
+
+    def lattice_cells(self, xy):
+        """ :return: arrays of the row and column of the lattice cell of each position, -1 outside the lattice """
+        x0, y1 = self._lattice_origin
+        row = np.floor((y1 - xy[:, 1]) / self._pitch).astype(int)
+        column = np.floor((xy[:, 0] - x0) / self._pitch).astype(int)
+        outside = (row < 0) | (row >= self._layout.shape[0]) | (column < 0) | (column >= self._layout.shape[1])
+        row[outside] = -1
+        column[outside] = -1
+        return row, column
+
+    def find_pins(self, xy):
+        """
+        :param xy: (n, 2) array of positions
+        :return: array of the index of the pin enclosing each position, -1 for positions within no pin
+        """
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        row, column = self.lattice_cells(xy)
+        pins = np.where(row >= 0, self._cell_to_pin[row, column], -1)
+        candidates = np.flatnonzero(pins >= 0)
+        distances = xy[candidates] - self._centers[pins[candidates]]
+        outside = np.einsum('ij,ij->i', distances, distances) > self._radii[pins[candidates]] ** 2
+        pins[candidates[outside]] = -1
+        return pins
+
+    def find_component(self, x, y):
+        """ See ComponentAssembly, a pin is found from its lattice cell """
+        if len(self._components) > len(self._pins):  # components added besides the lattice
+            return super().find_component(x, y)
+        pin = self.find_pins(np.array([[x, y]]))[0]
+        return self._default_component if pin < 0 else self._pins[pin]
+
+    def find_components(self, xy):
+        """
+        See ComponentAssembly. Pins are found from their lattice cell, the pin ids being the pin indices, so only
+        positions within no pin are searched among components added besides the lattice.
+        """
+        xy = np.asarray(xy)
+        if len(self._components) > len(self._pins):
+            component_ids, components = super().find_components(xy)
+        else:
+            components = list(self) + [self._default_component]
+            component_ids = np.full(xy.shape[0], len(components) - 1, dtype=int)
+        if xy.shape[0] == 0:
+            return component_ids, components
+
+        pins = self.find_pins(xy[:, :2])
+        in_pin = pins >= 0
+        component_ids[in_pin] = pins[in_pin]
+        return component_ids, components
+
+    def edit_component(self, component, edit):
+        """
+        See ComponentAssembly, a pin must stay within its lattice cell. The edit of a pin is applied to a detached Rod
+        copy of it, and only written into the lattice arrays if the copy stays within the lattice cell.
+        """
+        def lattice_edit(edited_component):
+            if not (isinstance(edited_component, LatticePin) and edited_component._lattice is self):
+                edit(edited_component)
+                return
+            rod = Rod(*edited_component.get_position(), edited_component._radius,
+                      plot_color=edited_component._plot_color, material=edited_component._material)
+            rod._volumetric_power_density = edited_component._volumetric_power_density
+            rod._volumetric_neutron_source = edited_component._volumetric_neutron_source
+            edit(rod)
+            assert np.all(np.abs(np.array(rod.get_position()) - self._cell_centers[edited_component._index])
+                          + rod._radius <= self._pitch / 2 + 1e-12), 'a pin must stay within its lattice cell'
+            for name in LatticePin.lattice_attributes + ('_plot_color',):
+                setattr(edited_component, name, getattr(rod, name))
+
+        super().edit_component(component, lattice_edit)
+
+
+class LatticePin(Rod):
+    # attributes of the pin stored in the arrays of its lattice
+    lattice_attributes = ('_x_position', '_y_position', '_radius', '_material', '_volumetric_power_density',
+                          '_volumetric_neutron_source')
+
+    def __init__(self, lattice, index):
+        """
+        LatticePin Constructor
+        Rod view of pin index of a LatticeAssembly, its position, radius, material and sources being stored in the
+        arrays of the lattice
+        :param lattice: LatticeAssembly of the pin
+        :param index: pin index into the lattice arrays
+        """
+        # no Rod constructor, the position, radius, material and sources are already in the lattice arrays
+        self._lattice = lattice
+        self._index = index
+        self._plot_color = lattice._plot_colors[lattice._pin_types[index]]
+
+    def get_pin_type(self):
+        return int(self._lattice._pin_types[self._index])
+
+    """ Attributes stored in the lattice arrays """
+
+    @property
+    def _x_position(self):
+        return float(self._lattice._centers[self._index, 0])
+
+    @_x_position.setter
+    def _x_position(self, x_position):
+        self._lattice._centers[self._index, 0] = x_position
+
+    @property
+    def _y_position(self):
+        return float(self._lattice._centers[self._index, 1])
+
+    @_y_position.setter
+    def _y_position(self, y_position):
+        self._lattice._centers[self._index, 1] = y_position
+
+    @property
+    def _radius(self):
+        return float(self._lattice._radii[self._index])
+
+    @_radius.setter
+    def _radius(self, radius):
+        self._lattice._radii[self._index] = radius
+
+    @property
+    def _material(self):
+        return self._lattice._materials[self._lattice._material_ids[self._index]]
+
+    @_material.setter
+    def _material(self, material):
+        self._lattice._material_ids[self._index] = self._lattice.material_id(material)
+
+    @property
+    def _volumetric_power_density(self):
+        return float(self._lattice._volumetric_power_densities[self._index])
+
+    @_volumetric_power_density.setter
+    def _volumetric_power_density(self, power_density):
+        self._lattice._volumetric_power_densities[self._index] = power_density
+
+    @property
+    def _volumetric_neutron_source(self):
+        return float(self._lattice._volumetric_neutron_sources[self._index])
+
+    @_volumetric_neutron_source.setter
+    def _volumetric_neutron_source(self, neutron_source):
+        self._lattice._volumetric_neutron_sources[self._index] = neutron_source
+
+    """ Vectorized Methods """
+
+    @classmethod
+    def are_points_within(cls, components, component_index, x, y):
+        """ Vectorized is_point_within over pins, read from the arrays of their lattices """
+        lattices = {id(pin._lattice): pin._lattice for pin in components}
+        if len(lattices) > 1:
+            return super().are_points_within(components, component_index, x, y)
+        lattice = components[0]._lattice
+        pins = np.array([pin._index for pin in components], dtype=int)[component_index]
+        return (x - lattice._centers[pins, 0]) ** 2 + (y - lattice._centers[pins, 1]) ** 2 <= lattice._radii[pins] ** 2
@@ -1,4 +1,8 @@
 class Material(object):
+    # names of the properties in constructor and get_properties order, the columns of material property tables
+    property_names = ('thermal_conductivity', 'density', 'specific_heat_capacity', 'diffusion_length',
+                      'absorption_macroscopic_cross_section', 'fission_macroscopic_cross_section')
+
     def __init__(self,
                  thermal_conductivity=None,
                  density=None,
@@ -43,6 +47,15 @@ class Material(object):
     def get_fission_macroscopic_cross_section(self):
         return self._fission_macroscopic_cross_section
 
+    def get_properties(self):
+        """ returns tuple of all material properties in constructor order """
+        return (self._thermal_conductivity,
+                self._density,
+                self._specific_heat_capacity,
+                self._diffusion_length,
+                self._absorption_macroscopic_cross_section,
+                self._fission_macroscopic_cross_section)
+
 
 class UO2(Material):
     def __init__(self):
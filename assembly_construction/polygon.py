@@ -0,0 +1,103 @@
+import numpy as np
+from assembly_construction.component import Component
+
+
+class Polygon(Component):
+    def __init__(self, x_center, y_center, vertices, plot_color='k', material=None):
+        """
+        Polygon Constructor
+        :param x_center: x position of Component
+        :param y_center: y position of Component
+        :param vertices: (number of vertices, 2) array of the vertex positions relative to the center, in order around
+        the polygon, which may be non-convex but must not intersect itself
+        :param plot_color: applicable plotting color
+        :param material: material of component
+        """
+        super().__init__(x_center, y_center, plot_color, material=material)
+
+        vertices = np.array(vertices, dtype=float)
+
+        """ Check Constructor Inputs """
+        assert vertices.ndim == 2 and vertices.shape[0] >= 3 and vertices.shape[1] == 2, \
+            'vertices must be a (number of vertices >= 3, 2) array'
+
+        self._vertices = vertices
+
+    def get_vertices(self):
+        """ :return: (number of vertices, 2) array of the absolute vertex positions """
+        return self._vertices + np.array([self._x_position, self._y_position])
+
+    def get_bounding_box(self):
+        vertices = self.get_vertices()
+        return vertices[:, 0].min(), vertices[:, 0].max(), vertices[:, 1].min(), vertices[:, 1].max()
+
+    def is_point_within(self, x, y):
+        """ Checks if input position (x,y) is within the polygon """
+        return bool(type(self).are_points_within([self], np.zeros(1, dtype=int), np.array([x]), np.array([y]))[0])
+
+    @classmethod
+    def are_points_within(cls, components, component_index, x, y):
+        """
+        Vectorized is_point_within over polygons, see Component.are_points_within. Counts the polygon edges crossed by
+        the ray from each position in +x direction, the vertex lists being padded to equal length by repeating the
+        last vertex, which adds edges of zero length that are never crossed.
+        """
+        n_vertices = max(polygon._vertices.shape[0] for polygon in components)
+        vertices = np.empty((len(components), n_vertices, 2))
+        for i, polygon in enumerate(components):
+            vertices[i, :polygon._vertices.shape[0]] = polygon.get_vertices()
+            vertices[i, polygon._vertices.shape[0]:] = vertices[i, polygon._vertices.shape[0] - 1]
+        start = vertices[component_index]
+        end = np.roll(start, -1, axis=1)
+
+        x = np.asarray(x, dtype=float)[:, np.newaxis]
+        y = np.asarray(y, dtype=float)[:, np.newaxis]
+        straddles = (start[:, :, 1] > y) != (end[:, :, 1] > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_crossing = start[:, :, 0] + (y - start[:, :, 1]) * (end[:, :, 0] - start[:, :, 0]) \
+                / (end[:, :, 1] - start[:, :, 1])
+        return np.count_nonzero(straddles & (x < x_crossing), axis=1) % 2 == 1
+
+    def plot(self):
+        import matplotlib.pyplot as plt
+        plt.gca().add_patch(plt.Polygon(self.get_vertices(), closed=True, color=self._plot_color, alpha=0.5))
+
+
+class Hexagon(Polygon):
+    convex = True
+
+    def __init__(self, x_center, y_center, flat_to_flat, orientation='flat', plot_color='k', material=None):
+        """
+        Hexagon Constructor, e.g. a hexagonal pin or the duct of a VVER-style assembly
+        :param x_center: x position of Component
+        :param y_center: y position of Component
+        :param flat_to_flat: distance between opposite sides
+        :param orientation: 'flat' for a side at the top, 'pointy' for a vertex at the top
+        :param plot_color: applicable plotting color
+        :param material: material of component
+        """
+
+        """ Check Constructor Inputs """
+        assert isinstance(flat_to_flat, float) or isinstance(flat_to_flat, int)
+        assert orientation in ['flat', 'pointy'], "orientation must be 'flat' or 'pointy'"
+
+        self._flat_to_flat = flat_to_flat
+        self._orientation = orientation
+        angles = np.pi / 3 * np.arange(6) + (0 if orientation == 'flat' else np.pi / 6)
+        circumradius = flat_to_flat / np.sqrt(3)
+        super().__init__(x_center, y_center, circumradius * np.column_stack([np.cos(angles), np.sin(angles)]),
+                         plot_color=plot_color, material=material)
+
+    @classmethod
+    def are_points_within(cls, components, component_index, x, y):
+        """
+        Vectorized is_point_within over hexagons, see Component.are_points_within. A position is within a hexagon if
+        its distance from the center along each of the three side normals is at most half the flat to flat distance.
+        """
+        x_position = np.array([hexagon._x_position for hexagon in components], dtype=float)[component_index]
+        y_position = np.array([hexagon._y_position for hexagon in components], dtype=float)[component_index]
+        apothem = np.array([hexagon._flat_to_flat / 2 for hexagon in components], dtype=float)[component_index]
+        normal_angle = np.array([np.pi / 6 if hexagon._orientation == 'flat' else 0. for hexagon in components])
+        angles = normal_angle[component_index, np.newaxis] + np.pi / 3 * np.arange(3)
+        distances = (x - x_position)[:, np.newaxis] * np.cos(angles) + (y - y_position)[:, np.newaxis] * np.sin(angles)
+        return np.all(np.abs(distances) <= apothem[:, np.newaxis] * (1 + 1e-12), axis=1)
@@ -1,10 +1,10 @@
 import numpy as np
-import matplotlib.pyplot as plt
 from assembly_construction.component_assembly import ComponentAssembly
 from assembly_construction.component import UnshapedComponent
 from assembly_construction.rod import Rod
 from assembly_construction.bar import SquareBar
-from assembly_construction.material import Material
+from assembly_construction.material import Material, UO2, H20_500K, HighBoronSteel
+from assembly_construction.lattice_assembly import LatticeAssembly
 
 
 class ComponentAssemblyA(ComponentAssembly):
@@ -149,7 +149,28 @@ class ComponentAssemblyC(ComponentAssembly):
         for rod in control_rods:
             self.add_component(rod, component_set='control_rods')
 
+
+class ComponentAssemblyD(LatticeAssembly):
+
+    def __init__(self, pitch=2 / 17):
+        """ creates 17 by 17 pin lattice of 264 fuel rods, 24 control rod guide tubes and a central instrument tube """
+        # 0 fuel rod, 1 control rod, 2 instrument tube
+        layout = np.zeros((17, 17), dtype=int)
+        guide_tubes = [(2, 5), (2, 8), (2, 11), (3, 3), (3, 13), (5, 2), (5, 5), (5, 8), (5, 11), (5, 14), (8, 2),
+                       (8, 5), (8, 11), (8, 14), (11, 2), (11, 5), (11, 8), (11, 11), (11, 14), (13, 3), (13, 13),
+                       (14, 5), (14, 8), (14, 11)]
+        layout[tuple(np.transpose(guide_tubes))] = 1
+        layout[8, 8] = 2
+
+        super().__init__(pitch, layout, [0.38 * pitch, 0.45 * pitch, 0.45 * pitch],
+                         [UO2(), HighBoronSteel(), H20_500K()],
+                         component_sets=['fuel_rods', 'control_rods', None], plot_colors=['r', 'g', 'b'],
+                         default_component=UnshapedComponent(material=H20_500K(), plot_color='k'))
+
+
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     fa_A = ComponentAssemblyA()
     fa_A.plot()
     plt.savefig('Fuel_Assembly_A.png')
@@ -167,3 +188,9 @@ if __name__ == '__main__':
     plt.savefig('Fuel_Assembly_C.png')
 
     plt.clf()
+
+    fa_D = ComponentAssemblyD()
+    fa_D.plot()
+    plt.savefig('Fuel_Assembly_D.png')
+
+    plt.clf()
@@ -1,9 +1,10 @@
-import matplotlib.pyplot as plt
+import numpy as np
 from assembly_construction.component import Component
 from assembly_construction.material import UO2, HighBoronSteel, H20_500K
 
 
 class Rod(Component):
+    convex = True
 
     def __init__(self, x_center, y_center, radius, plot_color='k', material=None):
         """
@@ -21,12 +22,30 @@ class Rod(Component):
 
         self._radius = radius
 
+    def set_radius(self, radius):
+        """ resizes the rod, use ComponentAssembly.edit_component for rods of an assembly """
+        assert isinstance(radius, float) or isinstance(radius, int)
+        self._radius = radius
+
+    def get_bounding_box(self):
+        return (self._x_position - self._radius, self._x_position + self._radius,
+                self._y_position - self._radius, self._y_position + self._radius)
+
     def is_point_within(self, x, y):
         """ Checks if input position (x,y) is within the rod """
         return (x - self._x_position) ** 2 + (y - self._y_position) ** 2 <= self._radius ** 2
 
+    @classmethod
+    def are_points_within(cls, components, component_index, x, y):
+        """ Vectorized is_point_within over rods, see Component.are_points_within """
+        x_position = np.array([rod._x_position for rod in components])[component_index]
+        y_position = np.array([rod._y_position for rod in components])[component_index]
+        radius = np.array([rod._radius for rod in components])[component_index]
+        return (x - x_position) ** 2 + (y - y_position) ** 2 <= radius ** 2
+
     def plot(self):
         """ plots a circle patch of the rod on current axis """
+        import matplotlib.pyplot as plt
         plt.gca().add_patch(
             plt.Circle((self._x_position, self._y_position), self._radius, color=self._plot_color, alpha=0.5))
 
@@ -43,4 +62,4 @@ class FuelRod(Rod):
 
 class CoolingPipe(Rod):
     def __init__(self, x_center, y_center, radius):
-        super().__init__(x_center, y_center, radius, plot_color='b', material=H20_500K)
+        super().__init__(x_center, y_center, radius, plot_color='b', material=H20_500K())
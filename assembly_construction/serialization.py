@@ -0,0 +1,158 @@
+import hashlib
+import json
+import numpy as np
+from importlib import import_module
+from numbers import Number
+from assembly_construction.material import Material
+
+# version of the layout written by ComponentAssembly.save, stored in the header
+FORMAT_VERSION = 1
+
+
+def class_path(cls):
+    """ :return: 'module:qualname' of cls, see import_class """
+    return '{}:{}'.format(cls.__module__, cls.__qualname__)
+
+
+def import_class(path):
+    """ :return: class of the 'module:qualname' path """
+    module, qualname = path.split(':')
+    cls = import_module(module)
+    for name in qualname.split('.'):
+        cls = getattr(cls, name)
+    return cls
+
+
+""" Materials """
+
+
+def material_id(materials, material_ids, material):
+    """
+    :param materials: list of the materials of a table, material appended if new
+    :param material_ids: dict of id(material) to index into materials
+    :return: index of material into materials, -1 for None
+    """
+    if material is None:
+        return -1
+    assert isinstance(material, Material), 'materials must be Material instances, not classes'
+    if id(material) not in material_ids:
+        material_ids[id(material)] = len(materials)
+        materials.append(material)
+    return material_ids[id(material)]
+
+
+def serialize_materials(materials):
+    """ :return: header list of the class of each material and (number of materials, 6) array of their properties """
+    properties = np.array([[np.nan if value is None else value for value in material.get_properties()]
+                           for material in materials], dtype=float).reshape(-1, 6)
+    return [class_path(type(material)) for material in materials], properties
+
+
+def deserialize_materials(classes, properties):
+    """ :return: list of the Materials of serialize_materials, of their original classes """
+    materials = []
+    for path, values in zip(classes, properties.tolist()):
+        cls = import_class(path)
+        material = cls.__new__(cls)  # subclasses such as UO2 fix their properties in a constructor without arguments
+        Material.__init__(material, *[None if np.isnan(value) else value for value in values])
+        materials.append(material)
+    return materials
+
+
+""" Components """
+
+
+def serialize_components(components, materials, material_ids, exclude=()):
+    """
+    Stores components as one column per class and attribute, numbers and materials as arrays, numpy arrays, e.g.
+    polygon vertices, concatenated along their first axis and anything else, e.g. plot colors, as JSON lists
+    :param components: list of components, the order being kept
+    :param materials: material table, see material_id
+    :param material_ids: see material_id
+    :param exclude: names of attributes not stored, e.g. Component.source_attributes
+    :return: header of the component classes and dict of the column arrays
+    """
+    header = {'classes': []}
+    classes = {}
+    class_ids = np.zeros((len(components),), dtype=int)
+    for index, component in enumerate(components):
+        class_ids[index] = classes.setdefault(type(component), len(classes))
+    arrays = {'component_class_ids': class_ids}
+
+    for cls, class_id in classes.items():
+        class_components = [component for component in components if type(component) is cls]
+        attributes = sorted(attribute for attribute in vars(class_components[0]) if attribute not in exclude)
+        assert all(sorted(attribute for attribute in vars(component) if attribute not in exclude) == attributes
+                   for component in class_components), \
+            'components of {} must have the same attributes'.format(cls.__qualname__)
+        class_header = {'class': class_path(cls), 'count': len(class_components), 'numbers': [], 'materials': [],
+                        'arrays': [], 'values': {}}
+        for attribute in attributes:
+            column = [vars(component)[attribute] for component in class_components]
+            name = 'components{}{}'.format(class_id, attribute)
+            if all(isinstance(value, Number) and not isinstance(value, bool) for value in column):
+                class_header['numbers'].append(attribute)
+                arrays[name] = np.array(column, dtype=float)
+            elif all(value is None or isinstance(value, Material) for value in column) and \
+                    any(value is not None for value in column):
+                class_header['materials'].append(attribute)
+                arrays[name] = np.array([material_id(materials, material_ids, value) for value in column], dtype=int)
+            elif all(isinstance(value, np.ndarray) for value in column):
+                class_header['arrays'].append(attribute)
+                arrays[name] = np.concatenate(column)
+                arrays[name + 'lengths'] = np.array([value.shape[0] for value in column], dtype=int)
+            else:
+                class_header['values'][attribute] = column  # must be JSON serializable
+        header['classes'].append(class_header)
+    return header, arrays
+
+
+def deserialize_components(header, arrays, materials):
+    """ :return: list of the components of serialize_components, created without calling their constructors """
+    columns = []
+    for class_id, class_header in enumerate(header['classes']):
+        cls = import_class(class_header['class'])
+        attributes = {attribute: arrays['components{}{}'.format(class_id, attribute)].tolist()
+                      for attribute in class_header['numbers']}
+        for attribute in class_header['materials']:
+            ids = arrays['components{}{}'.format(class_id, attribute)]
+            attributes[attribute] = [None if i < 0 else materials[i] for i in ids]
+        for attribute in class_header.get('arrays', []):
+            name = 'components{}{}'.format(class_id, attribute)
+            attributes[attribute] = np.split(arrays[name], np.cumsum(arrays[name + 'lengths'])[:-1])
+        attributes.update(class_header['values'])
+
+        class_components = []
+        for index in range(class_header['count']):
+            component = cls.__new__(cls)
+            component.__dict__.update({attribute: column[index] for attribute, column in attributes.items()})
+            class_components.append(component)
+        columns.append(iter(class_components))
+
+    return [next(columns[class_id]) for class_id in arrays['component_class_ids'].tolist()]
+
+
+""" Files """
+
+
+def content_hash(header, arrays):
+    """ :return: sha256 hex digest of the canonical JSON of header and the dtype, shape and bytes of each array """
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps(header, sort_keys=True, separators=(',', ':')).encode())
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        hasher.update('{}{}{}'.format(name, array.dtype.str, array.shape).encode())
+        hasher.update(array.tobytes())
+    return hasher.hexdigest()
+
+
+def write(file, header, arrays):
+    """ writes header as JSON and the arrays to the .npz file, a path or a binary file object """
+    np.savez(file, header=np.array(json.dumps(header, sort_keys=True)), **arrays)
+
+
+def read(file):
+    """ :return: header and dict of the arrays of write """
+    with np.load(file, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    return json.loads(str(arrays.pop('header'))), arrays
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from assembly_construction.material import Material
 from assembly_construction.bar import Bar, SquareBar
 
@@ -72,6 +73,17 @@ class TestBar(unittest.TestCase):
         assert not r.is_point_within(-1.5, 3.0)
         assert not r.is_point_within(-1.5, -3)
 
+    def test_are_points_within(self):
+        bars = [Bar(0, 0, 1, 2), SquareBar(1.5, -0.5, 0.5)]
+        x, y = np.meshgrid(np.linspace(-2, 2, 41), np.linspace(-2, 2, 41))
+        x, y = x.ravel(), y.ravel()
+        component_index = np.arange(len(x)) % 2
+
+        within = Bar.are_points_within(bars, component_index, x, y)
+
+        for i in range(len(x)):
+            assert within[i] == bars[component_index[i]].is_point_within(x[i], y[i])
+
 
 if __name__ == '__main__':
     unittest.main()
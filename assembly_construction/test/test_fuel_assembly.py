@@ -1,7 +1,11 @@
 import unittest
+import numpy as np
 from assembly_construction.component_assembly import ComponentAssembly
 from assembly_construction.rod import ControlRod, FuelRod
 from assembly_construction.component import UnshapedComponent
+from assembly_construction.bar import Bar
+from assembly_construction.polygon import Hexagon
+from assembly_construction.material import Material, UO2
 
 
 class TestComponentAssembly(unittest.TestCase):
@@ -103,6 +107,150 @@ class TestComponentAssembly(unittest.TestCase):
         assert fa.find_component(-2, -2) is default_component
         assert fa.find_component(2, -2) is default_component
 
+    def test_find_components(self):
+        fa = ComponentAssembly(default_component=UnshapedComponent())
+        xy = np.random.default_rng(0).uniform(-1.5, 1.5, (500, 2))
+
+        component_ids, components = fa.find_components(xy)
+        assert np.all(component_ids == 0) and components == [fa.get_default_component()]
+
+        fa.add_component(ControlRod(0, 0, 0.5))
+        fa.add_component(FuelRod(1, 1, 0.5))
+        fa.add_component(Bar(-1, -1, 0.8, 0.4))
+        component_ids, components = fa.find_components(xy)
+        assert components == list(fa) + [fa.get_default_component()]
+        assert all(components[component_id] is fa.find_component(x, y)
+                   for component_id, (x, y) in zip(component_ids, xy))
+
+    def test_find_components_mixed_sizes(self):
+        fa = ComponentAssembly()
+        long_bar = Bar(0, 0, 2, 0.2)
+        rod = FuelRod(0.7, 0.3, 0.1)
+        duct = Hexagon(-0.5, 0.5, 0.8)
+        pin = FuelRod(-0.5, 0.5, 0.1)
+        for component in [long_bar, rod, duct, pin]:
+            fa.add_component(component)
+
+        # (0.8, 0) is within the long bar, but nearer to the rod center
+        assert fa.find_component(0.8, 0) is long_bar
+        # the smaller of overlapping components wins
+        assert fa.find_component(-0.5, 0.55) is pin
+        assert fa.find_component(-0.5, 0.75) is duct
+        component_ids, components = fa.find_components(np.array([[0.8, 0], [0.7, 0.3], [0, 0.5], [-0.2, 0.5]]))
+        assert [components[component_id] for component_id in component_ids] == [long_bar, rod, None, duct]
+
+    def test_find_components_clustered(self):
+        rng = np.random.default_rng(2)
+        fa = ComponentAssembly(default_component=UnshapedComponent())
+        for x, y in rng.uniform(-1.5, -0.5, (400, 2)):
+            fa.add_component(FuelRod(x, y, rng.uniform(0.005, 0.03)))
+        # concentric components around one point, and a far outlier stretching the index over a large domain
+        for radius in [0.01, 0.02, 0.04]:
+            fa.add_component(FuelRod(-1, -1, radius))
+        fa.add_component(Hexagon(-1, -1, 0.05))
+        fa.add_component(Bar(99, 99, 0.5, 0.5))
+        fa._query_chunk_size = 97
+        xy = np.concatenate([rng.uniform(-1.5, -0.5, (3000, 2)), rng.uniform(-1.05, -0.95, (500, 2)),
+                             rng.uniform(-2, 100, (500, 2))])
+
+        # brute force: the containing component of smallest bounding box area, the later added one for equal areas
+        def area(component):
+            x0, x1, y0, y1 = component.get_bounding_box()
+            return (x1 - x0) * (y1 - y0)
+        expected = [min([component for component in reversed(list(fa)) if component.is_point_within(x, y)]
+                        or [fa.get_default_component()], key=lambda component: area(component) if component
+                        is not fa.get_default_component() else 0) for x, y in xy]
+
+        component_ids, components = fa.find_components(xy)
+        assert all(components[component_id] is component for component_id, component in zip(component_ids, expected))
+        assert fa._index['children'].shape[0] > fa._index['limits'][4] ** 2  # the cluster cells are split
+
+    def test_raster_lookup(self):
+        fa = ComponentAssembly(default_component=UnshapedComponent(), raster_resolution=16)
+        reference = ComponentAssembly(default_component=fa.get_default_component())
+        for component in [ControlRod(0, 0, 0.5), FuelRod(1, 1, 0.5), Bar(-1, -1, 0.8, 0.4), FuelRod(0.3, 0, 0.3)]:
+            fa.add_component(component)
+            reference.add_component(component)
+        xy = np.random.default_rng(1).uniform(-1.5, 1.5, (2000, 2))
+
+        component_ids, components = fa.find_components(xy)
+        assert np.array_equal(component_ids, reference.find_components(xy)[0])
+        assert (fa._raster >= 0).any() and (fa._raster < 0).any()
+
+        # adding a component invalidates the raster
+        late_rod = FuelRod(-0.6, 0.6, 0.2)
+        fa.add_component(late_rod)
+        component_ids, components = fa.find_components(np.array([[-0.6, 0.6]]))
+        assert components[component_ids[0]] is late_rod
+
+    def test_edit_component(self):
+        fa = ComponentAssembly(default_component=UnshapedComponent(), raster_resolution=16)
+        rod = FuelRod(0, 0, 0.5)
+        bar = Bar(1, 1, 0.8, 0.4)
+        fa.add_component(rod)
+        fa.add_component(bar)
+        assert fa.find_component(0.2, 0) is rod
+
+        notifications = []
+        fa.subscribe(lambda component, regions: notifications.append((component, regions)))
+        fa.move_component(rod, -1, 0)
+        assert fa.find_component(0.2, 0) is fa.get_default_component()
+        assert fa.find_component(-1.2, 0) is rod
+        assert list(fa) == [rod, bar]  # component ids are kept
+        assert notifications == [(rod, [(-0.5, 0.5, -0.5, 0.5), (-1.5, -0.5, -0.5, 0.5)])]
+
+        fa.edit_component(bar, lambda edited_bar: edited_bar.set_lengths(1.6, 0.4))
+        component_ids, components = fa.find_components(np.array([[1.7, 1], [0, 0], [-1.2, 0]]))
+        assert [components[component_id] for component_id in component_ids] == [bar, fa.get_default_component(), rod]
+        assert notifications[-1][0] is bar
+
+    def test_material_table(self):
+        material = Material(thermal_conductivity=2., density=3.)
+        fa = ComponentAssembly(default_component=UnshapedComponent(material=material))
+        fa.add_component(FuelRod(0, 0, 0.5))
+        fa.add_component(Bar(1, 1, 0.5, 0.5, material=material))
+        fa.add_component(Bar(-1, 1, 0.5, 0.5))
+
+        table, component_material_ids, materials = fa.material_table()
+        assert table.shape == (3, len(Material.property_names))
+        assert np.array_equal(component_material_ids, [0, 1, -1, 1])
+        assert np.isnan(table[-1]).all()
+
+        properties = table[component_material_ids]
+        for component, component_properties in zip(list(fa) + [fa.get_default_component()], properties):
+            expected = (None,) * 6 if component.get_material() is None else component.get_material().get_properties()
+            assert all(np.isnan(value) if expected_value is None else value == expected_value
+                       for value, expected_value in zip(component_properties, expected))
+
+        # gathers the properties of many positions at once
+        component_ids, components = fa.find_components(np.array([[0, 0], [1, 1], [0, 0.8]]))
+        density = table[component_material_ids[component_ids], Material.property_names.index('density')]
+        assert np.array_equal(density, [UO2().get_density(), 3., 3.])
+
+        # the table is cached until a component is added or edited
+        version = fa.get_version()
+        assert fa.material_table()[0] is table and fa.get_version() == version
+        fa.set_component_material(list(fa)[2], material)
+        assert fa.get_version() > version
+        table, component_material_ids, materials = fa.material_table()
+        assert np.array_equal(component_material_ids, [0, 1, 1, 1])
+
+        # as is a material set on the component directly
+        list(fa)[0].set_material(material)
+        table, component_material_ids, materials = fa.material_table()
+        assert np.array_equal(component_material_ids, [0, 0, 0, 0])
+
+    def test_component_sets(self):
+        fa = ComponentAssembly()
+        assert not fa.has_component_set('control_rods')
+
+        cr0 = ControlRod(0, 0, 0.5)
+        fa.add_component(cr0, component_set='control_rods')
+        fa.add_component(FuelRod(1, 1, 0.5))
+
+        assert fa.has_component_set('control_rods')
+        assert [cr0] == fa.get_component_set('control_rods')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from assembly_construction.component_assembly import ComponentAssembly
+from assembly_construction.component import UnshapedComponent
+from assembly_construction.lattice_assembly import LatticeAssembly
+from assembly_construction.premade_fuel_assemblies import ComponentAssemblyD
+from assembly_construction.material import UO2, HighBoronSteel
+from assembly_construction.bar import Bar
+
+
+class TestLatticeAssembly(unittest.TestCase):
+    def test_constructor(self):
+        fa = ComponentAssemblyD()
+        assert len(fa.get_pins()) == 17 * 17
+        assert len(fa.get_component_set('fuel_rods')) == 264
+        assert len(fa.get_component_set('control_rods')) == 24
+        assert np.allclose(fa.get_domain_limits(), (-1, 1, -1, 1))
+
+        pin = fa.get_pin(0, 0)
+        assert np.allclose(pin.get_position(), (-16 / 17, 16 / 17))
+        assert isinstance(pin.get_material(), UO2)
+        assert isinstance(fa.get_pin(2, 5).get_material(), HighBoronSteel)
+
+    def test_find_components(self):
+        layout = np.tile([[0, 1, -1], [1, 0, 0]], (4, 5))
+        fa = LatticeAssembly(0.2, layout, [0.08, 0.1], [UO2(), HighBoronSteel()], component_sets=['fuel', 'control'],
+                             default_component=UnshapedComponent(), xlim=(-2, 2), ylim=(-1, 1))
+        fa.add_component(Bar(1.8, 0, 0.2, 1))
+        reference = ComponentAssembly(xlim=(-2, 2), ylim=(-1, 1), default_component=fa.get_default_component())
+        for component in fa:
+            reference.add_component(component)
+
+        xy = np.random.default_rng(0).uniform([-2, -1], [2, 1], (5000, 2))
+        component_ids, components = fa.find_components(xy)
+        reference_ids, reference_components = reference.find_components(xy)
+        assert components == reference_components
+        assert np.array_equal(component_ids, reference_ids)
+        assert all(components[component_id] is fa.find_component(x, y)
+                   for component_id, (x, y) in zip(component_ids[:200], xy[:200]))
+
+    def test_material_table(self):
+        fa = ComponentAssemblyD()
+        fa.add_component(Bar(0.95, 0.95, 0.05, 0.05))
+        table, component_material_ids, materials = fa.material_table()
+        reference_table, reference_ids, reference_materials = ComponentAssembly._build_material_table(fa)
+        assert np.array_equal(table[component_material_ids], reference_table[reference_ids], equal_nan=True)
+        assert len(materials) == 4  # the instrument tube and the default component water are distinct instances
+
+        # setting a pin material rebuilds the cached table
+        pin = fa.get_pin(0, 0)
+        pin.set_material(fa.get_default_component().get_material())
+        table, component_material_ids, materials = fa.material_table()
+        assert materials[component_material_ids[0]] is fa.get_default_component().get_material()
+
+    def test_pin_arrays(self):
+        fa = ComponentAssemblyD()
+        fuel_rods = fa.get_component_set('fuel_rods')
+        fa.set_volumetric_power_densities(1000., pins=fuel_rods)
+        assert fuel_rods[0].get_volumetric_power_density() == 1000.
+        assert fa.get_component_set('control_rods')[0].get_volumetric_power_density() == 0
+
+        pin = fa.get_pin(0, 0)
+        fa.edit_component(pin, lambda edited_pin: edited_pin.set_radius(0.02))
+        assert fa.get_pin_radii()[0] == 0.02
+        x, y = pin.get_position()
+        assert fa.find_component(x + 0.03, y) is fa.get_default_component()
+
+        fa.move_component(pin, x + 0.01, y)
+        assert fa.get_pin_centers()[0, 0] == x + 0.01
+        assert fa.find_component(x + 0.025, y) is pin
+        with self.assertRaises(AssertionError):  # pins stay within their lattice cell
+            fa.move_component(pin, x + 0.05, y)
+        assert fa.find_component(x + 0.025, y) is pin
+
+        # a rejected edit changes nothing of the pin, not only its center and radius
+        material = pin.get_material()
+
+        def edit(edited_pin):
+            edited_pin.set_material(HighBoronSteel())
+            edited_pin.set_volumetric_power_density(5.)
+            edited_pin.set_radius(1.)
+        with self.assertRaises(AssertionError):
+            fa.edit_component(pin, edit)
+        assert pin.get_material() is material and pin.get_volumetric_power_density() == 1000.
+        assert fa.get_pin_radii()[0] == 0.02 and fa.get_pin_centers()[0, 0] == x + 0.01
+
+        fa.edit_component(pin, lambda edited_pin: edited_pin.set_volumetric_neutron_source(3.))
+        assert pin.get_volumetric_neutron_source() == 3. and fa.get_pin_radii()[0] == 0.02
+
+
+if __name__ == '__main__':
+    unittest.main()
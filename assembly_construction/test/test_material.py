@@ -6,6 +6,12 @@ class TestMaterial(unittest.TestCase):
     def test_constructor(self):
         Material()
 
+    def test_get_properties(self):
+        material = Material(thermal_conductivity=1., density=2., specific_heat_capacity=3., diffusion_length=4.,
+                            absorption_macroscopic_cross_section=5., fission_macroscopic_cross_section=0)
+        assert (1., 2., 3., 4., 5., 0) == material.get_properties()
+        assert (None,) * 6 == Material().get_properties()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from assembly_construction.polygon import Polygon, Hexagon
+
+
+class TestPolygon(unittest.TestCase):
+    def test_is_point_within(self):
+        # L shape, non-convex
+        p = Polygon(1, 1, [[0, 0], [2, 0], [2, 1], [1, 1], [1, 2], [0, 2]])
+        assert p.get_bounding_box() == (1, 3, 1, 3)
+
+        assert p.is_point_within(1.5, 1.5)
+        assert p.is_point_within(2.5, 1.5)
+        assert p.is_point_within(1.5, 2.5)
+        assert not p.is_point_within(2.5, 2.5)
+        assert not p.is_point_within(0.5, 1.5)
+        assert not p.is_point_within(1.5, 3.5)
+
+    def test_are_points_within(self):
+        polygons = [Polygon(0, 0, [[-1, -1], [1, -1], [0, 1]]), Hexagon(2, 0, 1), Polygon(0, 2, [[0, 0], [1, 0], [1, 1],
+                                                                                                   [0, 1]])]
+        rng = np.random.default_rng(0)
+        component_index = rng.integers(0, 3, 1000)
+        x, y = rng.uniform(-1, 3, (2, 1000))
+        within = Polygon.are_points_within(polygons, component_index, x, y)
+        assert np.array_equal(within, [polygons[j].is_point_within(xi, yi)
+                                       for j, xi, yi in zip(component_index, x, y)])
+        assert within.any() and not within.all()
+
+
+class TestHexagon(unittest.TestCase):
+    def test_is_point_within(self):
+        flat = Hexagon(0, 0, 2)
+        assert flat.is_point_within(0, 0.99)
+        assert not flat.is_point_within(0, 1.01)
+        assert flat.is_point_within(1.15, 0)  # vertex at 2 / sqrt(3)
+        assert not flat.is_point_within(1.16, 0)
+
+        pointy = Hexagon(0, 0, 2, orientation='pointy')
+        assert pointy.is_point_within(0.99, 0)
+        assert not pointy.is_point_within(1.01, 0)
+        assert pointy.is_point_within(0, 1.15)
+
+    def test_are_points_within(self):
+        hexagons = [Hexagon(0, 0, 2), Hexagon(3, 1, 1, orientation='pointy')]
+        rng = np.random.default_rng(1)
+        component_index = rng.integers(0, 2, 1000)
+        x, y = rng.uniform(-1, 4, (2, 1000))
+        within = Hexagon.are_points_within(hexagons, component_index, x, y)
+        # the crossing number test of the polygon agrees away from the sides
+        assert np.array_equal(within, Polygon.are_points_within(hexagons, component_index, x, y))
+
+
+if __name__ == '__main__':
+    unittest.main()
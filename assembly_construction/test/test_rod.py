@@ -1,6 +1,7 @@
 import unittest
-from assembly_construction.rod import Rod, ControlRod, FuelRod
-from assembly_construction.material import Material, UO2, HighBoronSteel
+import numpy as np
+from assembly_construction.rod import Rod, ControlRod, FuelRod, CoolingPipe
+from assembly_construction.material import Material, UO2, HighBoronSteel, H20_500K
 
 
 class TestRod(unittest.TestCase):
@@ -21,6 +22,9 @@ class TestRod(unittest.TestCase):
         cr = ControlRod(0, 0, 1)
         assert isinstance(cr.get_material(), HighBoronSteel)
 
+        cp = CoolingPipe(0, 0, 1)
+        assert isinstance(cp.get_material(), H20_500K)
+
     def test_is_point_within(self):
         r = Rod(0, 0, 1)
 
@@ -43,6 +47,17 @@ class TestRod(unittest.TestCase):
         assert not r.is_point_within(-1.5, 1.5)
         assert not r.is_point_within(-1.5, -1.5)
 
+    def test_are_points_within(self):
+        rods = [Rod(0, 0, 1), Rod(1.5, -0.5, 0.25)]
+        x, y = np.meshgrid(np.linspace(-2, 2, 41), np.linspace(-2, 2, 41))
+        x, y = x.ravel(), y.ravel()
+        component_index = np.arange(len(x)) % 2
+
+        within = Rod.are_points_within(rods, component_index, x, y)
+
+        for i in range(len(x)):
+            assert within[i] == rods[component_index[i]].is_point_within(x[i], y[i])
+
 
 if __name__ == '__main__':
     unittest.main()
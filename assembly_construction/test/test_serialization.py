@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from io import BytesIO
+from os.path import join
+from tempfile import TemporaryDirectory
+from assembly_construction.component_assembly import ComponentAssembly
+from assembly_construction.component import UnshapedComponent
+from assembly_construction.rod import ControlRod, FuelRod
+from assembly_construction.bar import Bar, SquareBar
+from assembly_construction.polygon import Polygon, Hexagon
+from assembly_construction.material import Material, UO2
+from assembly_construction.premade_fuel_assemblies import ComponentAssemblyA, ComponentAssemblyD
+
+
+def mixed_assembly():
+    fa = ComponentAssembly(xlim=(-2, 2), default_component=UnshapedComponent(material=Material(density=1.)))
+    fa.add_component(FuelRod(0, 0, 0.5), component_set='fuel')
+    fa.add_component(ControlRod(1, 1, 0.3), component_set='control_rods')
+    fa.add_component(Bar(-1, -1, 0.8, 0.4, plot_color='b'))
+    fa.add_component(SquareBar(1, -1, 0.5), component_set='fuel')
+    fa.add_component(Hexagon(-1.5, 0.5, 0.6, orientation='pointy'))
+    fa.add_component(Polygon(1.5, 0, [[0, 0], [0.4, 0], [0, 0.4]]))
+    fa.add_component(Polygon(-0.5, 0.5, [[0, 0], [0.3, 0], [0.3, 0.3], [0, 0.3]]))
+    fa.get_component_set('fuel')[0].set_volumetric_power_density(1000)
+    return fa
+
+
+def round_trip(fa):
+    file = BytesIO()
+    fa.save(file)
+    file.seek(0)
+    return ComponentAssembly.load(file)
+
+
+class TestSerialization(unittest.TestCase):
+    def test_round_trip(self):
+        xy = np.random.uniform(-2, 2, (2000, 2))
+        for fa in [mixed_assembly(), ComponentAssemblyA(), ComponentAssemblyD()]:
+            loaded = round_trip(fa)
+            assert type(loaded) is type(fa)
+            assert loaded.content_hash() == fa.content_hash()
+            assert loaded.get_domain_limits() == fa.get_domain_limits()
+
+            component_ids, components = fa.find_components(xy)
+            loaded_component_ids, loaded_components = loaded.find_components(xy)
+            assert np.array_equal(component_ids, loaded_component_ids)
+            assert [type(component) for component in components] == \
+                [type(component) for component in loaded_components]
+            assert all(component.get_volumetric_power_density() == loaded_component.get_volumetric_power_density()
+                       for component, loaded_component in zip(components, loaded_components))
+            for name, component_list in fa.get_component_sets().items():
+                assert [components.index(component) for component in component_list] == \
+                    [loaded_components.index(component) for component in loaded.get_component_set(name)]
+
+        loaded = round_trip(mixed_assembly())
+        fuel_rod = loaded.get_component_set('fuel')[0]
+        assert isinstance(fuel_rod.get_material(), UO2)
+        assert fuel_rod.get_material().get_properties() == UO2().get_properties()
+        assert loaded.get_default_component().get_material().get_properties()[1] == 1.
+
+    def test_content_hash(self):
+        assert mixed_assembly().content_hash() == mixed_assembly().content_hash()
+        assert ComponentAssemblyD().content_hash() == ComponentAssemblyD().content_hash()
+
+        fa = mixed_assembly()
+        fa.move_component(fa.get_component_set('control_rods')[0], 1, 0.9)
+        assert fa.content_hash() != mixed_assembly().content_hash()
+
+        fa = ComponentAssemblyD()
+        fa.set_volumetric_power_densities(1000., pins=fa.get_component_set('fuel_rods'))
+        assert fa.content_hash() != ComponentAssemblyD().content_hash()
+        assert round_trip(fa).get_component_set('fuel_rods')[0].get_volumetric_power_density() == 1000.
+
+    def test_save_path(self):
+        fa = mixed_assembly()
+        with TemporaryDirectory() as directory:
+            path = join(directory, 'assembly.npz')
+            fa.save(path)
+            assert ComponentAssembly.load(path).content_hash() == fa.content_hash()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Import time benchmark: imports each entry module in a fresh interpreter and reports its wall time, the slowest modules it
+pulled in according to python -X importtime, and any heavy backend loaded at import time.
+
+    python benchmarks/import_time.py [--repeat 5] [--top 5] [--check]
+
+With --check the exit code is 1 if any entry module imports a heavy backend.
+"""
+import argparse
+import subprocess
+import sys
+from os.path import dirname, abspath
+
+ENTRY_MODULES = [
+    'assembly_construction.premade_fuel_assemblies',
+    'modeling.fem_model',
+    'modeling.structured_fem_model',
+    'controllers.dlqr',
+    'controllers.heat_exchanger_mpc_controller',
+    'reduction',
+    'reduction.pod_model_reduction',
+    'reduction.carlberg',
+]
+
+# backends that must only be imported on first use
+HEAVY_BACKENDS = ['fenics', 'dolfin', 'matplotlib', 'cvxpy', 'tensorflow', 'matlab', 'sklearn']
+
+REPOSITORY_DIRECTORY = dirname(dirname(abspath(__file__)))
+
+
+def measure(module):
+    """ :return: wall time of importing module, list of (self + cumulative us, imported module), loaded backends """
+    code = 'import sys, time\n' \
+           't = time.perf_counter()\n' \
+           'import {0}\n' \
+           'print(time.perf_counter() - t)\n' \
+           'print(",".join(m for m in {1!r} if m in sys.modules))'.format(module, HEAVY_BACKENDS)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=REPOSITORY_DIRECTORY,
+                            capture_output=True, text=True, check=True)
+    wall_time, backends = result.stdout.splitlines()
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative_us), name.strip()))
+
+    return float(wall_time), sorted(imports, reverse=True), [backend for backend in backends.split(',') if backend]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='number of fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=5, help='number of slowest imported modules to list')
+    parser.add_argument('--check', action='store_true', help='fail if a heavy backend is imported eagerly')
+    parser.add_argument('modules', nargs='*', default=ENTRY_MODULES)
+    arguments = parser.parse_args()
+
+    eager_backends = False
+    for module in arguments.modules:
+        runs = [measure(module) for _ in range(arguments.repeat)]
+        wall_time = min(run[0] for run in runs)
+        imports, backends = runs[0][1], runs[0][2]
+
+        print('{0:<50} {1:8.1f} ms'.format(module, 1e3 * wall_time))
+        for cumulative_us, name in imports[:arguments.top]:
+            print('    {0:<46} {1:8.1f} ms'.format(name, 1e-3 * cumulative_us))
+        if backends:
+            eager_backends = True
+            print('    eagerly imports ' + ', '.join(backends))
+
+    if arguments.check and eager_backends:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
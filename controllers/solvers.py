@@ -1,5 +1,4 @@
 import numpy as np
-import cvxpy
 from abc import ABC, abstractmethod
 
 
@@ -38,6 +37,8 @@ class Solver(ABC):
             assert type(R) is np.ndarray, 'Q must be a numpy array'
             assert R.shape == (nu, nu), 'R must have shape (nu, nu)'
 
+        import cvxpy  # loaded on first use, it takes seconds to import
+
         # initialize cvxpy problem
         self.X = cvxpy.Variable((nx, N + 1))
         self.U = cvxpy.Variable((nu, N))
@@ -125,6 +126,8 @@ class CFTOCSolver(Solver):
 
         super().__init__(nx, nu, N, x0, xbar, umax=umax, Q=Q, R=R)
 
+        import cvxpy
+
         for t in range(N):
             self.constraints.append(self.X[:, t + 1] == A @ self.X[:, t] + B @ self.U[:, t] + f)
 
@@ -154,6 +157,8 @@ class SoftCFTOCSolver(CFTOCSolver):
 
         super().__init__(A, B, f, x0, xbar, N, Q=Q, R=R)
 
+        import cvxpy
+
         nu = B.shape[1]
 
         if umax is not None:
@@ -0,0 +1,146 @@
+import numpy as np
+from scipy.sparse import bmat, block_diag, csr_matrix
+from modeling.fem_model import FEMModel
+
+
+class ThermalNeutronicFEMModel(object):
+    def __init__(self, fuel_assembly, dt, heat_model_class=None, neutronics_model_class=None,
+                 energy_per_fission=3.204e-11, **kwargs):
+        """
+        ThermalNeutronicFEMModel Constructor
+        Couples a heat exchanger model to a neutronics model of the same fuel assembly, the fission power
+        kappa Sigma_f phi of the neutron flux heating the fuel on top of the component power densities q_dot. The
+        neutronics model shares the mesh, vertex classification, coefficient space and function space of the heat
+        model. Time steps are split, the flux being advanced first and the temperature then with the fission power of
+        the new flux, each model reusing its own cached left-hand side factorization.
+        :param fuel_assembly: fuel assembly design
+        :param dt: model step time
+        :param heat_model_class: class of the heat model, HeatExchangerFEMModel if None
+        :param neutronics_model_class: class of the neutronics model on the backend of the heat model,
+        NuclearReactorNeutronicsFEMModel if None
+        :param energy_per_fission: recoverable energy kappa released per fission [J]
+        :param kwargs: further FEMModel arguments of both models, e.g. nx, ny or time_integration
+        """
+
+        """ Check Constructor Inputs """
+        assert isinstance(energy_per_fission, float) or isinstance(energy_per_fission, int)
+
+        if heat_model_class is None:
+            from modeling.temperature_fem_model import HeatExchangerFEMModel
+            heat_model_class = HeatExchangerFEMModel
+        if neutronics_model_class is None:
+            from modeling.neutron_diffusion_fem_model import NuclearReactorNeutronicsFEMModel
+            neutronics_model_class = NuclearReactorNeutronicsFEMModel
+
+        self._heat_model = heat_model_class(fuel_assembly, dt, **kwargs)
+        kwargs.pop('model_mesh', None)  # taken from the heat model
+        self._neutronics_model = neutronics_model_class(fuel_assembly, dt, shared_model=self._heat_model, **kwargs)
+        self._energy_per_fission = energy_per_fission
+
+        """ Fission power coupling, cached per neutronics lhs_signature() and time integration scheme """
+        self._fission_power_matrix = None
+        self._fission_power_signature = None
+        self._coupling_operators = {}
+        self._flux_history = []  # flux values phi(n-1), phi(n-2), ... for multistep schemes
+
+    """ Getters """
+
+    def get_heat_model(self):
+        return self._heat_model
+
+    def get_neutronics_model(self):
+        return self._neutronics_model
+
+    def get_number_of_states(self):
+        """ :return: size of the coupled state [T; phi] """
+        return self._heat_model.get_number_of_states() + self._neutronics_model.get_number_of_states()
+
+    """ Coupling """
+
+    def fission_power_matrix(self):
+        """
+        :return: sparse kappa times the Sigma_f mass matrix, the block of the heat equation left-hand side coupling
+        it to the new flux in the sign convention of the heat models, where a source q enters the right-hand side as
+        - int q v dx
+        """
+        signature = self._neutronics_model.lhs_signature()
+        if signature != self._fission_power_signature:
+            self._neutronics_model.update_operator_signature()
+            self._fission_power_matrix = self._energy_per_fission * self._neutronics_model.fission_rate_matrix()
+            self._fission_power_signature = signature
+            self._coupling_operators = {}
+        return self._fission_power_matrix
+
+    def coupling_operators(self, scheme):
+        """
+        :param scheme: TimeIntegrationScheme of the step
+        :return: fission power block of the left-hand side of scheme and its right-hand side corrections, such that
+        the split step is the temperature row of the block system of state_space_operators()
+        """
+        C = self.fission_power_matrix()
+        if scheme.signature() not in self._coupling_operators:
+            Z = csr_matrix(C.shape)
+            self._coupling_operators[scheme.signature()] = scheme.lhs(C, Z), scheme.rhs_corrections(C, Z)
+        return self._coupling_operators[scheme.signature()]
+
+    """ Time Stepping """
+
+    def step_time(self):
+        """
+        Advances the flux one step and then the temperature, with the fission power of the old and new flux weighted
+        as the time integration scheme weights sources
+        :return: temperature and neutron flux at step n + 1
+        """
+        scheme = self._heat_model.step_scheme()
+        flux_history = [np.array(self._neutronics_model.get_state_values(self._neutronics_model._PHIn))] \
+            + self._flux_history
+
+        flux = self._neutronics_model.step_time()
+        flux_values = self._neutronics_model.get_state_values(flux)
+
+        coupling_lhs, coupling_corrections = self.coupling_operators(scheme)
+        load = - (coupling_lhs @ flux_values)
+        for correction, past_flux in zip(coupling_corrections, flux_history):
+            load += correction @ past_flux
+        self._heat_model.set_coupling_load(load)
+        temperature = self._heat_model.step_time()
+
+        self._flux_history = flux_history[:self._heat_model._time_integration.history - 1]
+        return temperature, flux
+
+    def set_dt(self, dt):
+        """ sets step time of both models, each refactors on the next step unless dt was used recently """
+        self._heat_model.set_dt(dt)
+        self._neutronics_model.set_dt(dt)
+        self._flux_history = []
+
+    """ State Transition Model """
+
+    def state_space_operators(self):
+        """
+        :return: sparse block M, K and B and f of the backward Euler model of the coupled state [T; phi] and input
+        [u_T; u_phi], the inputs being the actuated sources of the heat and of the neutronics model
+        """
+        M_T, K_T, B_T, f_T = self._heat_model.cached_state_space_operators()
+        M_phi, K_phi, B_phi, f_phi = self._neutronics_model.cached_state_space_operators()
+
+        M = bmat([[M_T, self.fission_power_matrix()], [None, M_phi]], format='csr')
+        K = block_diag([K_T, K_phi], format='csr')
+        B = block_diag([csr_matrix(B_T), csr_matrix(B_phi)], format='csr')
+        f = np.concatenate([f_T, f_phi])
+        return M, K, B, f
+
+    def state_transition_model(self, sparse=False):
+        """
+        Computes the state transition model x(n+1) = A x(n) + B u(n) + f of the coupled state x = [T; phi], augmented
+        with past states for multistep schemes, which is stepped exactly by step_time
+        :param sparse: if True, A and B are LinearOperators backed by a sparse LU factorization, see FEMModel
+        :return: A, B, f
+        """
+        schemes = [self._heat_model._time_integration, self._neutronics_model._time_integration]
+        assert schemes[0].signature() == schemes[1].signature(), 'both models must use the same time integration'
+
+        M, K, B, f = schemes[0].state_space_operators(*self.state_space_operators())
+        if sparse:
+            return FEMModel.factored_state_transition_model(M, K, B, f)
+        return FEMModel.dense_state_transition_model(M, K, B, f)
@@ -10,6 +10,7 @@ if __name__ == "__main__":
 
     dt = 1
     q = NuclearReactorNeutronicsFEMModel(fa, dt, nx=20, ny=20)
+    print('k-effective: {:.5f}'.format(q.k_effective()[0]))
 
     for rod in fa.get_component_set("control_rods"):
         rod.set_volumetric_neutron_source(-9.6075439454e12)  # slightly super or subcritical depending on mesh
@@ -1,65 +1,891 @@
-import matplotlib.pyplot as plt
+import numpy as np
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from scipy.sparse import csr_matrix, coo_matrix, hstack
+from scipy.sparse.linalg import LinearOperator, eigsh, splu
 from assembly_construction.component_assembly import ComponentAssembly
 from assembly_construction.component import Component
-from fenics import *
+from assembly_construction.material import Material
+from modeling.operator_cache import OperatorCache
+from modeling.time_integration import TimeIntegrationScheme, BackwardEuler
 
 
 class FEMModel(ABC):
-    def __init__(self, fuel_assembly, dt, model_mesh=None, nx=10, ny=10):
+    def __init__(self, fuel_assembly, dt, model_mesh=None, nx=10, ny=10, coefficient_space=None, operator_cache=None,
+                 time_integration=None, shared_model=None, mesh_refinement=0):
         """
         FEMModel Constructor
         :param fuel_assembly: fuel assembly design
         :param dt: model step time
         :param model_mesh: input mesh
         :param nx, ny: mesh density parameters if default mesh is to be used
+        :param coefficient_space: None to evaluate coefficients with UserExpression callbacks, 'DG' to precompute them
+        as piecewise constant Functions per cell, or 'P' to precompute them as piecewise linear Functions per vertex
+        :param operator_cache: OperatorCache to load the vertex classification and state transition operators from
+        instead of recomputing them, if given
+        :param time_integration: TimeIntegrationScheme of step_time and state_transition_model, BackwardEuler if None
+        :param shared_model: FEMModel of the same fuel assembly and backend whose mesh, vertex classification,
+        coefficient space and state function space are reused instead of rebuilt, if given
+        :param mesh_refinement: number of times the cells cut by a component boundary are bisected, the mesh staying as
+        coarse as the nx by ny default mesh or model_mesh in homogeneous regions
         """
 
         """ Check Constructor Inputs """
         assert isinstance(fuel_assembly, ComponentAssembly), 'must input fuel_assembly, check that your initialization is has ()'
         assert isinstance(dt, float) or isinstance(dt, int)
-        assert model_mesh is None or isinstance(model_mesh, Mesh)
+        assert model_mesh is None or isinstance(model_mesh, self.mesh_type())
         assert isinstance(nx, int)
         assert isinstance(ny, int)
+        assert coefficient_space in [None, 'DG', 'P'], "coefficient_space must be None, 'DG' or 'P'"
+        assert operator_cache is None or isinstance(operator_cache, OperatorCache)
+        assert time_integration is None or isinstance(time_integration, TimeIntegrationScheme)
+        assert shared_model is None or (isinstance(shared_model, FEMModel) and shared_model._fuel_assembly is
+                                        fuel_assembly), 'shared_model must model the same fuel assembly'
+        assert shared_model is None or (model_mesh is None and isinstance(shared_model._mesh, self.mesh_type())), \
+            'a model sharing the discretization of shared_model takes its mesh'
+        assert shared_model is None or coefficient_space in [None, shared_model._coefficient_space_family], \
+            'a model sharing the discretization of shared_model takes its coefficient space'
+        assert isinstance(mesh_refinement, int) and mesh_refinement >= 0, 'mesh_refinement must be int >= 0'
 
-        # use default mesh if none given
-        if model_mesh is None:
-            x0, x1, y0, y1 = fuel_assembly.get_domain_limits()
-            p0 = Point(x0, y0)
-            p1 = Point(x1, y1)
-            model_mesh = RectangleMesh(p0, p1, nx, ny, diagonal='crossed')
+        if shared_model is not None:
+            model_mesh = shared_model._mesh
+            coefficient_space = shared_model._coefficient_space_family
+            mesh_refinement = 0
 
         self._fuel_assembly = fuel_assembly
         self._dt = dt
-        self._mesh = model_mesh
-        self._component_hash_map = self.ComponentHashMap(fuel_assembly)
+        self._mesh = self.default_mesh(nx, ny) if model_mesh is None else model_mesh  # use default mesh if none given
+        self._component_hash_map = self.ComponentHashMap(fuel_assembly) if shared_model is None \
+            else shared_model._component_hash_map
+        self._coefficient_space_family = coefficient_space
+        self._operator_cache = operator_cache
+        self._shared_model = shared_model
 
-        """ Vertex hash map maps each component to the enclosed vertices in the mesh """
-        self._vertex_hash_map = {}
+        refined_classification = None
+        if mesh_refinement > 0:
+            self._mesh, refined_classification = self.refine_at_component_boundaries(self._mesh, mesh_refinement)
+
+        """ Vertex hash map maps each component to the array of enclosed vertex indices in the mesh """
         self._number_of_vertices = self._mesh.coordinates().shape[0]
-        for vertex_index, vertex in zip(range(self._number_of_vertices), self._mesh.coordinates()):
-            component = self._component_hash_map.find_component(tuple(vertex))
-            if component not in self._vertex_hash_map:
-                self._vertex_hash_map[component] = []
-            self._vertex_hash_map[component].append(vertex_index)
+        cached = None if operator_cache is None or shared_model is not None \
+            else operator_cache.get(self.classification_cache_key(), ['vertex_component_ids'])
+        if shared_model is not None:
+            self._vertex_component_ids = shared_model._vertex_component_ids
+            self._components = shared_model._components
+        elif refined_classification is not None:
+            self._vertex_component_ids, self._components = refined_classification
+            if operator_cache is not None:
+                operator_cache.put(self.classification_cache_key(),
+                                   {'vertex_component_ids': self._vertex_component_ids})
+        elif cached is None:
+            self._vertex_component_ids, self._components = \
+                self._fuel_assembly.find_components(self._mesh.coordinates())
+            if operator_cache is not None:
+                operator_cache.put(self.classification_cache_key(),
+                                   {'vertex_component_ids': self._vertex_component_ids})
+        else:
+            # component ids index list(fuel_assembly) followed by the default component, as in find_components
+            self._vertex_component_ids = cached[0]
+            self._components = list(fuel_assembly) + [fuel_assembly.get_default_component()]
+
+        self._vertex_hash_map = self.group_by_component(self._vertex_component_ids, self._components) \
+            if shared_model is None else shared_model._vertex_hash_map
+
+        """ Coefficient space dofs mapped to their component, if coefficients are precomputed Functions """
+        self._coefficient_space = None
+        self._coefficient_component_ids = None
+        self._coefficient_dof_hash_map = {}
+        self._coefficient_points = None  # position classifying each coefficient dof
+        if shared_model is not None:
+            self._coefficient_space = shared_model._coefficient_space
+            self._coefficient_component_ids = shared_model._coefficient_component_ids
+            self._coefficient_dof_hash_map = shared_model._coefficient_dof_hash_map
+            self._coefficient_points = shared_model._coefficient_points
+            coefficient_space = None  # nothing left to build
+        if coefficient_space is not None:
+            from fenics import FunctionSpace, dof_to_vertex_map
+        if coefficient_space == 'DG':
+            self._coefficient_space = FunctionSpace(self._mesh, 'DG', 0)
+            cell_midpoints = self._mesh.coordinates()[self._mesh.cells()].mean(axis=1)
+            cell_component_ids, cell_components = self._fuel_assembly.find_components(cell_midpoints)
+            cell_dofs = self._coefficient_space.dofmap().entity_dofs(self._mesh, self._mesh.topology().dim())
+            self._coefficient_component_ids = np.empty_like(cell_component_ids)
+            self._coefficient_component_ids[cell_dofs] = cell_component_ids
+            self._coefficient_points = np.empty_like(cell_midpoints)
+            self._coefficient_points[cell_dofs] = cell_midpoints
+        elif coefficient_space == 'P':
+            self._coefficient_space = FunctionSpace(self._mesh, 'P', 1)
+            self._coefficient_component_ids = self._vertex_component_ids[dof_to_vertex_map(self._coefficient_space)]
+            self._coefficient_points = self._mesh.coordinates()[dof_to_vertex_map(self._coefficient_space)]
+        if coefficient_space is not None:
+            self._coefficient_dof_hash_map = self.group_by_component(self._coefficient_component_ids, self._components)
+
+        """ Prefactored time stepping, the left-hand side is factored once per scheme, dt and material coefficients """
+        self._time_integration = BackwardEuler() if time_integration is None else time_integration
+        self._state_history = []  # values of x(n-1), x(n-2), ... for multistep schemes
+        self._operator_signature = None  # lhs_signature() the coefficients and rhs operators were built for
+        self._lhs_factorization = None
+        self._lhs_signature = None
+        self._lhs_factorizations = OrderedDict()  # recently used (factorization, rhs corrections) by signature
+        self._rhs_corrections = []
+        self._rhs_vector = None
+
+        """ Affine right-hand side b = K x(n) + b_fixed + L_ctrl u, built on the first apply_actuation """
+        self._vertex_to_dof = None
+        self._rhs_operator = None
+        self._component_set_loads = None
+        self._fixed_load = None
+        self._fixed_load_version = None  # Component.get_source_version() b_fixed was built for
+        self._source_coefficient_version = None  # Component.get_source_version() the source coefficients were built for
+        self._actuation = None
+        self._coupling_load = None  # right-hand side contribution of a coupled model, see set_coupling_load
+
+        """ Fundamental mode of the last k_effective solve, the start vector of the next one """
+        self._fundamental_mode = None
+
+        """ Component edits of the fuel assembly reclassify the mesh incrementally, see component_geometry_changed """
+        self._geometry_version = 0  # number of component edits, part of lhs_signature()
+        fuel_assembly.subscribe(self.component_geometry_changed)
+
+    """ Backend Methods, overridden by backends other than FEniCS """
+
+    @staticmethod
+    def mesh_type():
+        """ :return: class of the meshes of this backend """
+        from fenics import Mesh
+        return Mesh
+
+    def default_mesh(self, nx, ny):
+        """ :return: crossed nx by ny triangulation of the fuel assembly domain """
+        from fenics import Point, RectangleMesh
+        x0, x1, y0, y1 = self._fuel_assembly.get_domain_limits()
+        p0 = Point(x0, y0)
+        p1 = Point(x1, y1)
+        return RectangleMesh(p0, p1, nx, ny, diagonal='crossed')
+
+    def function_space(self):
+        """ :return: P1 FunctionSpace of the state, the one of the shared model if given """
+        if self._shared_model is not None:
+            return self._shared_model._V
+        from fenics import FunctionSpace
+        return FunctionSpace(self._mesh, 'P', 1)
+
+    @staticmethod
+    def refine_mesh(mesh, cell_markers):
+        """ :return: conforming refinement of mesh bisecting the cells where the boolean cell_markers is True """
+        from fenics import MeshFunction, refine
+        markers = MeshFunction('bool', mesh, mesh.topology().dim(), False)
+        markers.array()[:] = cell_markers
+        return refine(mesh, markers)
+
+    def get_number_of_states(self):
+        return self._V.dim()
+
+    def get_state_values(self, state):
+        """ :return: array of the dof values of state """
+        return state.vector().get_local()
+
+    def set_state_values(self, state, values):
+        """ writes the array of dof values into state """
+        state.vector().set_local(values)
+        state.vector().apply('insert')
+
+    def assemble_lhs(self):
+        """ :return: sparse left-hand side matrix of self._a """
+        return self.assemble_sparse(self._a)
+
+    def assemble_rhs(self):
+        """ :return: right-hand side vector of self._L, assembled into a reused vector """
+        from fenics import assemble
+        self._rhs_vector = assemble(self._L, tensor=self._rhs_vector)
+        return self._rhs_vector.get_local()
+
+    """ Components """
+
+    def refine_at_component_boundaries(self, mesh, levels):
+        """
+        Refines the cells of mesh cut by a component boundary, those whose vertices and midpoint do not all lie in one
+        component, up to levels times
+        :return: refined mesh, and the component ids of its vertices with the list mapping component id to component
+        """
+        classification = self._fuel_assembly.find_components(mesh.coordinates())
+        for level in range(levels):
+            cells = mesh.cells()
+            midpoint_component_ids, _ = \
+                self._fuel_assembly.find_components(mesh.coordinates()[cells].mean(axis=1))
+            cut = np.any(classification[0][cells] != midpoint_component_ids[:, np.newaxis], axis=1)
+            if not cut.any():
+                break
+            mesh = self.refine_mesh(mesh, cut)
+            classification = self._fuel_assembly.find_components(mesh.coordinates())
+        return mesh, classification
+
+    def component_geometry_changed(self, component, regions):
+        """
+        Subscriber of the fuel assembly component edits. Reclassifies only the vertices and coefficient dofs within
+        regions and patches the vertex and coefficient dof hash maps in place. The coefficient fields, operators and
+        factorizations depending on the geometry are rebuilt on the next step, since lhs_signature() changes.
+        :param component: edited component
+        :param regions: list of bounding boxes containing every position that may have changed component, None for
+        the whole domain
+        """
+        if self._shared_model is None:  # models sharing the discretization see the patched arrays
+            coordinates = self._mesh.coordinates()
+            vertices = np.flatnonzero(self.within_regions(coordinates, regions))
+            self.reclassify(vertices, coordinates[vertices], self._vertex_component_ids, self._vertex_hash_map)
+            if self._coefficient_space is not None:
+                dofs = np.flatnonzero(self.within_regions(self._coefficient_points, regions))
+                self.reclassify(dofs, self._coefficient_points[dofs], self._coefficient_component_ids,
+                                self._coefficient_dof_hash_map)
+            self._component_hash_map.forget(regions)
+
+        self._geometry_version += 1
+
+    def reclassify(self, indices, points, component_ids, hash_map):
+        """
+        Classifies points again, writing their component ids in place into component_ids at indices and updating the
+        index arrays in hash_map of every component that points left or entered
+        :return: indices whose component changed
+        """
+        new_component_ids, components = self._fuel_assembly.find_components(points)
+        assert len(components) == len(self._components), 'the fuel assembly gained components since the model was built'
+
+        changed = new_component_ids != component_ids[indices]
+        affected_component_ids = np.union1d(component_ids[indices][changed], new_component_ids[changed])
+        component_ids[indices] = new_component_ids
+        for component_id in affected_component_ids:
+            component_indices = np.flatnonzero(component_ids == component_id)
+            if len(component_indices) > 0:
+                hash_map[self._components[component_id]] = component_indices
+            else:
+                hash_map.pop(self._components[component_id], None)
+        return indices[changed]
+
+    @staticmethod
+    def within_regions(points, regions):
+        """ :return: boolean array, True for the points within any of the bounding boxes regions, all if None """
+        if regions is None:
+            return np.ones(points.shape[0], dtype=bool)
+        within = np.zeros(points.shape[0], dtype=bool)
+        for x_min, x_max, y_min, y_max in regions:
+            within |= (points[:, 0] >= x_min) & (points[:, 0] <= x_max) \
+                & (points[:, 1] >= y_min) & (points[:, 1] <= y_max)
+        return within
 
     def get_vertices_of_component(self, component):
         return self._vertex_hash_map[component]
 
+    def get_dofs_of_component(self, component):
+        """ :return: array of the state dofs at the vertices enclosed by component, empty if there are none """
+        if self._vertex_to_dof is None:
+            from fenics import vertex_to_dof_map
+            self._vertex_to_dof = vertex_to_dof_map(self._V)
+        return self._vertex_to_dof[self._vertex_hash_map.get(component, np.array([], dtype=int))]
+
     def get_number_of_vertices(self):
         return self._number_of_vertices
 
+    def get_vertex_component_ids(self):
+        """ :return: array of the component id of each vertex, indexing into get_components() """
+        return self._vertex_component_ids
+
+    def get_components(self):
+        """ :return: list mapping component id to component """
+        return self._components
+
+    def output_operator(self, component_set, reduction='mean'):
+        """
+        Sparse state to output operator measuring the dofs enclosed by components, e.g. thermocouple locations
+        :param component_set: name of component set or list of components
+        :param reduction: 'mean' for one output per component averaging its dofs, 'select' for one output per dof
+        :return: csr_matrix C of shape (number of outputs, nx)
+        """
+        assert reduction in ['mean', 'select'], "reduction must be 'mean' or 'select'"
+
+        components = self._fuel_assembly.get_component_set(component_set) if isinstance(component_set, str) \
+            else component_set
+        dofs = [self.get_dofs_of_component(component) for component in components]
+        columns = np.concatenate(dofs).astype(int)
+        if reduction == 'select':
+            number_of_outputs = columns.shape[0]
+            rows = np.arange(number_of_outputs)
+            values = np.ones(number_of_outputs)
+        else:
+            assert all(len(component_dofs) > 0 for component_dofs in dofs), 'every component must enclose a dof'
+            number_of_outputs = len(components)
+            counts = [len(component_dofs) for component_dofs in dofs]
+            rows = np.repeat(np.arange(number_of_outputs), counts)
+            values = np.repeat(1 / np.array(counts, dtype=float), counts)
+        return csr_matrix((values, (rows, columns)), shape=(number_of_outputs, self.get_number_of_states()))
+
+    @staticmethod
+    def group_by_component(component_ids, components):
+        """ :return: hash map from each component to the array of indices with its component id """
+        order = np.argsort(component_ids, kind='stable')
+        counts = np.bincount(component_ids, minlength=len(components))
+        hash_map = {}
+        for component, indices in zip(components, np.split(order, np.cumsum(counts)[:-1])):
+            if len(indices) > 0:
+                hash_map[component] = indices
+        return hash_map
+
+    def coefficient(self, coefficient_class):
+        """
+        Returns positionally dependent coefficient, either as a UserExpression evaluated at every quadrature point or,
+        if a coefficient space was requested, as a Function on that space gathered once from the component ids
+        :param coefficient_class: FEMModel.Coefficient subclass
+        """
+        if self._coefficient_space is None:
+            return coefficient_expression_class()(coefficient_class, self._component_hash_map)
+
+        from fenics import Function
+        field = Function(self._coefficient_space)
+        self.update_coefficient(field, coefficient_class)
+        return field
+
+    def update_coefficient(self, field, coefficient_class):
+        """
+        Writes the component values of a precomputed coefficient straight into its Function vector, no-op for
+        UserExpression coefficients which read the components at assembly
+        :param field: coefficient returned by coefficient()
+        :param coefficient_class: FEMModel.Coefficient subclass of field
+        """
+        if self._coefficient_space is None:
+            return
+
+        if coefficient_class.material_property is not None:
+            values = self.gathered_properties(self._coefficient_component_ids, coefficient_class.material_property)
+        else:
+            component_values = np.zeros((len(self._components),))
+            for component_id in np.unique(self._coefficient_component_ids):
+                component_values[component_id] = coefficient_class.component_value(self._components[component_id])
+            values = component_values[self._coefficient_component_ids]
+        field.vector().set_local(values)
+        field.vector().apply('insert')
+
+    def update_coefficients(self):
+        """ Rewrites all precomputed material coefficient Functions from their components, overridden by each model """
+        pass
+
+    def update_source_coefficients(self):
+        """ Rewrites all precomputed source coefficient Functions from their components, overridden by each model """
+        pass
+
+    def refresh_source_coefficients(self):
+        """ Calls update_source_coefficients if a component source was set since the last call """
+        if self._source_coefficient_version != Component.get_source_version():
+            self.update_source_coefficients()
+            self._source_coefficient_version = Component.get_source_version()
+
+    def set_dt(self, dt):
+        """ sets model step time, the left-hand side is refactored on the next step unless dt was used recently """
+        assert isinstance(dt, float) or isinstance(dt, int)
+        self._dt = dt
+        self._state_history = []
+        self.setup_problem()
+
+    def set_time_integration(self, time_integration):
+        """ sets TimeIntegrationScheme of step_time and state_transition_model, multistep schemes restart """
+        assert isinstance(time_integration, TimeIntegrationScheme)
+        self._time_integration = time_integration
+        self._state_history = []
+
+    def component_properties(self, *property_names):
+        """
+        Gathers material properties from the material table of the fuel assembly in one fancy indexing operation
+        :param property_names: names of Material.property_names, e.g. 'density', 'specific_heat_capacity'
+        :return: (number of components, number of property_names) array of the properties of each component of the
+        model, NaN for properties that are not set and components without material
+        """
+        table, component_material_ids, materials = self._fuel_assembly.material_table()
+        assert len(component_material_ids) == len(self._components), \
+            'the fuel assembly gained components since the model was built'
+        columns = [Material.property_names.index(property_name) for property_name in property_names]
+        return table[component_material_ids[:, np.newaxis], columns]
+
+    def gathered_properties(self, component_ids, *property_names):
+        """
+        Gathers material properties of many positions, asserting the materials of the gathered components set them
+        :param component_ids: array of the component id of each position, e.g. of the cells of the mesh
+        :param property_names: names of Material.property_names
+        :return: array of the material property of each position for a single property name, otherwise a tuple of them
+        """
+        properties = self.component_properties(*property_names)
+        gathered_ids = np.unique(component_ids)
+        missing = np.argwhere(np.isnan(properties[gathered_ids]))  # (gathered component, property) pairs
+        assert missing.shape[0] == 0, 'the material of {} (component id {}) within the mesh must set {}'.format(
+            'the default component' if gathered_ids[missing[0, 0]] == len(self._components) - 1
+            else type(self._components[gathered_ids[missing[0, 0]]]).__name__, gathered_ids[missing[0, 0]],
+            property_names[missing[0, 1]])
+        properties = properties[component_ids]
+        return properties[:, 0] if len(property_names) == 1 else tuple(properties.T)
+
+    def lhs_signature(self):
+        """
+        :return: signature of what the left-hand side depends on, dt, the version of the fuel assembly, the material
+        version of the components and the number of component edits
+        """
+        return self._dt, self._fuel_assembly.get_version(), Component.get_material_version(), self._geometry_version
+
+    def update_operator_signature(self):
+        """
+        Updates the coefficients and drops the affine right-hand side operators if lhs_signature() changed
+        :return: lhs_signature()
+        """
+        operator_signature = self.lhs_signature()
+        if operator_signature != self._operator_signature:
+            self.update_coefficients()
+            self._operator_signature = operator_signature
+            self._rhs_operator = None
+            self._component_set_loads = None
+        return operator_signature
+
+    # number of left-hand side factorizations kept for switching back to a recently used scheme or dt
+    _max_lhs_factorizations = 4
+
+    def factorize_lhs(self, scheme=None):
+        """
+        Selects the factored left-hand side of scheme, the model time integration scheme if None, factoring it unless
+        it is cached for the current lhs_signature(). If lhs_signature() changed, the coefficients are updated and the
+        affine right-hand side operators that depend on them are dropped.
+        :param scheme: TimeIntegrationScheme
+        """
+        scheme = self._time_integration if scheme is None else scheme
+
+        lhs_signature = (self.update_operator_signature(), scheme.signature())
+        if self._lhs_factorization is None or lhs_signature != self._lhs_signature:
+            if lhs_signature not in self._lhs_factorizations:
+                M = self.assemble_lhs()
+                if isinstance(scheme, BackwardEuler):
+                    lhs, corrections = M, []
+                else:
+                    K, load = self.rhs_operators()
+                    lhs, corrections = scheme.lhs(M, K), scheme.rhs_corrections(M, K)
+                self._lhs_factorizations[lhs_signature] = splu(lhs.tocsc()), corrections
+                if len(self._lhs_factorizations) > self._max_lhs_factorizations:
+                    self._lhs_factorizations.popitem(last=False)
+            self._lhs_factorizations.move_to_end(lhs_signature)
+            self._lhs_factorization, self._rhs_corrections = self._lhs_factorizations[lhs_signature]
+            self._lhs_signature = lhs_signature
+
+    def step_scheme(self):
+        """ :return: scheme of the next step, the startup scheme until a multistep scheme has enough past states """
+        if len(self._state_history) < self._time_integration.history - 1:
+            return self._time_integration.startup_scheme()
+        return self._time_integration
+
+    def add_rhs_corrections(self, rhs, states):
+        """
+        Adds the right-hand side corrections of the factored scheme to the backward Euler right-hand side rhs
+        :param rhs: backward Euler right-hand side, updated in place
+        :param states: list of the states x(n), x(n-1), ... as arrays
+        """
+        for correction, past_state in zip(self._rhs_corrections, states):
+            rhs += correction @ past_state
+        return rhs
+
+    def solve_time_step(self, state, next_state):
+        """
+        Advances the model one time step with the prefactored left-hand side of the time integration scheme and
+        back-substitutes into the preallocated next_state. The backward Euler right-hand side is either reassembled from
+        self._L into a reused vector or, once apply_actuation was called, computed as the affine
+        b = K x(n) + b_fixed + L_ctrl u, and then corrected for the scheme.
+        :param state: Function of the state at step n, updated to the state at step n + 1
+        :param next_state: preallocated Function written with the state at step n + 1
+        :return: next_state
+        """
+        scheme = self.step_scheme()
+        self.factorize_lhs(scheme)
+
+        if self._actuation is None:
+            self.refresh_source_coefficients()
+            rhs = self.assemble_rhs()
+        else:
+            self.build_affine_rhs()
+            rhs = self._rhs_operator @ self.get_state_values(state) + self.fixed_load() \
+                  + self._component_set_loads[self._source_component_sets[0]] @ self._actuation
+
+        if self._coupling_load is not None:
+            rhs = rhs + self._coupling_load
+
+        if self._rhs_corrections or self._time_integration.history > 1:
+            states = [np.array(self.get_state_values(state))] + self._state_history
+            self.add_rhs_corrections(rhs, states)
+            self._state_history = states[:self._time_integration.history - 1]
+
+        next_values = self._lhs_factorization.solve(rhs)
+        self.set_state_values(next_state, next_values)
+        self.set_state_values(state, next_values)
+        return next_state
+
+    def simulate(self, n_steps, u_sequence=None, out=None, stride=1):
+        """
+        Advances the model n_steps time steps, writing every stride-th state straight into a snapshot matrix
+        :param n_steps: number of time steps
+        :param u_sequence: (nu, n_steps) actuation passed to apply_actuation before each step, or None
+        :param out: caller supplied (nx, n_steps // stride) array, for instance a numpy memmap, or a SnapshotStore to
+        append the states to, allocated if None
+        :param stride: keep only every stride-th state
+        :return: out, column k holding the state after step (k + 1) * stride
+        """
+
+        """ Check Inputs """
+        assert isinstance(n_steps, int) and n_steps >= 0, 'n_steps must be int >= 0'
+        assert isinstance(stride, int) and stride > 0, 'stride must be int > 0'
+        assert u_sequence is None or u_sequence.shape[1] >= n_steps, 'u_sequence must have at least n_steps columns'
+
+        nx = self.get_number_of_states()
+        ns = n_steps // stride
+        if out is None:
+            out = np.empty((nx, ns))
+        append = hasattr(out, 'append')
+        assert out.shape[0] == nx and (append or out.shape[1] >= ns), 'out must have shape (nx, n_steps // stride)'
+
+        for i in range(n_steps):
+            if u_sequence is not None:
+                self.apply_actuation(u_sequence[:, i])
+            state = self.step_time()
+            if (i + 1) % stride == 0:
+                if append:
+                    out.append(self.get_state_values(state))
+                else:
+                    out[:, (i + 1) // stride - 1] = self.get_state_values(state)
+
+        if append:
+            out.flush()
+        return out
+
+    def simulate_ensemble(self, X0, n_steps, u_sequences=None, out=None, stride=1):
+        """
+        Advances K trajectories at once with the affine right-hand side, reusing the single left-hand side
+        factorization for a block back-substitution on the (nx, K) state matrix each step. Multistep schemes start from
+        X0 alone. The model state is unchanged.
+        :param X0: (nx, K) initial states
+        :param n_steps: number of time steps
+        :param u_sequences: (nu, K, n_steps) actuation of each trajectory, or None to hold the current actuation, the
+        actuated sources if apply_actuation was not called
+        :param out: caller supplied (nx, K, n_steps // stride) array, allocated if None
+        :param stride: keep only every stride-th state
+        :return: out, out[:, :, k] holding the states after step (k + 1) * stride
+        """
+
+        """ Check Inputs """
+        assert isinstance(n_steps, int) and n_steps >= 0, 'n_steps must be int >= 0'
+        assert isinstance(stride, int) and stride > 0, 'stride must be int > 0'
+        assert X0.ndim == 2 and X0.shape[0] == self.get_number_of_states(), 'X0 must have shape (nx, K)'
+
+        self.build_affine_rhs()
+        actuated_components = self._fuel_assembly.get_component_set(self._source_component_sets[0])
+        L_ctrl = self._component_set_loads[self._source_component_sets[0]]
+
+        (nx, K) = X0.shape
+        ns = n_steps // stride
+        if u_sequences is None:
+            u = self._actuation if self._actuation is not None \
+                else np.array([self.get_component_source(component) for component in actuated_components], dtype=float)
+            held_load = (self.fixed_load() + L_ctrl @ u)[:, np.newaxis]
+        else:
+            assert u_sequences.shape[:2] == (len(actuated_components), K) and u_sequences.shape[2] >= n_steps, \
+                'u_sequences must have shape (nu, K, n_steps)'
+        if out is None:
+            out = np.empty((nx, K, ns))
+        assert out.shape[:2] == (nx, K) and out.shape[2] >= ns, 'out must have shape (nx, K, n_steps // stride)'
+
+        X = np.array(X0, dtype=float)
+        history = []  # past states of multistep schemes
+        for i in range(n_steps):
+            self.factorize_lhs(self._time_integration if len(history) >= self._time_integration.history - 1
+                               else self._time_integration.startup_scheme())
+            if u_sequences is None:
+                rhs = self._rhs_operator @ X + held_load
+            else:
+                rhs = self._rhs_operator @ X + self.fixed_load()[:, np.newaxis] + L_ctrl @ u_sequences[:, :, i]
+            self.add_rhs_corrections(rhs, [X] + history)
+            history = ([X] + history)[:self._time_integration.history - 1]
+            X = self._lhs_factorization.solve(rhs)
+            if (i + 1) % stride == 0:
+                out[:, :, (i + 1) // stride - 1] = X
+
+        return out
+
+    """ Affine Sources """
+
+    # component sets whose sources enter the affine right-hand side, the first one being actuated by apply_actuation
+    _source_component_sets = ()
+
+    def rhs_operators(self):
+        """
+        :return: sparse K and lumped load vector, in the sign convention of self._a, such that the right-hand side is
+        K x(n) plus the load times the source of each dof
+        """
+        raise NotImplementedError('{} has no affine right-hand side'.format(type(self).__name__))
+
+    def get_component_source(self, component):
+        """ :return: source of component entering the affine right-hand side """
+        raise NotImplementedError('{} has no affine right-hand side'.format(type(self).__name__))
+
+    def set_component_source(self, component, source):
+        """ sets source of component entering the affine right-hand side """
+        raise NotImplementedError('{} has no affine right-hand side'.format(type(self).__name__))
+
+    def set_coupling_load(self, load):
+        """
+        Sets a vector added to the right-hand side of every following step, e.g. the source a coupled model computes
+        from another field, in the sign convention of self._a
+        :param load: right-hand side vector, or None to remove it
+        """
+        assert load is None or load.shape == (self.get_number_of_states(),), 'load must have shape (nx,)'
+        self._coupling_load = load
+
+    def component_set_load_matrix(self, component_set, load):
+        """
+        :param component_set: name of component set
+        :param load: lumped load vector
+        :return: sparse (nx, number of components in set) matrix whose column j is the load at the dofs of component j,
+        with no columns if the set does not exist
+        """
+        components = self._fuel_assembly.get_component_set(component_set) \
+            if self._fuel_assembly.has_component_set(component_set) else []
+        dofs = [self.get_dofs_of_component(component) for component in components]
+        rows = np.concatenate(dofs) if dofs else np.zeros((0,), dtype=int)
+        columns = np.repeat(np.arange(len(components)), [len(component_dofs) for component_dofs in dofs])
+        return coo_matrix((load[rows], (rows, columns)), shape=(load.shape[0], len(components))).tocsr()
+
+    def component_set_sources(self, component_set):
+        """ :return: array of the sources of the components of component_set, empty if the set does not exist """
+        if not self._fuel_assembly.has_component_set(component_set):
+            return np.zeros((0,))
+        return np.array([self.get_component_source(component)
+                         for component in self._fuel_assembly.get_component_set(component_set)], dtype=float)
+
+    def fixed_source_load_matrix(self, load):
+        """
+        :param load: lumped load vector
+        :return: sparse load matrix of the components of the non-actuated source component sets, see
+        component_set_load_matrix, whose product with fixed_sources() is the raw affine term f
+        """
+        return hstack([csr_matrix((load.shape[0], 0))] + [self.component_set_load_matrix(component_set, load)
+                                                          for component_set in self._source_component_sets[1:]],
+                      format='csr')
+
+    def fixed_sources(self):
+        """ :return: array of the sources of the components of the non-actuated source component sets """
+        return np.concatenate([np.zeros((0,))] + [self.component_set_sources(component_set)
+                                                  for component_set in self._source_component_sets[1:]])
+
+    def build_affine_rhs(self):
+        """ Assembles K and one load vector per component of each source component set if not already built """
+        self.update_operator_signature()
+        if self._rhs_operator is not None:
+            return
+
+        self._rhs_operator, load = self.rhs_operators()
+        self._component_set_loads = {
+            component_set: self.component_set_load_matrix(component_set, load)
+            for component_set in self._source_component_sets if self._fuel_assembly.has_component_set(component_set)}
+        self.update_fixed_load()
+
+    def update_fixed_load(self):
+        """ Recomputes b_fixed from the current sources of the components of the non-actuated source sets """
+        self._fixed_load_version = Component.get_source_version()
+        self._fixed_load = np.zeros((self._rhs_operator.shape[0],))
+        for component_set in self._source_component_sets[1:]:
+            if component_set in self._component_set_loads:
+                self._fixed_load += self._component_set_loads[component_set] @ self.component_set_sources(component_set)
+
+    def fixed_load(self):
+        """ :return: b_fixed, recomputed if a component source was set since it was built """
+        if self._fixed_load_version != Component.get_source_version():
+            self.update_fixed_load()
+        return self._fixed_load
+
+    def apply_actuation(self, u):
+        """
+        Sets the actuation u of the actuated component set. From then on step_time uses the affine right-hand side
+        b = K x(n) + b_fixed + L_ctrl u, a few sparse matvecs instead of a full assembly of self._L, u being kept as a
+        vector instead of being written into the actuated components. Note the affine right-hand side only includes the
+        sources of components in the source component sets.
+        :param u: source of each component in the actuated component set, or None to write the last actuation into the
+        actuated components and return to assembling self._L
+        """
+        if u is None:
+            if self._actuation is not None:
+                actuated_components = self._fuel_assembly.get_component_set(self._source_component_sets[0])
+                for source, component in zip(self._actuation, actuated_components):
+                    self.set_component_source(component, source)
+            self._actuation = None
+            return
+
+        self.build_affine_rhs()
+        u = np.array(u, dtype=float)
+        assert u.shape == (self._component_set_loads[self._source_component_sets[0]].shape[1],), \
+            'u must have one entry per actuated component'
+        self._actuation = u
+
+    def get_actuation(self):
+        """ :return: actuation of the last apply_actuation, None if the right-hand side is assembled from self._L """
+        return self._actuation
+
     @abstractmethod
     def setup_problem(self):
         pass
 
     @abstractmethod
     def step_time(self):
+        """
+        Advances the model one time step
+        :return: preallocated state, a Function for FEniCS models, overwritten by the next step so copy it to keep it
+        """
         pass
 
-    @abstractmethod
-    def state_transition_model(self):
-        pass
+    """ State Transition Model """
+
+    def state_space_matrices(self):
+        """
+        :return: sparse M and K, raw control matrix B and fixed_source_load_matrix() F of the backward Euler model, none
+        of which depend on the component sources
+        """
+        raise NotImplementedError('{} has no state transition model'.format(type(self).__name__))
+
+    def state_space_operators(self):
+        """
+        :return: sparse M and K, raw control matrix B and raw affine term f of the backward Euler model
+        M x(n+1) = K x(n) + B u(n) + f, B being a sparse load matrix built by component_set_load_matrix and f the load
+        of the current fixed_sources()
+        """
+        M, K, B, F = self.state_space_matrices()
+        return M, K, B, F @ self.fixed_sources()
+
+    def cache_key(self):
+        """
+        :return: operator cache key of the model class, dt, coefficient space, mesh and fuel assembly geometry and
+        materials, state_space_matrices() not depending on the component sources
+        """
+        return OperatorCache.key(type(self), self._dt, self._coefficient_space_family,
+                                 self._mesh.coordinates(), self._mesh.cells(), self._fuel_assembly)
+
+    def classification_cache_key(self):
+        """
+        :return: operator cache key of the vertex classification, which only depends on the mesh vertices and the
+        fuel assembly, so models of any class and dt share it
+        """
+        return OperatorCache.key('vertex_component_ids', self._mesh.coordinates(), self._fuel_assembly)
+
+    def cached_state_space_operators(self):
+        """ :return: state_space_operators(), the matrices loaded from the operator cache if the model has one """
+        if self._operator_cache is None:
+            return self.state_space_operators()
+
+        names = ['M', 'K', 'B', 'F']
+        key = self.cache_key()
+        matrices = self._operator_cache.get(key, names)
+        if matrices is None:
+            matrices = self.state_space_matrices()
+            self._operator_cache.put(key, dict(zip(names, matrices)))
+        M, K, B, F = matrices
+        return M, K, B, F @ self.fixed_sources()
+
+    def state_transition_model(self, sparse=False):
+        """
+        Computes the state transition model x(n+1) = A x(n) + B u(n) + f of the time integration scheme, x being the
+        augmented state [x(n); x(n-1); ...] for multistep schemes
+        :param sparse: if True, A and B are LinearOperators backed by a sparse LU factorization of M, otherwise A and
+        B are dense arrays computed from the inverse of M (only practical on small meshes)
+        :return: A, B, f
+        """
+        M, K, B, f = self._time_integration.state_space_operators(*self.cached_state_space_operators())
+
+        if sparse:
+            return self.factored_state_transition_model(M, K, B, f)
+        return self.dense_state_transition_model(M, K, B, f)
+
+    """ Criticality """
+
+    def criticality_operators(self):
+        """
+        :return: sparse steady state loss operator L (leakage and absorption) and fission operator F of the
+        eigenvalue problem L phi = 1 / k F phi
+        """
+        raise NotImplementedError('{} has no criticality eigenvalue problem'.format(type(self).__name__))
+
+    def k_effective(self, warm_start=True, tol=1e-10):
+        """
+        Computes the effective multiplication factor from L phi = 1 / k F phi with shift-invert ARPACK around 0, the
+        fundamental mode having the smallest positive eigenvalue 1 / k
+        :param warm_start: if True, the Lanczos iteration starts from the previous fundamental mode, which converges in
+        a few iterations when the materials changed slightly
+        :param tol: relative accuracy of the eigenvalue
+        :return: k-effective and the fundamental flux mode, positive and scaled to a maximum of 1
+        """
+        self.update_operator_signature()
+        L, F = self.criticality_operators()
+
+        v0 = None
+        if warm_start and self._fundamental_mode is not None and self._fundamental_mode.shape[0] == L.shape[0]:
+            v0 = self._fundamental_mode
+
+        lu = splu(L.tocsc())
+        L_inverse = LinearOperator(L.shape, dtype=L.dtype, matvec=lu.solve)
+        eigenvalues, modes = eigsh(L, k=1, M=F, sigma=0, which='LM', OPinv=L_inverse, v0=v0, tol=tol)
+
+        mode = modes[:, 0] / modes[np.argmax(np.abs(modes[:, 0])), 0]
+        self._fundamental_mode = mode
+        return 1 / eigenvalues[0], mode
+
+    @staticmethod
+    def assemble_sparse(form):
+        """ Assembles input bilinear form into a scipy csr_matrix directly from the PETSc CSR data """
+        from fenics import as_backend_type, assemble
+        petsc_matrix = as_backend_type(assemble(form)).mat()
+        indptr, indices, data = petsc_matrix.getValuesCSR()
+        return csr_matrix((data, indices, indptr), shape=petsc_matrix.getSize())
+
+    @staticmethod
+    def dense_state_transition_model(M, K, B, f):
+        """
+        Computes the state transition model x(n+1) = A x(n) + B u(n) + f from M x(n+1) = K x(n) + B u(n) + f with the
+        dense inverse of M
+        :return: dense A, B and f
+        """
+        M_inverse = np.linalg.inv(M.toarray())
+
+        A = np.dot(M_inverse, K.toarray())
+        B = np.asarray((B.T @ M_inverse.T).T)  # B may be sparse, multiplying from its side costs O(nnz(B) nx)
+        f = np.dot(M_inverse, f)
+
+        return A, B, f
+
+    @staticmethod
+    def factored_state_transition_model(M, K, B, f):
+        """
+        Computes the state transition model x(n+1) = A x(n) + B u(n) + f from M x(n+1) = K x(n) + B u(n) + f without
+        forming the inverse of M
+        :param M: sparse left-hand side matrix
+        :param K: sparse right-hand side matrix
+        :param B: raw control matrix, sparse or dense, kept as is and only applied through the factorization
+        :param f: raw affine term
+        :return: A and B as scipy LinearOperators applying one sparse LU factorization of M, and the solved f
+        """
+        lu = splu(M.tocsc())
+        nx = M.shape[0]
+        nu = B.shape[1]
+
+        A_operator = LinearOperator(
+            (nx, nx), dtype=M.dtype,
+            matvec=lambda x: lu.solve(K @ x),
+            matmat=lambda X: lu.solve(K @ X),
+            rmatvec=lambda y: K.T @ lu.solve(y, trans='T'),
+            rmatmat=lambda Y: K.T @ lu.solve(Y, trans='T'))
+
+        B_operator = LinearOperator(
+            (nx, nu), dtype=M.dtype,
+            matvec=lambda u: lu.solve(B @ u),
+            matmat=lambda U: lu.solve(B @ U),
+            rmatvec=lambda y: B.T @ lu.solve(y, trans='T'),
+            rmatmat=lambda Y: B.T @ lu.solve(Y, trans='T'))
+
+        return A_operator, B_operator, lu.solve(f)
 
     """ Nested Classes """
 
@@ -89,17 +915,53 @@ class FEMModel(ABC):
 
             return self._component_hash_map[point]
 
+        def forget(self, regions):
+            """ drops the cached positions within the bounding boxes regions, all if None """
+            if regions is None:
+                self._component_hash_map = {}
+                return
+            points = list(self._component_hash_map)
+            if points:
+                within = FEMModel.within_regions(np.array(points)[:, :2], regions)
+                for point, is_within in zip(points, within):
+                    if is_within:
+                        del self._component_hash_map[point]
+
         def plot(self):
+            import matplotlib.pyplot as plt
             for (point, component) in self._component_hash_map.items():
                 plt.scatter(point[0], point[1], color=component.get_plot_color(), s=1)
 
-    class Coefficient(ABC, UserExpression):
+    class Coefficient(ABC):
+        """Positionally dependent coefficient, evaluated by FEniCS through coefficient_expression_class()"""
+
+        # name of the Material property the coefficient equals, gathered from the material table if not None
+        material_property = None
+
+        @staticmethod
+        @abstractmethod
+        def component_value(component):
+            """ :return: coefficient value within input component """
+            pass
+
+
+@lru_cache(maxsize=None)
+def coefficient_expression_class():
+    """
+    :return: Fenics UserExpression evaluating a FEMModel.Coefficient at every quadrature point, defined on first use so
+    importing this module does not import FEniCS
+    """
+    from fenics import UserExpression
+
+    class CoefficientExpression(UserExpression):
         """Fenics implementation for positionally dependent coefficients"""
 
-        def __init__(self, component_hash_map):
+        def __init__(self, coefficient_class, component_hash_map):
             super().__init__()
+            self._coefficient_class = coefficient_class
             self._component_hash_map = component_hash_map
 
-        @abstractmethod
         def eval(self, value, vertex):
-            pass
+            value[0] = self._coefficient_class.component_value(self._component_hash_map.find_component(tuple(vertex)))
+
+    return CoefficientExpression
@@ -1,5 +1,3 @@
-import numpy as np
-from scipy.sparse import csr_matrix
 from abc import ABC
 from modeling.fem_model import FEMModel
 from fenics import *
@@ -8,37 +6,44 @@ from fenics import *
 class NeutronDiffusionEquationModel(FEMModel, ABC):
     class D(FEMModel.Coefficient):
         """Fenics implementation for positionally dependent diffusion length"""
+        material_property = 'diffusion_length'
 
-        def eval(self, value, vertex):
-            value[0] = self._component_hash_map.find_component(tuple(vertex)).get_material().get_diffusion_length()
+        @staticmethod
+        def component_value(component):
+            return component.get_material().get_diffusion_length()
 
     class Sigma_a(FEMModel.Coefficient):
         """Fenics implementation for positionally dependent absorption macroscopic cross section"""
+        material_property = 'absorption_macroscopic_cross_section'
 
-        def eval(self, value, vertex):
-            value[0] = self._component_hash_map.find_component(
-                tuple(vertex)).get_material().get_absorption_macroscopic_cross_section()
+        @staticmethod
+        def component_value(component):
+            return component.get_material().get_absorption_macroscopic_cross_section()
 
     class Sigma_f(FEMModel.Coefficient):
         """Fenics implementation for positionally dependent fission macroscopic cross section"""
+        material_property = 'fission_macroscopic_cross_section'
 
-        def eval(self, value, vertex):
-            value[0] = self._component_hash_map.find_component(
-                tuple(vertex)).get_material().get_fission_macroscopic_cross_section()
+        @staticmethod
+        def component_value(component):
+            return component.get_material().get_fission_macroscopic_cross_section()
 
     class S(FEMModel.Coefficient):
         """Fenics implementation for positionally dependent volumetric power density"""
 
-        def eval(self, value, vertex):
-            value[0] = self._component_hash_map.find_component(tuple(vertex)).get_volumetric_neutron_source()
+        @staticmethod
+        def component_value(component):
+            return component.get_volumetric_neutron_source()
 
 
 class NuclearReactorNeutronicsFEMModel(NeutronDiffusionEquationModel):
+    _source_component_sets = ('control_rods',)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         """ Fenics Problem Formulation """
-        self._V = FunctionSpace(self._mesh, 'P', 1)
+        self._V = self.function_space()
 
         self._PHIn1 = TrialFunction(self._V)  # Neutron Flux at Phi(n+1)
         self._v = TestFunction(self._V)  # weighting function
@@ -53,17 +58,26 @@ class NuclearReactorNeutronicsFEMModel(NeutronDiffusionEquationModel):
         self._nu = 2.5  # average neutrons produced per fission
 
         self._PHIn = project(self._PHI0, self._V)  # Neutron Flux at T(n)
+        self._PHIn1_solution = Function(self._V)  # preallocated solution at Phi(n+1)
 
         # positionally dependent coefficients and variables
-        self._D = self.D(self._component_hash_map)
-        self._Sigma_a = self.Sigma_a(self._component_hash_map)
-        self._Sigma_f = self.Sigma_f(self._component_hash_map)
-        self._S = self.S(self._component_hash_map)
+        self._D = self.coefficient(self.D)
+        self._Sigma_a = self.coefficient(self.Sigma_a)
+        self._Sigma_f = self.coefficient(self.Sigma_f)
+        self._S = self.coefficient(self.S)
 
         self._a, self._L = None, None
 
         self.setup_problem()
 
+    def update_coefficients(self):
+        self.update_coefficient(self._D, self.D)
+        self.update_coefficient(self._Sigma_a, self.Sigma_a)
+        self.update_coefficient(self._Sigma_f, self.Sigma_f)
+
+    def update_source_coefficients(self):
+        self.update_coefficient(self._S, self.S)
+
     def setup_problem(self):
         F = - 1 / self._v_n / self._dt * self._PHIn1 * self._v * dx \
             - self._D * dot(grad(self._PHIn1), grad(self._v)) * dx \
@@ -72,37 +86,45 @@ class NuclearReactorNeutronicsFEMModel(NeutronDiffusionEquationModel):
             + (self._nu * self._Sigma_f - self._Sigma_a) * self._PHIn1 * self._v * dx
 
         self._a, self._L = lhs(F), rhs(F)
+        self._lhs_factorization = None
 
     def step_time(self):
-        PHIn1 = Function(self._V)
-        solve(self._a == self._L, PHIn1)
-        self._PHIn.assign(PHIn1)
-        return PHIn1
-
-    def state_transition_model(self):
-        M = assemble(
-            1 / self._v_n / self._dt * self._PHIn1 * self._v * dx \
-            + self._D * dot(grad(self._PHIn1), grad(self._v)) * dx \
-            + (self._nu * self._Sigma_f - self._Sigma_a) * self._PHIn1 * self._v * dx
-        ).array()
-        M_inverse = np.linalg.inv(M)
+        return self.solve_time_step(self._PHIn, self._PHIn1_solution)
+
+    def set_volumetric_neutron_source(self, component, neutron_source):
+        """ sets the volumetric neutron source of component, the S field is refreshed on the next step """
+        component.set_volumetric_neutron_source(neutron_source)
+
+    def get_component_source(self, component):
+        return component.get_volumetric_neutron_source()
+
+    def set_component_source(self, component, source):
+        self.set_volumetric_neutron_source(component, source)
 
-        K = assemble(
-            1 / self._v_n / self._dt * self._PHIn1 * self._v * dx
-        ).array()
+    def rhs_operators(self):
+        K = self.assemble_sparse(- 1 / self._v_n / self._dt * self._PHIn1 * self._v * dx)
+        load = assemble(- self._v * dx).get_local()
+        return K, load
 
-        A = np.dot(M_inverse, K)
+    def state_space_matrices(self):
+        """ see FEMModel.state_space_matrices """
+        M_form = 1 / self._v_n / self._dt * self._PHIn1 * self._v * dx \
+                 + self._D * dot(grad(self._PHIn1), grad(self._v)) * dx \
+                 - (self._nu * self._Sigma_f - self._Sigma_a) * self._PHIn1 * self._v * dx
+        K_form = 1 / self._v_n / self._dt * self._PHIn1 * self._v * dx
 
         v = assemble(self._v * dx).get_local()
 
-        control_rod_set = self._fuel_assembly.get_component_set('control_rods')
+        B = self.component_set_load_matrix('control_rods', v)
+        F = self.fixed_source_load_matrix(v)
 
-        B = np.zeros((A.shape[0], len(control_rod_set)))
-        for component_index, component in zip(range(len(control_rod_set)), control_rod_set):
-            vs = self.get_vertices_of_component(component)
-            B[vs, component_index] = 1
-        B = np.dot(M_inverse, np.multiply(v[:, np.newaxis], B))
+        return self.assemble_sparse(M_form), self.assemble_sparse(K_form), B, F
 
-        f = np.zeros((A.shape[0],))
+    def criticality_operators(self):
+        """ see FEMModel.criticality_operators """
+        L_form = self._D * dot(grad(self._PHIn1), grad(self._v)) * dx + self._Sigma_a * self._PHIn1 * self._v * dx
+        return self.assemble_sparse(L_form), self._nu * self.fission_rate_matrix()
 
-        return A, B, f
+    def fission_rate_matrix(self):
+        """ :return: sparse mass matrix of Sigma_f, mapping the flux to the fission rate load """
+        return self.assemble_sparse(self._Sigma_f * self._PHIn1 * self._v * dx)
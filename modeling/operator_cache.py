@@ -0,0 +1,100 @@
+import hashlib
+import numpy as np
+from os import makedirs, replace
+from os.path import join, isfile
+from scipy.sparse import issparse, save_npz, load_npz
+from assembly_construction.component import Component
+from assembly_construction.component_assembly import ComponentAssembly
+from assembly_construction.material import Material
+from assembly_construction import serialization
+
+
+class OperatorCache(object):
+    def __init__(self, directory):
+        """
+        Content addressed on-disk cache of assembled FEM operators. Each entry lives in directory/<key>/ where key is a
+        hash of everything the operators depend on, so a changed geometry, material, mesh or dt simply misses the cache.
+        The component sources of fuel assemblies are not part of the key, the cached operators not depending on them.
+        :param directory: cache directory, created if it does not exist
+        """
+        self.directory = directory
+        makedirs(directory, exist_ok=True)
+
+    """ Keys """
+
+    @classmethod
+    def key(cls, *parts):
+        """
+        :param parts: numbers, strings, numpy arrays, Materials, Components, ComponentAssemblies or nested
+        lists, tuples and dicts of them
+        :return: sha256 hex digest of parts
+        """
+        hasher = hashlib.sha256()
+        for part in parts:
+            cls._update_hash(hasher, part)
+        return hasher.hexdigest()
+
+    @classmethod
+    def _update_hash(cls, hasher, value):
+        if isinstance(value, np.ndarray):
+            hasher.update('ndarray{}{}'.format(value.dtype.str, value.shape).encode())
+            hasher.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, ComponentAssembly):
+            hasher.update(b'ComponentAssembly')
+            hasher.update(value.content_hash(sources=False).encode())
+        elif isinstance(value, Component):
+            hasher.update(serialization.class_path(type(value)).encode())
+            cls._update_hash(hasher, vars(value))
+        elif isinstance(value, Material):
+            hasher.update(serialization.class_path(type(value)).encode())
+            cls._update_hash(hasher, value.get_properties())
+        elif isinstance(value, dict):
+            hasher.update('dict{}'.format(len(value)).encode())
+            for item_key in sorted(value, key=repr):
+                cls._update_hash(hasher, item_key)
+                cls._update_hash(hasher, value[item_key])
+        elif isinstance(value, (list, tuple)):
+            hasher.update('{}{}'.format(type(value).__name__, len(value)).encode())
+            for item in value:
+                cls._update_hash(hasher, item)
+        elif isinstance(value, type):
+            hasher.update('type{}'.format(serialization.class_path(value)).encode())
+        else:
+            hasher.update('{}{!r}'.format(type(value).__name__, value).encode())
+
+    """ Entries """
+
+    def _path(self, key, name, sparse):
+        return join(self.directory, key, name + ('.npz' if sparse else '.npy'))
+
+    def get(self, key, names):
+        """
+        :param key: entry key
+        :param names: names of the cached arrays
+        :return: tuple of the cached dense or sparse arrays, or None if any of them is missing
+        """
+        values = []
+        for name in names:
+            if isfile(self._path(key, name, sparse=True)):
+                values.append(load_npz(self._path(key, name, sparse=True)).tocsr())
+            elif isfile(self._path(key, name, sparse=False)):
+                values.append(np.load(self._path(key, name, sparse=False)))
+            else:
+                return None
+        return tuple(values)
+
+    def put(self, key, arrays):
+        """
+        Writes each array to the entry, scipy sparse matrices as .npz and numpy arrays as .npy
+        :param key: entry key
+        :param arrays: dict of name to dense or sparse array
+        """
+        makedirs(join(self.directory, key), exist_ok=True)
+        for name, value in arrays.items():
+            path = self._path(key, name, sparse=issparse(value))
+            temporary_path = path + '.tmp' + path[-4:]  # write then rename so readers never see partial files
+            if issparse(value):
+                save_npz(temporary_path, value.tocsr())
+            else:
+                np.save(temporary_path, np.asarray(value))
+            replace(temporary_path, path)
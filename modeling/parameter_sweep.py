@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from os.path import join, isfile, isdir
+from shutil import rmtree
+from modeling.operator_cache import OperatorCache
+from reduction.snapshot_store import SnapshotStore
+
+
+class ParameterSweep(object):
+    def __init__(self, build_model, parameter_grid, directory, n_steps=0, dense=True, max_workers=None,
+                 memory_per_worker=None):
+        """
+        ParameterSweep Constructor
+        Builds one FEMModel per combination of the parameter grid in a pool of worker processes and writes its state
+        transition model and snapshots to an on-disk store. Workers are spawned rather than forked so each one
+        initializes its own FEniCS and PETSc context. Finished configurations are skipped when the sweep is run again.
+        :param build_model: module level function building the model of a configuration from keyword arguments, e.g.
+        build_model(dt=1, nx=15, ny=15), including its fuel assembly so workers share no state
+        :param parameter_grid: dict of parameter name to list of values, the sweep runs every combination
+        :param directory: store directory, holding one entry per configuration named by its content hash
+        :param n_steps: number of snapshots simulated from the initial state of each model
+        :param dense: if True, store the dense A, B, f of state_transition_model(), otherwise the sparse M, K, B, f of
+        the time integration scheme
+        :param max_workers: number of worker processes, the number of cpus if None
+        :param memory_per_worker: expected peak memory of one configuration in bytes, the number of workers is capped
+        so they fit into the available memory, if given
+        """
+
+        """ Check Constructor Inputs """
+        assert callable(build_model), 'build_model must be a module level function'
+        assert isinstance(parameter_grid, dict) and all(len(values) > 0 for values in parameter_grid.values()), \
+            'parameter_grid must map each parameter name to a non-empty list of values'
+        assert isinstance(n_steps, int) and n_steps >= 0, 'n_steps must be int >= 0'
+        assert max_workers is None or (isinstance(max_workers, int) and max_workers > 0), 'max_workers must be int > 0'
+        assert memory_per_worker is None or memory_per_worker > 0, 'memory_per_worker must be > 0'
+
+        self.build_model = build_model
+        self.parameter_grid = parameter_grid
+        self.directory = directory
+        self.n_steps = n_steps
+        self.dense = dense
+        self.max_workers = max_workers
+        self.memory_per_worker = memory_per_worker
+
+        self._operator_store = OperatorCache(directory)
+
+    """ Configurations """
+
+    def configurations(self):
+        """ :return: list of dicts of parameter name to value, one per combination of the grid """
+        names = sorted(self.parameter_grid)
+        return [dict(zip(names, values)) for values in product(*[self.parameter_grid[name] for name in names])]
+
+    def key(self, configuration):
+        """ :return: store key of configuration, also depending on the build function and what is stored """
+        return OperatorCache.key(self.build_model.__module__, self.build_model.__qualname__, configuration,
+                                 self.n_steps, self.dense)
+
+    def is_done(self, configuration):
+        return isfile(join(self.directory, self.key(configuration), 'configuration.json'))
+
+    def operator_names(self):
+        return ['A', 'B', 'f'] if self.dense else ['M', 'K', 'B', 'f']
+
+    def load(self, configuration):
+        """ :return: tuple of the stored operators of configuration and its SnapshotStore, None if not done """
+        if not self.is_done(configuration):
+            return None
+        key = self.key(configuration)
+        snapshots = SnapshotStore(join(self.directory, key, 'snapshots'))
+        return self._operator_store.get(key, self.operator_names()), snapshots
+
+    """ Workers """
+
+    def number_of_workers(self, number_of_configurations):
+        """ :return: number of worker processes, capped by the cpus, the configurations and the available memory """
+        workers = min(self.max_workers or os.cpu_count() or 1, number_of_configurations)
+        if self.memory_per_worker is not None:
+            workers = min(workers, max(1, int(available_memory() // self.memory_per_worker)))
+        return max(workers, 1)
+
+    def run(self, progress=True):
+        """
+        Runs every configuration that is not done yet, an interrupted sweep resuming where it stopped
+        :param progress: print a line to stderr as each configuration finishes
+        :return: list of the configurations run
+        """
+        pending = [configuration for configuration in self.configurations() if not self.is_done(configuration)]
+        total = len(self.configurations())
+        done = total - len(pending)
+        if not pending:
+            return []
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.number_of_workers(len(pending)), mp_context=context) as executor:
+            futures = {executor.submit(run_configuration, self.build_model, configuration, self.directory,
+                                       self.key(configuration), self.n_steps, self.dense): configuration
+                       for configuration in pending}
+            for future in as_completed(futures):
+                seconds = future.result()
+                done += 1
+                if progress:
+                    print('[{}/{}] {} in {:.1f} s'.format(done, total, futures[future], seconds), file=sys.stderr)
+
+        return pending
+
+
+def run_configuration(build_model, configuration, directory, key, n_steps, dense):
+    """
+    Builds and stores the model of one configuration, discarding a partial entry of an interrupted run first. The
+    configuration.json marking the entry as done is written last.
+    :return: wall time in seconds
+    """
+    start = time.perf_counter()
+    description = json.loads(json.dumps(configuration, default=repr))  # parameters such as Materials by their repr
+    entry = join(directory, key)
+    if isdir(entry):
+        rmtree(entry)
+
+    model = build_model(**configuration)
+    if dense:
+        A, B, f = model.state_transition_model()
+        operators = {'A': A, 'B': B, 'f': f}
+    else:
+        M, K, B, f = model._time_integration.state_space_operators(*model.cached_state_space_operators())
+        operators = {'M': M, 'K': K, 'B': B, 'f': f}
+    OperatorCache(directory).put(key, operators)
+
+    snapshots = SnapshotStore(join(entry, 'snapshots'), nx=model.get_number_of_states(),
+                              metadata={'configuration': description})
+    model.simulate(n_steps, out=snapshots)
+
+    temporary_path = join(entry, 'configuration.json.tmp')
+    with open(temporary_path, 'w') as file:
+        json.dump(description, file)
+    os.replace(temporary_path, join(entry, 'configuration.json'))
+    return time.perf_counter() - start
+
+
+def available_memory():
+    """ :return: memory available to new processes in bytes, MemAvailable of /proc/meminfo on Linux """
+    if isfile('/proc/meminfo'):
+        with open('/proc/meminfo') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):  # not exposed on this platform
+        return float('inf')
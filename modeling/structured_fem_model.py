@@ -0,0 +1,351 @@
+import numpy as np
+from abc import ABC
+from scipy.sparse import coo_matrix
+from modeling.fem_model import FEMModel
+
+
+class TriangleMesh(object):
+    def __init__(self, coordinates, cells):
+        """
+        Conforming triangulation in two dimensions
+        :param coordinates: (number of vertices, 2) array of vertex positions
+        :param cells: (number of cells, 3) array of the vertex indices of each triangle
+        """
+
+        """ Check Constructor Inputs """
+        assert coordinates.ndim == 2 and coordinates.shape[1] == 2, 'coordinates must have shape (n, 2)'
+        assert cells.ndim == 2 and cells.shape[1] == 3, 'cells must have shape (m, 3)'
+
+        self._coordinates = coordinates
+        self._cells = cells
+
+    def coordinates(self):
+        """ :return: (number of vertices, 2) array of vertex positions """
+        return self._coordinates
+
+    def cells(self):
+        """ :return: (number of cells, 3) array of the vertex indices of each triangle """
+        return self._cells
+
+    def num_vertices(self):
+        return self._coordinates.shape[0]
+
+    def num_cells(self):
+        return self._cells.shape[0]
+
+    def refine(self, cell_markers):
+        """
+        Longest edge bisection of the marked cells, closed by bisecting the longest edge of every cell that has a
+        bisected edge, so the refined mesh has no hanging vertices and its angles stay bounded
+        :param cell_markers: boolean array, True for the cells to refine
+        :return: refined TriangleMesh, the vertices of this mesh keeping their indices and the edge midpoints appended
+        """
+        n, cells = self.num_vertices(), self._cells
+
+        # edge k of a cell is opposite its vertex k, edges are numbered by their sorted vertex pair
+        local_edges = np.sort(cells[:, [[1, 2], [2, 0], [0, 1]]], axis=2)
+        edges, cell_edges = np.unique(local_edges[:, :, 0] * n + local_edges[:, :, 1], return_inverse=True)
+        cell_edges = cell_edges.reshape(-1, 3)
+        edge_vertices = np.column_stack([edges // n, edges % n])
+        lengths = np.linalg.norm(np.diff(self._coordinates[edge_vertices], axis=1)[:, 0], axis=1)
+        longest = np.argmax(lengths[cell_edges], axis=1)
+        longest_edges = cell_edges[np.arange(cells.shape[0]), longest]
+
+        bisected = np.zeros((edges.shape[0],), dtype=bool)
+        bisected[longest_edges[np.asarray(cell_markers, dtype=bool)]] = True
+        while True:
+            unclosed = bisected[cell_edges].any(axis=1) & ~bisected[longest_edges]
+            if not unclosed.any():
+                break
+            bisected[longest_edges[unclosed]] = True
+
+        midpoints = np.full((edges.shape[0],), -1)
+        midpoints[bisected] = n + np.arange(np.count_nonzero(bisected))
+        coordinates = np.vstack([self._coordinates, self._coordinates[edge_vertices[bisected]].mean(axis=1)])
+
+        # rotate each refined cell to (a, b, c) with longest edge (a, b), then split it at m into (a, m, c) and
+        # (m, b, c), and those at the midpoints q of (c, a) and p of (b, c) if bisected
+        refined = bisected[longest_edges]
+        rows = np.flatnonzero(refined)
+        rotation = (longest[rows, np.newaxis] + np.arange(1, 4)) % 3
+        a, b, c = cells[rows[:, np.newaxis], rotation].T
+        m = midpoints[longest_edges[rows]]
+        p = midpoints[cell_edges[rows, rotation[:, 0]]]
+        q = midpoints[cell_edges[rows, rotation[:, 1]]]
+
+        new_cells = [cells[~refined],
+                     np.column_stack([a, m, c])[q < 0], np.column_stack([a, m, q])[q >= 0],
+                     np.column_stack([q, m, c])[q >= 0],
+                     np.column_stack([m, b, c])[p < 0], np.column_stack([m, b, p])[p >= 0],
+                     np.column_stack([m, p, c])[p >= 0]]
+        return TriangleMesh(coordinates, np.vstack(new_cells))
+
+
+class StructuredMesh(TriangleMesh):
+    def __init__(self, x0, x1, y0, y1, nx, ny):
+        """
+        Crossed structured triangulation of the rectangle [x0, x1] x [y0, y1], each of the nx by ny squares split into
+        four triangles at its center, with the vertex layout of FEniCS' RectangleMesh(..., diagonal='crossed')
+        :param x0, x1, y0, y1: rectangle limits
+        :param nx, ny: number of squares in x and y
+        """
+
+        """ Check Constructor Inputs """
+        assert x1 > x0 and y1 > y0, 'rectangle limits must be increasing'
+        assert isinstance(nx, int) and nx > 0
+        assert isinstance(ny, int) and ny > 0
+
+        self._nx = nx
+        self._ny = ny
+
+        # (nx + 1) * (ny + 1) grid vertices, x fastest, followed by the nx * ny square centers
+        x, y = np.meshgrid(np.linspace(x0, x1, nx + 1), np.linspace(y0, y1, ny + 1))
+        centers_x, centers_y = (x[:-1, :-1] + x[1:, 1:]) / 2, (y[:-1, :-1] + y[1:, 1:]) / 2
+        coordinates = np.column_stack([np.concatenate([x.ravel(), centers_x.ravel()]),
+                                       np.concatenate([y.ravel(), centers_y.ravel()])])
+
+        grid = np.arange((nx + 1) * (ny + 1)).reshape(ny + 1, nx + 1)
+        v0, v1, v2, v3 = grid[:-1, :-1].ravel(), grid[:-1, 1:].ravel(), grid[1:, :-1].ravel(), grid[1:, 1:].ravel()
+        vc = (nx + 1) * (ny + 1) + np.arange(nx * ny)
+        cells = np.stack([np.column_stack([v0, v1, vc]),
+                          np.column_stack([v0, v2, vc]),
+                          np.column_stack([v1, v3, vc]),
+                          np.column_stack([v2, v3, vc])], axis=1).reshape(-1, 3)
+
+        super().__init__(coordinates, cells)
+
+
+class StructuredFEMModel(FEMModel, ABC):
+    def __init__(self, *args, **kwargs):
+        """
+        FEMModel backend assembling P1 finite elements on a TriangleMesh, a StructuredMesh by default, with vectorized
+        element loops in numpy and scipy.sparse, so no FEniCS install is required. The state is a numpy array of the
+        vertex values, the dofs being the vertices. Coefficients are constant per cell, taking the value of the
+        component enclosing the cell midpoint, as with coefficient_space='DG' of the FEniCS models.
+        """
+        assert kwargs.get('coefficient_space') is None, 'structured models always use piecewise constant coefficients'
+        super().__init__(*args, **kwargs)
+
+        self._vertex_to_dof = np.arange(self._number_of_vertices)
+
+        """ Element Geometry """
+        if self._shared_model is not None:
+            self._cell_areas = self._shared_model._cell_areas
+            self._cell_gradients = self._shared_model._cell_gradients
+            self._element_rows = self._shared_model._element_rows
+            self._element_columns = self._shared_model._element_columns
+            self._cell_component_ids = self._shared_model._cell_component_ids
+        else:
+            cells = self._mesh.cells()
+            corners = self._mesh.coordinates()[cells]
+            e1 = corners[:, 1] - corners[:, 0]
+            e2 = corners[:, 2] - corners[:, 0]
+            determinant = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+            self._cell_areas = np.abs(determinant) / 2
+
+            # constant gradients of the three barycentric basis functions of each cell
+            gradient_1 = np.column_stack([e2[:, 1], -e2[:, 0]]) / determinant[:, np.newaxis]
+            gradient_2 = np.column_stack([-e1[:, 1], e1[:, 0]]) / determinant[:, np.newaxis]
+            self._cell_gradients = np.stack([-gradient_1 - gradient_2, gradient_1, gradient_2], axis=1)
+
+            # (row, column) of every entry of every element matrix
+            self._element_rows = np.repeat(cells[:, :, np.newaxis], 3, axis=2)
+            self._element_columns = np.repeat(cells[:, np.newaxis, :], 3, axis=1)
+
+            self._cell_component_ids, _ = self._fuel_assembly.find_components(corners.mean(axis=1))
+
+    """ Backend Methods """
+
+    @staticmethod
+    def mesh_type():
+        return TriangleMesh
+
+    @staticmethod
+    def refine_mesh(mesh, cell_markers):
+        return mesh.refine(cell_markers)
+
+    def default_mesh(self, nx, ny):
+        x0, x1, y0, y1 = self._fuel_assembly.get_domain_limits()
+        return StructuredMesh(x0, x1, y0, y1, nx, ny)
+
+    def get_number_of_states(self):
+        return self._number_of_vertices
+
+    def get_state_values(self, state):
+        return state
+
+    def set_state_values(self, state, values):
+        state[:] = values
+
+    def component_geometry_changed(self, component, regions):
+        """ reclassifies the cells whose midpoint is within regions as well, see FEMModel """
+        if self._shared_model is None:
+            cell_midpoints = self._mesh.coordinates()[self._mesh.cells()].mean(axis=1)
+            cells = np.flatnonzero(self.within_regions(cell_midpoints, regions))
+            self._cell_component_ids[cells], _ = self._fuel_assembly.find_components(cell_midpoints[cells])
+        super().component_geometry_changed(component, regions)
+
+    """ Assembly """
+
+    def cell_coefficient(self, component_value):
+        """
+        :param component_value: function returning the coefficient value within a component
+        :return: array of the coefficient value of each cell
+        """
+        component_values = np.zeros((len(self._components),))
+        for component_id in np.unique(self._cell_component_ids):
+            component_values[component_id] = component_value(self._components[component_id])
+        return component_values[self._cell_component_ids]
+
+    def cell_properties(self, *property_names):
+        """
+        :param property_names: names of Material.property_names
+        :return: array of the material property of each cell for a single property name, otherwise a tuple of them,
+        gathered from the material table of the fuel assembly, see gathered_properties
+        """
+        return self.gathered_properties(self._cell_component_ids, *property_names)
+
+    def assemble_matrix(self, element_matrices):
+        """ :return: csr_matrix summing the (number of cells, 3, 3) element matrices into the global matrix """
+        n = self._number_of_vertices
+        return coo_matrix((element_matrices.ravel(), (self._element_rows.ravel(), self._element_columns.ravel())),
+                          shape=(n, n)).tocsr()
+
+    def mass_matrix(self, cell_coefficient=None):
+        """ :return: P1 mass matrix of int c u v dx for the per cell coefficient c, 1 if None """
+        weights = self._cell_areas if cell_coefficient is None else self._cell_areas * cell_coefficient
+        reference = (np.ones((3, 3)) + np.eye(3)) / 12
+        return self.assemble_matrix(weights[:, np.newaxis, np.newaxis] * reference)
+
+    def stiffness_matrix(self, cell_coefficient=None):
+        """ :return: P1 stiffness matrix of int c grad(u) . grad(v) dx for the per cell coefficient c, 1 if None """
+        weights = self._cell_areas if cell_coefficient is None else self._cell_areas * cell_coefficient
+        element_matrices = np.einsum('cid,cjd->cij', self._cell_gradients, self._cell_gradients)
+        return self.assemble_matrix(weights[:, np.newaxis, np.newaxis] * element_matrices)
+
+    def load_vector(self, cell_coefficient=None):
+        """ :return: P1 load vector of int c v dx for the per cell coefficient c, 1 if None """
+        weights = self._cell_areas if cell_coefficient is None else self._cell_areas * cell_coefficient
+        return np.bincount(self._mesh.cells().ravel(), weights=np.repeat(weights / 3, 3),
+                           minlength=self._number_of_vertices)
+
+
+class StructuredHeatExchangerModel(StructuredFEMModel):
+    """ HeatExchangerFEMModel on the structured backend """
+    _source_component_sets = ('controllable_q_dot', 'set_q_dot')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._T0 = 500
+
+        self._Tn = np.full((self._number_of_vertices,), self._T0, dtype=float)  # Temperature at T(n)
+        self._Tn1_solution = np.empty((self._number_of_vertices,))  # preallocated solution at T(n+1)
+        self._rhs_matrix = None  # backward Euler right-hand side matrix, rebuilt by update_coefficients
+
+        self.setup_problem()
+
+    def setup_problem(self):
+        self._lhs_factorization = None
+
+    def step_time(self):
+        return self.solve_time_step(self._Tn, self._Tn1_solution)
+
+    def heat_capacity_matrix(self):
+        """ :return: mass matrix of rho * cp / dt """
+        rho, cp = self.cell_properties('density', 'specific_heat_capacity')
+        return self.mass_matrix(rho * cp / self._dt)
+
+    def update_coefficients(self):
+        self._rhs_matrix = - self.heat_capacity_matrix()
+
+    def assemble_lhs(self):
+        k = self.cell_properties('thermal_conductivity')
+        return - self.heat_capacity_matrix() - self.stiffness_matrix(k)
+
+    def assemble_rhs(self):
+        q_dot = self.cell_coefficient(lambda component: component.get_volumetric_power_density())
+        return self._rhs_matrix @ self._Tn - self.load_vector(q_dot)
+
+    def set_volumetric_power_density(self, component, power_density):
+        component.set_volumetric_power_density(power_density)
+
+    def get_component_source(self, component):
+        return component.get_volumetric_power_density()
+
+    def set_component_source(self, component, source):
+        self.set_volumetric_power_density(component, source)
+
+    def rhs_operators(self):
+        return - self.heat_capacity_matrix(), - self.load_vector()
+
+    def state_space_matrices(self):
+        """ see FEMModel.state_space_matrices """
+        K, load = self.rhs_operators()
+        B = self.component_set_load_matrix('controllable_q_dot', load)
+        return self.assemble_lhs(), K, B, self.fixed_source_load_matrix(load)
+
+
+class StructuredNeutronicsModel(StructuredFEMModel):
+    """ NuclearReactorNeutronicsFEMModel on the structured backend """
+    _source_component_sets = ('control_rods',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # see NuclearReactorNeutronicsFEMModel
+        self._PHI0 = 6.5e19 / 3.154e7
+        self._v_n = 1.
+        self._nu = 2.5
+
+        self._PHIn = np.full((self._number_of_vertices,), self._PHI0)  # Neutron Flux at Phi(n)
+        self._PHIn1_solution = np.empty((self._number_of_vertices,))  # preallocated solution at Phi(n+1)
+        self._rhs_matrix = None  # backward Euler right-hand side matrix, rebuilt by update_coefficients
+
+        self.setup_problem()
+
+    def setup_problem(self):
+        self._lhs_factorization = None
+
+    def step_time(self):
+        return self.solve_time_step(self._PHIn, self._PHIn1_solution)
+
+    def update_coefficients(self):
+        self._rhs_matrix = - self.mass_matrix() / self._v_n / self._dt
+
+    def assemble_lhs(self):
+        D, Sigma_a, Sigma_f = self.cell_properties('diffusion_length', 'absorption_macroscopic_cross_section',
+                                                   'fission_macroscopic_cross_section')
+        return - self.mass_matrix() / self._v_n / self._dt - self.stiffness_matrix(D) \
+            + self.mass_matrix(self._nu * Sigma_f - Sigma_a)
+
+    def assemble_rhs(self):
+        S = self.cell_coefficient(lambda component: component.get_volumetric_neutron_source())
+        return self._rhs_matrix @ self._PHIn - self.load_vector(S)
+
+    def set_volumetric_neutron_source(self, component, neutron_source):
+        component.set_volumetric_neutron_source(neutron_source)
+
+    def get_component_source(self, component):
+        return component.get_volumetric_neutron_source()
+
+    def set_component_source(self, component, source):
+        self.set_volumetric_neutron_source(component, source)
+
+    def rhs_operators(self):
+        return - self.mass_matrix() / self._v_n / self._dt, - self.load_vector()
+
+    def state_space_matrices(self):
+        """ see FEMModel.state_space_matrices """
+        K, load = self.rhs_operators()
+        B = self.component_set_load_matrix('control_rods', load)
+        return self.assemble_lhs(), K, B, self.fixed_source_load_matrix(load)
+
+    def criticality_operators(self):
+        """ see FEMModel.criticality_operators """
+        D, Sigma_a = self.cell_properties('diffusion_length', 'absorption_macroscopic_cross_section')
+        return self.stiffness_matrix(D) + self.mass_matrix(Sigma_a), self._nu * self.fission_rate_matrix()
+
+    def fission_rate_matrix(self):
+        """ :return: sparse mass matrix of Sigma_f, mapping the flux to the fission rate load """
+        return self.mass_matrix(self.cell_properties('fission_macroscopic_cross_section'))
@@ -1,5 +1,3 @@
-import numpy as np
-from scipy.sparse import csr_matrix
 from abc import ABC
 from modeling.fem_model import FEMModel
 from fenics import *
@@ -8,28 +6,34 @@ from fenics import *
 class HeatEquationModel(FEMModel, ABC):
     class K(FEMModel.Coefficient):
         """Fenics implementation for positionally dependent thermal conductivity"""
+        material_property = 'thermal_conductivity'
 
-        def eval(self, value, vertex):
-            value[0] = self._component_hash_map.find_component(tuple(vertex)).get_material().get_thermal_conductivity()
+        @staticmethod
+        def component_value(component):
+            return component.get_material().get_thermal_conductivity()
 
     class Rho(FEMModel.Coefficient):
         """Fenics implementation for positionally dependent density"""
+        material_property = 'density'
 
-        def eval(self, value, vertex):
-            value[0] = self._component_hash_map.find_component(tuple(vertex)).get_material().get_density()
+        @staticmethod
+        def component_value(component):
+            return component.get_material().get_density()
 
     class Cp(FEMModel.Coefficient):
         """Fenics implementation for positionally dependent specific heat capacity"""
+        material_property = 'specific_heat_capacity'
 
-        def eval(self, value, vertex):
-            value[0] = self._component_hash_map.find_component(
-                tuple(vertex)).get_material().get_specific_heat_capacity()
+        @staticmethod
+        def component_value(component):
+            return component.get_material().get_specific_heat_capacity()
 
     class q_dot(FEMModel.Coefficient):
         """Fenics implementation for positionally dependent volumetric power density"""
 
-        def eval(self, value, vertex):
-            value[0] = self._component_hash_map.find_component(tuple(vertex)).get_volumetric_power_density()
+        @staticmethod
+        def component_value(component):
+            return component.get_volumetric_power_density()
 
 
 class UniformPowerAndHeatSinkTemperatureFEMModel(HeatEquationModel):
@@ -37,7 +41,7 @@ class UniformPowerAndHeatSinkTemperatureFEMModel(HeatEquationModel):
         super().__init__(*args, **kwargs)
 
         """ Fenics Problem Formulation """
-        self._V = FunctionSpace(self._mesh, 'P', 1)
+        self._V = self.function_space()
 
         self._Tn1 = TrialFunction(self._V)  # Temperature at T(n+1)
         self._v = TestFunction(self._V)  # weighting function
@@ -49,16 +53,22 @@ class UniformPowerAndHeatSinkTemperatureFEMModel(HeatEquationModel):
         self._T0 = Constant(500)
 
         self._Tn = project(self._T0, self._V)  # Temperature at T(n)
+        self._Tn1_solution = Function(self._V)  # preallocated solution at T(n+1)
 
         # positionally dependent coefficients
-        self._k = self.K(self._component_hash_map)
-        self._rho = self.Rho(self._component_hash_map)
-        self._cp = self.Cp(self._component_hash_map)
+        self._k = self.coefficient(self.K)
+        self._rho = self.coefficient(self.Rho)
+        self._cp = self.coefficient(self.Cp)
 
         self._a, self._L = None, None
 
         self.setup_problem()
 
+    def update_coefficients(self):
+        self.update_coefficient(self._k, self.K)
+        self.update_coefficient(self._rho, self.Rho)
+        self.update_coefficient(self._cp, self.Cp)
+
     def setup_problem(self):
         F = self._rho * self._cp / self._dt * (self._Tn1 - self._Tn) * self._v * dx \
             + self._k * dot(grad(self._Tn1), grad(self._v)) * dx \
@@ -66,12 +76,10 @@ class UniformPowerAndHeatSinkTemperatureFEMModel(HeatEquationModel):
             - self._uniform_boundary_power_flux * self._v * ds
 
         self._a, self._L = lhs(F), rhs(F)
+        self._lhs_factorization = None
 
     def step_time(self):
-        Tn1 = Function(self._V)
-        solve(self._a == self._L, Tn1)
-        self._Tn.assign(Tn1)
-        return Tn1
+        return self.solve_time_step(self._Tn, self._Tn1_solution)
 
     def set_uniform_power_density(self, power_density):
         self._uniform_power_density = Constant(power_density)
@@ -83,11 +91,13 @@ class UniformPowerAndHeatSinkTemperatureFEMModel(HeatEquationModel):
 
 
 class HeatExchangerFEMModel(HeatEquationModel):
+    _source_component_sets = ('controllable_q_dot', 'set_q_dot')
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         """ Fenics Problem Formulation """
-        self._V = FunctionSpace(self._mesh, 'P', 1)
+        self._V = self.function_space()
 
         self._Tn1 = TrialFunction(self._V)  # Temperature at T(n+1)
         self._v = TestFunction(self._V)  # weighting function
@@ -95,17 +105,26 @@ class HeatExchangerFEMModel(HeatEquationModel):
         self._T0 = Constant(500)
 
         self._Tn = project(self._T0, self._V)  # Temperature at T(n)
+        self._Tn1_solution = Function(self._V)  # preallocated solution at T(n+1)
 
         # positionally dependent coefficients and variables
-        self._k = self.K(self._component_hash_map)
-        self._rho = self.Rho(self._component_hash_map)
-        self._cp = self.Cp(self._component_hash_map)
-        self._q_dot = self.q_dot(self._component_hash_map)
+        self._k = self.coefficient(self.K)
+        self._rho = self.coefficient(self.Rho)
+        self._cp = self.coefficient(self.Cp)
+        self._q_dot = self.coefficient(self.q_dot)
 
         self._a, self._L = None, None
 
         self.setup_problem()
 
+    def update_coefficients(self):
+        self.update_coefficient(self._k, self.K)
+        self.update_coefficient(self._rho, self.Rho)
+        self.update_coefficient(self._cp, self.Cp)
+
+    def update_source_coefficients(self):
+        self.update_coefficient(self._q_dot, self.q_dot)
+
     def setup_problem(self):
         F = - self._rho * self._cp / self._dt * self._Tn1 * self._v * dx \
             - self._k * dot(grad(self._Tn1), grad(self._v)) * dx \
@@ -113,43 +132,35 @@ class HeatExchangerFEMModel(HeatEquationModel):
             + self._q_dot * self._v * dx
 
         self._a, self._L = lhs(F), rhs(F)
+        self._lhs_factorization = None
 
     def step_time(self):
-        Tn1 = Function(self._V)
-        solve(self._a == self._L, Tn1)
-        self._Tn.assign(Tn1)
-        return Tn1
+        return self.solve_time_step(self._Tn, self._Tn1_solution)
 
-    def state_transition_model(self):
-        M = assemble(
-            - self._rho * self._cp / self._dt * self._Tn1 * self._v * dx
-            - self._k * dot(grad(self._Tn1), grad(self._v)) * dx
-        ).array()
-        M_inverse = np.linalg.inv(M)
+    def set_volumetric_power_density(self, component, power_density):
+        """ sets the volumetric power density of component, the q_dot field is refreshed on the next step """
+        component.set_volumetric_power_density(power_density)
 
-        K = assemble(
-            - self._rho * self._cp / self._dt * self._Tn1 * self._v * dx
-        ).array()
+    def get_component_source(self, component):
+        return component.get_volumetric_power_density()
 
-        A = np.dot(M_inverse, K)
+    def set_component_source(self, component, source):
+        self.set_volumetric_power_density(component, source)
 
-        v = assemble(- self._v * dx).get_local()
-
-        q_dot_controllable_set = self._fuel_assembly.get_component_set('controllable_q_dot')
+    def rhs_operators(self):
+        K = self.assemble_sparse(- self._rho * self._cp / self._dt * self._Tn1 * self._v * dx)
+        load = assemble(- self._v * dx).get_local()
+        return K, load
 
-        B = np.zeros((A.shape[0], len(q_dot_controllable_set)))
-        for component_index, component in zip(range(len(q_dot_controllable_set)), q_dot_controllable_set):
-            vs = self.get_vertices_of_component(component)
-            B[vs, component_index] = 1
-        B = np.dot(M_inverse, np.multiply(v[:, np.newaxis], B))
+    def state_space_matrices(self):
+        """ see FEMModel.state_space_matrices """
+        M_form = - self._rho * self._cp / self._dt * self._Tn1 * self._v * dx \
+                 - self._k * dot(grad(self._Tn1), grad(self._v)) * dx
+        K_form = - self._rho * self._cp / self._dt * self._Tn1 * self._v * dx
 
-        q_dot_uncontrollable_set = self._fuel_assembly.get_component_set('set_q_dot')
-
-        f = np.zeros((A.shape[0],))
-        for component_index, component in zip(range(len(q_dot_controllable_set)), q_dot_uncontrollable_set):
-            vs = self.get_vertices_of_component(component)
-            f[vs] = component.get_volumetric_power_density()
+        v = assemble(- self._v * dx).get_local()
 
-        f = np.dot(M_inverse, np.multiply(v, f))
+        B = self.component_set_load_matrix('controllable_q_dot', v)
+        F = self.fixed_source_load_matrix(v)
 
-        return A, B, f
+        return self.assemble_sparse(M_form), self.assemble_sparse(K_form), B, F
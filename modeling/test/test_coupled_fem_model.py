@@ -0,0 +1,68 @@
+import numpy as np
+from unittest import TestCase
+from assembly_construction.component_assembly import ComponentAssembly
+from assembly_construction.component import UnshapedComponent
+from assembly_construction.rod import Rod
+from assembly_construction.material import Material
+from modeling.coupled_fem_model import ThermalNeutronicFEMModel
+from modeling.structured_fem_model import StructuredHeatExchangerModel, StructuredNeutronicsModel
+from modeling.time_integration import BDF2, CrankNicolson
+
+
+def reactor_assembly():
+    fuel = Material(thermal_conductivity=1., density=1., specific_heat_capacity=1., diffusion_length=1.,
+                    absorption_macroscopic_cross_section=1., fission_macroscopic_cross_section=0.3)
+    rod_material = Material(thermal_conductivity=2., density=1., specific_heat_capacity=1., diffusion_length=1.,
+                            absorption_macroscopic_cross_section=2., fission_macroscopic_cross_section=0.)
+    fa = ComponentAssembly(default_component=UnshapedComponent(material=fuel))
+    fa.add_component(Rod(-0.5, 0, 0.3, material=rod_material), component_set='control_rods')
+    fa.add_component(Rod(0.5, 0, 0.3, material=rod_material), component_set='controllable_q_dot')
+    return fa
+
+
+def coupled_model(**kwargs):
+    return ThermalNeutronicFEMModel(reactor_assembly(), 0.05, heat_model_class=StructuredHeatExchangerModel,
+                                    neutronics_model_class=StructuredNeutronicsModel, nx=6, ny=6, **kwargs)
+
+
+class TestThermalNeutronicFEMModel(TestCase):
+    def test_shared_discretization(self):
+        model = coupled_model()
+        heat_model, neutronics_model = model.get_heat_model(), model.get_neutronics_model()
+        assert neutronics_model._mesh is heat_model._mesh
+        assert neutronics_model._vertex_hash_map is heat_model._vertex_hash_map
+        assert neutronics_model._cell_areas is heat_model._cell_areas
+
+    def test_fission_power(self):
+        model = coupled_model(energy_per_fission=0)
+        uncoupled = StructuredHeatExchangerModel(reactor_assembly(), 0.05, nx=6, ny=6)
+        for i in range(3):
+            temperature, flux = model.step_time()
+            assert np.linalg.norm(temperature - uncoupled.step_time()) < 1e-10 * np.linalg.norm(temperature)
+
+        heated = coupled_model(energy_per_fission=1e-12)
+        for i in range(3):
+            heated_temperature, heated_flux = heated.step_time()
+        assert np.all(heated_temperature > temperature) and np.allclose(heated_flux, flux)
+
+    def test_state_transition_model(self):
+        for time_integration in [None, CrankNicolson(), BDF2()]:
+            kwargs = {} if time_integration is None else {'time_integration': time_integration}
+            model = coupled_model(energy_per_fission=1e-12, **kwargs)
+            heat_model, neutronics_model = model.get_heat_model(), model.get_neutronics_model()
+            history = 1 if time_integration is None else time_integration.history
+
+            A, B, f = model.state_transition_model()
+            A_operator, B_operator, f_solved = model.state_transition_model(sparse=True)
+            assert A.shape == (history * model.get_number_of_states(),) * 2
+
+            x = np.concatenate([heat_model._Tn, neutronics_model._PHIn])
+            if history > 1:  # the first step of the multistep scheme is its startup step
+                x = np.concatenate([np.concatenate(model.step_time()), x])
+            u = np.zeros((2,))
+            for i in range(3):
+                x_sparse = A_operator @ x + B_operator @ u + f_solved
+                x = A @ x + B @ u + f
+                assert np.linalg.norm(x - x_sparse) / np.linalg.norm(x) < 1e-10
+                assert np.linalg.norm(np.concatenate(model.step_time()) - x[:model.get_number_of_states()]) \
+                    < 1e-10 * np.linalg.norm(x)
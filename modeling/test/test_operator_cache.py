@@ -0,0 +1,94 @@
+import numpy as np
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+from assembly_construction.component_assembly import ComponentAssembly
+from assembly_construction.component import UnshapedComponent
+from assembly_construction.rod import Rod
+from assembly_construction.material import Material
+from modeling.operator_cache import OperatorCache
+from modeling.structured_fem_model import StructuredHeatExchangerModel
+
+
+def heat_exchanger_assembly(thermal_conductivity=1.):
+    material = Material(thermal_conductivity=thermal_conductivity, specific_heat_capacity=1., density=1.)
+    fa = ComponentAssembly(default_component=UnshapedComponent(material=material))
+    fa.add_component(Rod(0.3, 0, 0.2, material=material), component_set='set_q_dot')
+    fa.add_component(Rod(-0.3, 0, 0.2, material=material), component_set='controllable_q_dot')
+    fa.get_component_set('set_q_dot')[0].set_volumetric_power_density(1000)
+    return fa
+
+
+def cached_model(fa, operator_cache, dt=1):
+    """ :return: model of fa and the number of find_components calls while building it """
+    with patch.object(fa, 'find_components', wraps=fa.find_components) as find_components:
+        model = StructuredHeatExchangerModel(fa, dt, nx=6, ny=6, operator_cache=operator_cache)
+    return model, find_components.call_count
+
+
+def assert_operators_equal(operators, expected_operators):
+    M, K, B, f = operators
+    M_expected, K_expected, B_expected, f_expected = expected_operators
+    assert all(abs(X - X_expected).max() < 1e-12 for X, X_expected in [(M, M_expected), (K, K_expected),
+                                                                      (B, B_expected)])
+    assert np.allclose(f, f_expected)
+
+
+class TestOperatorCache(TestCase):
+    def test_hit(self):
+        with TemporaryDirectory() as directory:
+            operator_cache = OperatorCache(directory)
+            model, uncached_calls = cached_model(heat_exchanger_assembly(), operator_cache)
+            operators = model.cached_state_space_operators()
+
+            # an identical model loads the vertex classification and the matrices
+            model, calls = cached_model(heat_exchanger_assembly(), operator_cache)
+            assert calls == uncached_calls - 1  # the structured backend still classifies the cell midpoints
+            with patch.object(model, 'state_space_matrices', side_effect=AssertionError('cache miss')):
+                assert_operators_equal(model.cached_state_space_operators(), operators)
+
+    def test_material_change_misses(self):
+        with TemporaryDirectory() as directory:
+            operator_cache = OperatorCache(directory)
+            model = cached_model(heat_exchanger_assembly(), operator_cache)[0]
+            model.cached_state_space_operators()
+
+            model = cached_model(heat_exchanger_assembly(thermal_conductivity=2.), operator_cache)[0]
+            assert model.cache_key() != cached_model(heat_exchanger_assembly(), None)[0].cache_key()
+            assert_operators_equal(model.cached_state_space_operators(), model.state_space_operators())
+
+    def test_source_change_reuses_classification(self):
+        with TemporaryDirectory() as directory:
+            operator_cache = OperatorCache(directory)
+            model, uncached_calls = cached_model(heat_exchanger_assembly(), operator_cache)
+            model.cached_state_space_operators()
+
+            # the sources are not part of the key, the affine term f is computed from the current sources
+            fa = heat_exchanger_assembly()
+            fa.get_component_set('set_q_dot')[0].set_volumetric_power_density(2000)
+            fa.get_component_set('controllable_q_dot')[0].set_volumetric_power_density(-500)
+            source_model, calls = cached_model(fa, operator_cache)
+            assert source_model.cache_key() == model.cache_key()
+            assert calls == uncached_calls - 1
+            with patch.object(source_model, 'state_space_matrices', side_effect=AssertionError('cache miss')):
+                operators = source_model.cached_state_space_operators()
+            assert_operators_equal(operators, source_model.state_space_operators())
+            assert np.allclose(operators[3], 2 * model.state_space_operators()[3])
+
+    def test_dt_change_reuses_classification(self):
+        with TemporaryDirectory() as directory:
+            operator_cache = OperatorCache(directory)
+            model, uncached_calls = cached_model(heat_exchanger_assembly(), operator_cache)
+
+            # the vertex classification does not depend on dt, the operators do
+            dt_model, calls = cached_model(heat_exchanger_assembly(), operator_cache, dt=0.5)
+            assert calls == uncached_calls - 1
+            assert dt_model.classification_cache_key() == model.classification_cache_key()
+            assert dt_model.cache_key() != model.cache_key()
+
+    def test_class_key(self):
+        # classes of equal name in different modules have different keys
+        first_class = type('Model', (), {'__module__': 'first_backend'})
+        second_class = type('Model', (), {'__module__': 'second_backend'})
+        assert OperatorCache.key(first_class) != OperatorCache.key(second_class)
+        assert OperatorCache.key(first_class) == OperatorCache.key(type('Model', (), {'__module__': 'first_backend'}))
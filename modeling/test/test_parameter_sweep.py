@@ -0,0 +1,36 @@
+import numpy as np
+from os import remove
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from modeling.parameter_sweep import ParameterSweep
+from modeling.structured_fem_model import StructuredHeatExchangerModel
+from modeling.test.test_structured_fem_model import heat_exchanger_assembly
+
+
+def build_heat_exchanger_model(dt, nx):
+    return StructuredHeatExchangerModel(heat_exchanger_assembly(), dt, nx=nx, ny=nx)
+
+
+class TestParameterSweep(TestCase):
+    def test_run_and_resume(self):
+        with TemporaryDirectory() as directory:
+            sweep = ParameterSweep(build_heat_exchanger_model, {'dt': [0.5, 1], 'nx': [3, 4]}, directory, n_steps=3,
+                                   max_workers=2, memory_per_worker=1e6)
+            assert len(sweep.configurations()) == 4
+            assert len(sweep.run(progress=False)) == 4
+
+            for configuration in sweep.configurations():
+                (A, B, f), snapshots = sweep.load(configuration)
+                model = build_heat_exchanger_model(**configuration)
+                A_expected, B_expected, f_expected = model.state_transition_model()
+                assert np.allclose(A, A_expected) and np.allclose(B, B_expected) and np.allclose(f, f_expected)
+                assert np.allclose(snapshots.to_array(), model.simulate(3))
+
+            # a second run resumes, only redoing the configuration whose entry is incomplete
+            assert sweep.run(progress=False) == []
+            unfinished = sweep.configurations()[2]
+            open(join(directory, sweep.key(unfinished), 'snapshots', 'chunk_000000.npy'), 'w').close()
+            remove(join(directory, sweep.key(unfinished), 'configuration.json'))
+            assert sweep.run(progress=False) == [unfinished]
+            assert sweep.load(unfinished)[1].shape[1] == 3
@@ -0,0 +1,263 @@
+import numpy as np
+from scipy.sparse import issparse
+from unittest import TestCase
+from unittest.mock import patch
+from assembly_construction.component_assembly import ComponentAssembly
+from assembly_construction.component import UnshapedComponent
+from assembly_construction.rod import Rod
+from assembly_construction.material import Material
+from modeling.structured_fem_model import StructuredMesh, StructuredHeatExchangerModel, StructuredNeutronicsModel, \
+    TriangleMesh
+
+
+def heat_exchanger_assembly():
+    material = Material(thermal_conductivity=1., specific_heat_capacity=1., density=1.)
+    fa = ComponentAssembly(default_component=UnshapedComponent(material=material))
+
+    heating_rod = Rod(0.3, 0, 0.2, material=material)
+    heating_rod.set_volumetric_power_density(1000)
+    fa.add_component(heating_rod, component_set='set_q_dot')
+
+    cooling_rod = Rod(-0.3, 0, 0.2, material=material)
+    cooling_rod.set_volumetric_power_density(-1000)
+    fa.add_component(cooling_rod, component_set='controllable_q_dot')
+    return fa
+
+
+class TestStructuredMesh(TestCase):
+    def test_structured_mesh(self):
+        mesh = StructuredMesh(-1, 1, 0, 2, 3, 4)
+        assert mesh.num_vertices() == 4 * 5 + 3 * 4
+        assert mesh.num_cells() == 4 * 3 * 4
+
+        corners = mesh.coordinates()[mesh.cells()]
+        e1 = corners[:, 1] - corners[:, 0]
+        e2 = corners[:, 2] - corners[:, 0]
+        areas = np.abs(e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]) / 2
+        assert np.all(areas > 0)
+        assert abs(areas.sum() - 4) < 1e-12
+
+
+class TestTriangleMesh(TestCase):
+    def test_refine(self):
+        mesh = StructuredMesh(0, 1, 0, 1, 3, 3)
+        for i in range(4):
+            mesh = mesh.refine(np.arange(mesh.num_cells()) % 5 == i)
+            assert isinstance(mesh, TriangleMesh)
+
+            coordinates, cells = mesh.coordinates(), mesh.cells()
+            e1 = coordinates[cells[:, 1]] - coordinates[cells[:, 0]]
+            e2 = coordinates[cells[:, 2]] - coordinates[cells[:, 0]]
+            areas = np.abs(e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]) / 2
+            assert abs(areas.sum() - 1) < 1e-12 and areas.min() > 0
+
+            # conforming: interior edges are shared by two cells, boundary edges belong to one
+            edges, counts = np.unique(np.sort(cells[:, [[1, 2], [2, 0], [0, 1]]], axis=2).reshape(-1, 2), axis=0,
+                                      return_counts=True)
+            midpoints = coordinates[edges].mean(axis=1)
+            on_boundary = np.any(np.isclose(midpoints, 0) | np.isclose(midpoints, 1), axis=1)
+            assert np.all(counts[on_boundary] == 1) and np.all(counts[~on_boundary] == 2)
+
+
+class TestStructuredHeatExchangerModel(TestCase):
+    def setUp(self):
+        self.model = StructuredHeatExchangerModel(heat_exchanger_assembly(), 1, nx=8, ny=8)
+
+    def test_assembly(self):
+        mass = self.model.mass_matrix()
+        stiffness = self.model.stiffness_matrix()
+        x = self.model._mesh.coordinates()[:, 0]
+
+        assert abs(mass.sum() - 4) < 1e-12
+        assert abs(self.model.load_vector().sum() - 4) < 1e-12
+        assert np.abs(stiffness @ np.ones_like(x)).max() < 1e-12
+        assert abs(x @ stiffness @ x - 4) < 1e-12  # int |grad x|^2 dx over the domain
+
+    def test_cell_properties(self):
+        rho, cp = self.model.cell_properties('density', 'specific_heat_capacity')
+        k = self.model.cell_properties('thermal_conductivity')
+        components = [self.model._components[component_id] for component_id in self.model._cell_component_ids]
+        assert np.array_equal(k, [component.get_material().get_thermal_conductivity() for component in components])
+        assert np.array_equal(rho * cp, [component.get_material().get_density()
+                                         * component.get_material().get_specific_heat_capacity()
+                                         for component in components])
+
+    def test_missing_property(self):
+        fa = heat_exchanger_assembly()
+        fa.add_component(Rod(5, 5, 0.2, material=Material()))  # outside the mesh, its material is not gathered
+        model = StructuredHeatExchangerModel(fa, 1, nx=8, ny=8)
+        assert model.cell_properties('density').shape == (model._cell_component_ids.shape[0],)
+
+        rod = fa.get_component_set('controllable_q_dot')[0]
+        fa.set_component_material(rod, Material(thermal_conductivity=1., specific_heat_capacity=1.))
+        with self.assertRaisesRegex(AssertionError, r'Rod \(component id 1\) within the mesh must set density'):
+            model.step_time()
+
+    def test_mesh_refinement(self):
+        def rod_area_error(model):
+            rod = model._fuel_assembly.get_component_set('controllable_q_dot')[0]
+            in_rod = [model._components[component_id] is rod for component_id in model._cell_component_ids]
+            return abs(model._cell_areas[in_rod].sum() - np.pi * 0.2 ** 2)
+
+        refined = StructuredHeatExchangerModel(heat_exchanger_assembly(), 1, nx=8, ny=8, mesh_refinement=8)
+        uniform = StructuredHeatExchangerModel(heat_exchanger_assembly(), 1, nx=128, ny=128)
+        assert refined.get_number_of_states() < 0.05 * uniform.get_number_of_states()
+        assert rod_area_error(refined) <= rod_area_error(uniform) + 1e-12
+
+        vertex_component_ids, _ = refined._fuel_assembly.find_components(refined._mesh.coordinates())
+        assert np.array_equal(refined.get_vertex_component_ids(), vertex_component_ids)
+
+    def test_output_operator(self):
+        fa = self.model._fuel_assembly
+        heating_rod = fa.get_component_set('set_q_dot')[0]
+        dofs = self.model.get_dofs_of_component(heating_rod)
+        x = np.random.random((self.model.get_number_of_states(),))
+
+        C = self.model.output_operator('set_q_dot')
+        assert C.format == 'csr' and C.shape == (1, x.shape[0]) and C.nnz == len(dofs)
+        assert abs(C @ x - x[dofs].mean()) < 1e-12
+
+        C = self.model.output_operator([heating_rod] + fa.get_component_set('controllable_q_dot'), reduction='select')
+        assert C.shape[0] == C.nnz
+        assert np.array_equal((C @ x)[:len(dofs)], x[dofs])
+
+    def test_state_transition_model(self):
+        A, B, f = self.model.state_transition_model()
+        A_operator, B_operator, f_solved = self.model.state_transition_model(sparse=True)
+
+        x = np.random.random((A.shape[0],))
+        u = np.random.random((B.shape[1],))
+        assert np.linalg.norm(A @ x - A_operator @ x) < 1e-8
+        assert np.linalg.norm(B @ u - B_operator @ u) < 1e-8
+        assert np.linalg.norm(f - f_solved) < 1e-8
+
+        # the affine right-hand side steps the same model
+        u = np.array([-1000.])
+        x = np.full((A.shape[0],), 500.)
+        for i in range(3):
+            x = A @ x + B @ u + f
+        self.model.apply_actuation(u)
+        X = self.model.simulate(3)
+        assert np.linalg.norm(X[:, -1] - x) / np.linalg.norm(x) < 1e-10
+
+    def test_sparse_actuation_matrix(self):
+        M, K, B, f = self.model.state_space_operators()
+        assert issparse(B) and B.shape == (self.model.get_number_of_states(), 1)
+        rod = self.model._fuel_assembly.get_component_set('controllable_q_dot')[0]
+        assert set(B.tocoo().row) == set(self.model.get_dofs_of_component(rod))
+
+        A, B_dense, f = self.model.state_transition_model()
+        assert type(B_dense) is np.ndarray
+        assert np.linalg.norm(B_dense - np.linalg.solve(M.toarray(), B.toarray())) < 1e-8 * np.linalg.norm(B_dense)
+
+    def test_fixed_source_change(self):
+        def assert_steps_model(u):
+            x = self.model.get_state_values(self.model._Tn).copy()
+            A, B, f = self.model.state_transition_model()
+            assert np.linalg.norm(self.model.step_time() - (A @ x + B @ u + f)) / np.linalg.norm(x) < 1e-10
+
+        fa = self.model._fuel_assembly
+        u = np.array([-500.])
+        self.model.apply_actuation(u)
+        assert_steps_model(u)
+        assert fa.get_component_set('controllable_q_dot')[0].get_volumetric_power_density() == -1000
+
+        # a fixed source set between actuations enters the next affine right-hand side
+        fa.get_component_set('set_q_dot')[0].set_volumetric_power_density(2000)
+        self.model.apply_actuation(u)
+        assert_steps_model(u)
+
+        # the actuation is written into the actuated components when returning to the assembled right-hand side
+        self.model.apply_actuation(None)
+        assert fa.get_component_set('controllable_q_dot')[0].get_volumetric_power_density() == -500
+        assert self.model.get_actuation() is None
+
+    def test_source_coefficients_refreshed(self):
+        # precomputed source coefficients are rewritten on the next assembled step after any source setter
+        with patch.object(self.model, 'update_source_coefficients') as update_source_coefficients:
+            self.model.step_time()
+            self.model.step_time()
+            assert update_source_coefficients.call_count == 1
+
+            self.model._fuel_assembly.get_component_set('set_q_dot')[0].set_volumetric_power_density(2000)
+            self.model.step_time()
+            assert update_source_coefficients.call_count == 2
+
+    def test_material_changed(self):
+        # a material set on a component directly invalidates the coefficients and the factorization like one set
+        # through the assembly
+        material = Material(thermal_conductivity=5., specific_heat_capacity=2., density=1.)
+        model = StructuredHeatExchangerModel(heat_exchanger_assembly(), 1, nx=8, ny=8)
+        for stepped_model in [self.model, model]:
+            stepped_model.apply_actuation(np.array([-1000.]))
+            stepped_model.step_time()
+
+        self.model._fuel_assembly.get_component_set('set_q_dot')[0].set_material(material)
+        model._fuel_assembly.set_component_material(model._fuel_assembly.get_component_set('set_q_dot')[0], material)
+        x, x_expected = self.model.step_time(), model.step_time()
+        assert np.linalg.norm(x - x_expected) / np.linalg.norm(x_expected) < 1e-12
+        A, B, f = model.state_transition_model()
+        assert np.linalg.norm(self.model.state_transition_model()[0] - A) / np.linalg.norm(A) < 1e-12
+
+    def test_component_geometry_changed(self):
+        u = np.array([-1000.])
+        self.model.apply_actuation(u)
+        self.model.step_time()
+
+        fa = self.model._fuel_assembly
+        rod = fa.get_component_set('controllable_q_dot')[0]
+        fa.move_component(rod, -0.4, 0.1)
+        fa.edit_component(rod, lambda edited_rod: edited_rod.set_radius(0.25))
+        model = StructuredHeatExchangerModel(fa, 1, nx=8, ny=8)
+        assert np.array_equal(self.model._vertex_component_ids, model._vertex_component_ids)
+        assert np.array_equal(self.model._cell_component_ids, model._cell_component_ids)
+        assert all(np.array_equal(self.model.get_vertices_of_component(component), vertices)
+                   for component, vertices in model._vertex_hash_map.items())
+
+        # the next step uses the operators of the edited geometry
+        x = self.model.get_state_values(self.model._Tn).copy()
+        A, B, f = model.state_transition_model()
+        assert np.linalg.norm(self.model.step_time() - (A @ x + B @ u + f)) / np.linalg.norm(x) < 1e-10
+
+
+class TestStructuredNeutronicsModel(TestCase):
+    def test_step_time(self):
+        material = Material(diffusion_length=1., absorption_macroscopic_cross_section=1.,
+                            fission_macroscopic_cross_section=0.1)
+        fa = ComponentAssembly(default_component=UnshapedComponent(material=material))
+        fa.add_component(Rod(0, 0, 0.3, material=material), component_set='control_rods')
+        model = StructuredNeutronicsModel(fa, 1, nx=4, ny=4)
+
+        A, B, f = model.state_transition_model()
+        x = model._PHIn.copy()
+        assert np.linalg.norm(model.step_time() - A @ x) / np.linalg.norm(x) < 1e-10
+
+    def test_k_effective(self):
+        material = Material(diffusion_length=1., absorption_macroscopic_cross_section=1.,
+                            fission_macroscopic_cross_section=0.3)
+        fa = ComponentAssembly(default_component=UnshapedComponent(material=material))
+        rod = Rod(0, 0, 0.3, material=material)
+        fa.add_component(rod, component_set='control_rods')
+        model = StructuredNeutronicsModel(fa, 1, nx=8, ny=8)
+
+        # homogeneous medium with zero flux gradient at the boundary, k = nu Sigma_f / Sigma_a and a flat mode
+        k, mode = model.k_effective()
+        assert abs(k - 2.5 * 0.3) < 1e-8
+        assert np.abs(mode - 1).max() < 1e-6
+
+        absorber = Material(diffusion_length=1., absorption_macroscopic_cross_section=1.5,
+                            fission_macroscopic_cross_section=0.)
+        fa.set_component_material(rod, absorber)
+        k_warm, mode_warm = model.k_effective()
+        k_cold, mode_cold = model.k_effective(warm_start=False)
+        assert k_warm < k
+        assert abs(k_warm - k_cold) < 1e-8 and np.abs(mode_warm - mode_cold).max() < 1e-6
+        assert mode_warm.min() > 0
+
+        # a material set on the rod directly is picked up as well, back to the homogeneous medium
+        rod.set_material(material)
+        k_restored, mode_restored = model.k_effective()
+        assert abs(k_restored - k) < 1e-8 and np.abs(mode_restored - 1).max() < 1e-6
+
+        rod.set_material(absorber)
+        assert abs(model.k_effective()[0] - k_cold) < 1e-8
@@ -0,0 +1,64 @@
+import numpy as np
+from unittest import TestCase
+from modeling.structured_fem_model import StructuredHeatExchangerModel
+from modeling.time_integration import BackwardEuler, CrankNicolson, BDF2, ThetaMethod
+from modeling.test.test_structured_fem_model import heat_exchanger_assembly
+
+
+def final_state(time_integration, dt, t_final=0.8):
+    model = StructuredHeatExchangerModel(heat_exchanger_assembly(), dt, nx=6, ny=6, time_integration=time_integration)
+    model.apply_actuation([-1000.])
+    return model.simulate(int(round(t_final / dt)))[:, -1]
+
+
+class TestTimeIntegration(TestCase):
+    def test_convergence_order(self):
+        for scheme, order in [(BackwardEuler(), 1), (CrankNicolson(), 2), (BDF2(), 2)]:
+            x = [final_state(scheme, dt) for dt in [0.02, 0.01, 0.005]]
+            rate = np.log2(np.linalg.norm(x[0] - x[1]) / np.linalg.norm(x[1] - x[2]))
+            assert abs(rate - order) < 0.25, '{} converges with order {}'.format(type(scheme).__name__, rate)
+
+    def test_state_transition_model(self):
+        for scheme in [ThetaMethod(0.7), BDF2()]:
+            model = StructuredHeatExchangerModel(heat_exchanger_assembly(), 0.05, nx=4, ny=4, time_integration=scheme)
+            A, B, f = model.state_transition_model()
+            A_operator, B_operator, f_solved = model.state_transition_model(sparse=True)
+            nx = model.get_number_of_states()
+            assert A.shape == (scheme.history * nx, scheme.history * nx)
+
+            u = np.array([-1000.])
+            model.apply_actuation(u)
+            X = model.simulate(4)
+
+            x = np.full((nx,), 500.)
+            if scheme.history > 1:  # the first step of the multistep scheme is its startup step
+                x = np.concatenate([X[:, 0], x])
+            for i in range(4 - (scheme.history - 1)):
+                x_sparse = A_operator @ x + B_operator @ u + f_solved
+                x = A @ x + B @ u + f
+                assert np.linalg.norm(x - x_sparse) / np.linalg.norm(x) < 1e-10
+            assert np.linalg.norm(x[:nx] - X[:, -1]) / np.linalg.norm(x) < 1e-10
+
+    def test_simulate_ensemble(self):
+        model = StructuredHeatExchangerModel(heat_exchanger_assembly(), 0.05, nx=4, ny=4, time_integration=BDF2())
+        model.apply_actuation([-1000.])
+        nx = model.get_number_of_states()
+
+        X = model.simulate_ensemble(np.full((nx, 2), 500.), 3, u_sequences=np.full((1, 2, 3), -1000.))
+        x = model.simulate(3)
+        assert np.linalg.norm(X[:, 0, :] - x) / np.linalg.norm(x) < 1e-10
+        assert np.linalg.norm(X[:, 1, :] - x) / np.linalg.norm(x) < 1e-10
+
+    def test_factorization_reuse(self):
+        model = StructuredHeatExchangerModel(heat_exchanger_assembly(), 0.05, nx=4, ny=4,
+                                             time_integration=CrankNicolson())
+        model.step_time()
+        factorization = model._lhs_factorization
+
+        model.set_dt(0.1)
+        model.step_time()
+        assert model._lhs_factorization is not factorization
+
+        model.set_dt(0.05)
+        model.step_time()
+        assert model._lhs_factorization is factorization
@@ -0,0 +1,114 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from scipy.sparse import bmat, identity, issparse, vstack
+
+
+class TimeIntegrationScheme(ABC):
+    """
+    Time integration scheme of the semi-discrete model C x' = -L x + B u + f, written in terms of the backward Euler
+    operators M = C / dt + L and K = C / dt of M x(n+1) = K x(n) + B u(n) + f that every FEMModel assembles. A scheme
+    solves lhs(M, K) x(n+1) = K x(n) + B u(n) + f + sum_j D_j x(n-j), D_j being rhs_corrections(M, K).
+    """
+
+    # number of states x(n), x(n-1), ... a step depends on
+    history = 1
+
+    @abstractmethod
+    def lhs(self, M, K):
+        """ :return: sparse left-hand side matrix """
+        pass
+
+    @abstractmethod
+    def rhs_corrections(self, M, K):
+        """ :return: list of sparse D_j added to the backward Euler right-hand side as D_j x(n-j), j = 0, 1, ... """
+        pass
+
+    @abstractmethod
+    def signature(self):
+        """ :return: hashable signature of the scheme, the left-hand side factorization is cached per signature """
+        pass
+
+    def startup_scheme(self):
+        """ :return: scheme of the first history - 1 steps, before enough past states are known """
+        return self
+
+    def state_space_operators(self, M, K, B, f):
+        """
+        :param M, K, B, f: backward Euler operators of M x(n+1) = K x(n) + B u(n) + f
+        :return: M, K, B, f of the scheme as a one step model on the augmented state [x(n); x(n-1); ...] if
+        history > 1
+        """
+        lhs = self.lhs(M, K)
+        corrections = self.rhs_corrections(M, K)
+        history_operators = [K] + [None] * (self.history - 1)
+        for j, correction in enumerate(corrections):
+            history_operators[j] = correction if history_operators[j] is None else history_operators[j] + correction
+        if self.history == 1:
+            return lhs, history_operators[0], B, f
+
+        nx = M.shape[0]
+        shift = identity(nx * (self.history - 1), format='csr')
+        M_augmented = bmat([[lhs, None], [None, shift]], format='csr')
+        K_augmented = bmat([history_operators, [shift, None]], format='csr')
+        B_augmented = vstack([B, np.zeros((shift.shape[0], B.shape[1]))], format='csr') if issparse(B) \
+            else np.vstack([B, np.zeros((shift.shape[0], B.shape[1]))])
+        f_augmented = np.concatenate([f, np.zeros((shift.shape[0],))])
+        return M_augmented, K_augmented, B_augmented, f_augmented
+
+
+class ThetaMethod(TimeIntegrationScheme):
+    def __init__(self, theta):
+        """
+        Theta-method C (x(n+1) - x(n)) / dt = -L (theta x(n+1) + (1 - theta) x(n)) + B u(n) + f
+        :param theta: implicitness in [0, 1], 1 is backward Euler and 1 / 2 is Crank-Nicolson
+        """
+
+        """ Check Constructor Inputs """
+        assert (isinstance(theta, float) or isinstance(theta, int)) and 0 <= theta <= 1, 'theta must be in [0, 1]'
+
+        self.theta = theta
+
+    def lhs(self, M, K):
+        if self.theta == 1:
+            return M
+        return self.theta * M + (1 - self.theta) * K
+
+    def rhs_corrections(self, M, K):
+        if self.theta == 1:
+            return []
+        return [(self.theta - 1) * (M - K)]
+
+    def signature(self):
+        return 'theta', self.theta
+
+
+class BackwardEuler(ThetaMethod):
+    def __init__(self):
+        """ first order implicit Euler, the scheme FEMModel assembles its operators for """
+        super().__init__(1)
+
+
+class CrankNicolson(ThetaMethod):
+    def __init__(self):
+        """ second order trapezoidal rule """
+        super().__init__(0.5)
+
+
+class BDF2(TimeIntegrationScheme):
+    """
+    Second order backward differentiation formula C (3 x(n+1) - 4 x(n) + x(n-1)) / (2 dt) = -L x(n+1) + B u(n) + f,
+    started with one backward Euler step
+    """
+    history = 2
+
+    def lhs(self, M, K):
+        return M + 0.5 * K
+
+    def rhs_corrections(self, M, K):
+        return [K, -0.5 * K]
+
+    def signature(self):
+        return 'bdf', 2
+
+    def startup_scheme(self):
+        return BackwardEuler()
@@ -1,6 +1,26 @@
-from .balanced_truncation import BalancedTruncation
-from .buithanh import BuiThanh
-from .carlberg import Carlberg
-from .gradient_descent_weighted_pod_model_reduction import GradientDescentWeightedPODModelReduction
-from .md_model_reduction import MDModelReduction
-from .pod_model_reduction import PODModelReduction
+from importlib import import_module
+
+# model reductions are imported on first access, so importing reduction does not load TensorFlow or matlab.engine
+_reduction_modules = {
+    'BalancedTruncation': '.balanced_truncation',
+    'BuiThanh': '.buithanh',
+    'Carlberg': '.carlberg',
+    'GradientDescentWeightedPODModelReduction': '.gradient_descent_weighted_pod_model_reduction',
+    'MDModelReduction': '.md_model_reduction',
+    'PODModelReduction': '.pod_model_reduction',
+    'SnapshotStore': '.snapshot_store',
+}
+
+__all__ = list(_reduction_modules)
+
+
+def __getattr__(name):
+    if name in _reduction_modules:
+        value = getattr(import_module(_reduction_modules[name], __name__), name)
+        globals()[name] = value  # later accesses skip __getattr__
+        return value
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
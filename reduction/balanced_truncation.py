@@ -1,5 +1,4 @@
 import numpy as np
-import matlab.engine
 from reduction.model_reduction import ModelReduction
 
 
@@ -35,6 +34,8 @@ class BalancedTruncation(ModelReduction):
         super().__init__()
 
     def compute_reduction_bases(self):
+        import matlab.engine
+
         source_file_directory = \
             '/Users/jasonanderson/OneDrive - Leland Stanford Junior University/coursework/JA_AA290/joe_source'
 
@@ -1,6 +1,6 @@
 import numpy as np
-import matlab.engine
 from os.path import dirname
+from scipy.sparse import identity, issparse
 from reduction.model_reduction import ModelReduction
 
 
@@ -13,7 +13,7 @@ class BuiThanh(ModelReduction):
         :param f: Affine Term
         :param U: Snapshots
         :param m: Number of DOFs for ROM
-        :param C: state to output matrix
+        :param C: state to output matrix, dense or scipy sparse, identity if None
         :param beta: regularization parameter
         """
 
@@ -21,7 +21,7 @@ class BuiThanh(ModelReduction):
         self.ns = U.shape[1]
 
         if C is None:
-            C = np.eye(self.nx)
+            C = identity(self.nx, format='csr')
 
         """ Check Constructor Inputs """
         assert type(M) is np.ndarray, 'M must be a numpy array'
@@ -29,7 +29,7 @@ class BuiThanh(ModelReduction):
         assert type(f) is np.ndarray, 'f must be a numpy array'
         assert type(U) is np.ndarray, 'U must be a numpy array'
         assert isinstance(m, int), 'requested basis rank m must be int > 0'
-        assert type(C) is np.ndarray, 'C must be a numpy array'
+        assert type(C) is np.ndarray or issparse(C), 'C must be a numpy array or scipy sparse matrix'
         assert isinstance(beta, int) or isinstance(beta, float), 'regularization beta must be int or float'
 
         assert M.shape == (self.nx, self.nx), 'M must have shape (nx, nx)'
@@ -59,6 +59,8 @@ class BuiThanh(ModelReduction):
         super().__init__()
 
     def compute_reduction_basis(self):
+        import matlab.engine
+
         current_file_directory = dirname(__file__)
         yalmip_directory = '/Users/jasonanderson/Non-Cloud Documents/YALMIP-master'
 
@@ -72,7 +74,15 @@ class BuiThanh(ModelReduction):
         eng.workspace['f'] = matlab.double(self.f.reshape((self.nx, 1)).tolist())
         eng.workspace['U'] = matlab.double(self.U.tolist())
         eng.workspace['m'] = matlab.double([self.m])
-        eng.workspace['C'] = matlab.double(self.C.tolist())
+        if issparse(self.C):
+            # build C as a MATLAB sparse matrix from its triplets instead of sending the dense matrix
+            C = self.C.tocoo()
+            eng.workspace['Ci'] = matlab.double((C.row + 1).tolist())
+            eng.workspace['Cj'] = matlab.double((C.col + 1).tolist())
+            eng.workspace['Cv'] = matlab.double(C.data.tolist())
+            eng.eval('C = sparse(Ci, Cj, Cv, {0}, {1});'.format(*C.shape), nargout=0)
+        else:
+            eng.workspace['C'] = matlab.double(self.C.tolist())
         eng.workspace['beta'] = matlab.double([self.beta])
 
         V = np.array(eng.eval('buithanh(M,K,f,U,m,C,beta)'))
@@ -1,11 +1,25 @@
 import numpy as np
 from scipy.linalg import eigh, sqrtm
+from scipy.sparse import issparse
 from reduction.weighted_pod_model_reduction import WeightedPODModelReduction
+from reduction.snapshot_store import SnapshotStore
 
 
 class Carlberg(WeightedPODModelReduction):
 
     def compute_reduction_basis(self):
+        if isinstance(self.X, SnapshotStore) or issparse(self.C_full):
+            # keep Theta in its factored form C^T C: the right singular vectors of sqrt(Theta) X are those of C X, so
+            # V follows from the chunked Gram matrix (C X)^T (C X) or the SVD of C X, and C is never densified
+            if isinstance(self.X, SnapshotStore):
+                self.V = self.X.compute_left_singular_vectors(self.r, self.C_full)[0]
+            else:
+                U, S, ZT = self.compute_truncated_svd(self.C_full @ self.X, self.r, compute_full=True)
+                self.V = self.X @ np.divide(ZT.T, S)
+            CV = self.C_full @ self.V
+            self.W = self.C_full.T @ CV @ np.linalg.inv(CV.T @ CV)
+            return
+
         Theta = self.C_full.T @ self.C_full
         Sigma_squared, V = eigh(Theta)
         #Sigma_squared = np.maximum(Sigma_squared, 1e-10)
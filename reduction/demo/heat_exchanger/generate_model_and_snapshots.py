@@ -7,6 +7,8 @@ from assembly_construction.component import UnshapedComponent
 from assembly_construction.rod import Rod
 from assembly_construction.material import Material
 from modeling.temperature_fem_model import HeatExchangerFEMModel
+from modeling.operator_cache import OperatorCache
+from reduction.snapshot_store import SnapshotStore
 
 if __name__ == "__main__":
 
@@ -53,7 +55,7 @@ if __name__ == "__main__":
         fa.add_component(rod, component_set='controllable_q_dot')
 
     dt = 1  # works with dt = 1!!!!!
-    model = HeatExchangerFEMModel(fa, dt, nx=15, ny=15)
+    model = HeatExchangerFEMModel(fa, dt, nx=15, ny=15, operator_cache=OperatorCache('operator_cache'))
 
     fa.plot()
     plt.savefig('Fuel_Assembly.png')
@@ -69,13 +71,17 @@ if __name__ == "__main__":
     controller = TrackingAffineDLQR(A, B, f, 10, xbar=500 * np.ones((nx,)))
     C = controller.F[:, :nx] + controller.F[:, nx:-1]
 
-    X = np.zeros((nx, ns))
-    X[:, 0] = 700 * np.ones((nx,))
-
     U = -300 * np.ones((B.shape[1], ns - 1))
 
+    snapshots = SnapshotStore('snapshots_heat_exchanger_model', nx=nx,
+                              metadata={'dt': dt, 'mesh': [15, 15], 'U': U.tolist()})
+    x = 700 * np.ones((nx,))
+    snapshots.append(x)
     for i in range(1, ns):
-        X[:, i] = A @ X[:, i - 1] + B @ U[:, i - 1] + f
+        x = A @ x + B @ U[:, i - 1] + f
+        snapshots.append(x)
+    snapshots.flush()
 
     savemat('heat_exchanger_model.mat', {'A': A, 'B': B, 'f': f, 'C': C})
-    savemat('snapshots_heat_exchanger_model.mat', {'X': X, 'U': U})
+    # MAT copy of the snapshots for the MATLAB scripts
+    savemat('snapshots_heat_exchanger_model.mat', {'X': snapshots.to_array(), 'U': U})
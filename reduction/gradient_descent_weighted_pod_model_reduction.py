@@ -1,19 +1,23 @@
-import tensorflow as tf
+import numpy as np
+from scipy.sparse import issparse
 from reduction.weighted_pod_model_reduction import WeightedPODModelReduction
+from reduction.snapshot_store import SnapshotStore
 
 
 class GradientDescentWeightedPODModelReduction(WeightedPODModelReduction):
     def __init__(self, X, r, C_full, ridge_regularization=1, iteration_count=100):
         """
          Constructor for weighted POD model reduction
-         :param X: snapshot matrix
+         :param X: snapshot matrix, which the descent holds in memory as a tensor, so not a SnapshotStore
          :param r: desired rank
-         :param C_full: state to output matrix of full order model
+         :param C_full: state to output matrix of full order model, dense or scipy sparse
          :param ridge_regularization: ridge regression regularization term scalar
          :param iteration_count: number of descent iterations
          """
 
         """ Check constructor inputs """
+        assert not isinstance(X, SnapshotStore), \
+            'snapshot matrix X must be a numpy array, load a SnapshotStore with to_array() if it fits in memory'
         assert isinstance(ridge_regularization, int) or isinstance(ridge_regularization, float), \
             "ridge_regularization must be an int or float"
         assert isinstance(iteration_count, int), "iteration_count must be an int"
@@ -36,12 +40,29 @@ class GradientDescentWeightedPODModelReduction(WeightedPODModelReduction):
         Problem.
         """
 
+        import tensorflow as tf
+
         super().compute_reduction_basis()  # compute vanilla POD basis and assign to self.V
         V = tf.Variable(self.V, name='V', dtype=tf.float32)  # let V starting point be vanilla POD basis
         # V = tf.Variable(np.random.normal(size=(self.nx, self.r)), name='V', dtype=tf.float32)
 
         X = tf.convert_to_tensor(self.X, dtype=tf.float32)
 
+        # C (I - V V^T) X evaluated as C X - (C V) (V^T X), without forming the (nx, nx) projector or densifying C
+        CX = tf.convert_to_tensor(self.C_full @ self.X, dtype=tf.float32)
+        if issparse(self.C_full):
+            C = self.C_full.tocoo()
+            C = tf.sparse.reorder(tf.sparse.SparseTensor(np.column_stack([C.row, C.col]), C.data.astype(np.float32),
+                                                         C.shape))
+
+            def output(Y):
+                return tf.sparse.sparse_dense_matmul(C, Y)
+        else:
+            C = tf.convert_to_tensor(self.C_full, dtype=tf.float32)
+
+            def output(Y):
+                return C @ Y
+
         """ compute cost function normalization constants nx, ny, r, and ns """
         (ny, nx1) = self.C_full.shape
         (nx2, r) = V.shape
@@ -54,7 +75,7 @@ class GradientDescentWeightedPODModelReduction(WeightedPODModelReduction):
         def loss():
             """ Weighted SVD loss function with ridge regularization,
             normalized by the number of elements within the norm """
-            Q = self.C_full @ (tf.eye(self.nx) - V @ tf.transpose(V)) @ X
+            Q = CX - output(V) @ (tf.transpose(V) @ X)
             return tf.norm(Q) / (ny * ns) + self.ridge_regularization * tf.norm(V) / (nx * r)
 
         for i in range(self.iteration_count):
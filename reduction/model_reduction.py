@@ -1,6 +1,5 @@
 import numpy as np
 from numpy.linalg import svd
-from sklearn.decomposition import TruncatedSVD
 from abc import abstractmethod
 from scipy.io import savemat
 from os.path import join
@@ -72,6 +71,7 @@ class ModelReduction(object):
             S = S[:r]
             ZT = ZT[:r, :]
         elif r < X.shape[1]:
+            from sklearn.decomposition import TruncatedSVD
             truncated_svd = TruncatedSVD(n_components=r)
             US = truncated_svd.fit_transform(X)
             U = US / truncated_svd.singular_values_
@@ -89,6 +89,7 @@ class ModelReduction(object):
         if r == X.shape[1]:
             U, S, ZT = svd(X)
         elif r < X.shape[1]:
+            from sklearn.decomposition import TruncatedSVD
             truncated_svd = TruncatedSVD(n_components=r)
             US = truncated_svd.fit_transform(X)
             U = US / truncated_svd.singular_values_
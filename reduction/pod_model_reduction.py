@@ -1,5 +1,6 @@
 import numpy as np
 from reduction.model_reduction import ModelReduction
+from reduction.snapshot_store import SnapshotStore
 
 
 class PODModelReduction(ModelReduction):
@@ -7,12 +8,13 @@ class PODModelReduction(ModelReduction):
     def __init__(self, X, r):
         """
         Computes vanilla POD model reduction basis of rank r with input snapshot matrix X
-        :param X: snapshot matrix
+        :param X: snapshot matrix, or SnapshotStore read lazily chunk by chunk
         :param r: desired rank
         """
 
         """ Check constructor inputs """
-        assert type(X) is np.ndarray, 'snapshot matrix X must be a numpy array'
+        assert type(X) is np.ndarray or isinstance(X, SnapshotStore), \
+            'snapshot matrix X must be a numpy array or SnapshotStore'
         assert isinstance(r, int), "desired rank r must be an int"
 
         self.X = X
@@ -25,7 +27,10 @@ class PODModelReduction(ModelReduction):
 
     def compute_reduction_basis(self):
         """ Computes reduction basis from the left singular vectors of snapshot matrix """
-        self.V = self.compute_svd_left_singular_vectors(self.X, self.r)
+        if isinstance(self.X, SnapshotStore):
+            self.V = self.X.compute_left_singular_vectors(self.r)[0]
+        else:
+            self.V = self.compute_svd_left_singular_vectors(self.X, self.r)
         self.W = self.V
 
     def __str__(self):
@@ -0,0 +1,134 @@
+import json
+import numpy as np
+from os import makedirs
+from os.path import join, isfile
+
+
+class SnapshotStore(object):
+    def __init__(self, directory, nx=None, chunk_size=256, metadata=None):
+        """
+        Chunked on-disk snapshot matrix X of shape (nx, ns), appended column by column and read lazily one chunk at a
+        time through numpy memmaps, so snapshot runs are not capped by memory
+        :param directory: store directory, an existing store is opened for reading and appending
+        :param nx: number of states, required to create a new store
+        :param chunk_size: number of snapshot columns per .npy chunk file
+        :param metadata: json serializable dict describing the snapshots, e.g. dt, mesh size and actuation
+        """
+        self.directory = directory
+        self._chunk = None  # memmap of the chunk currently appended to
+        self._chunk_index = None
+
+        if isfile(join(directory, 'metadata.json')):
+            with open(join(directory, 'metadata.json')) as file:
+                header = json.load(file)
+            assert nx is None or nx == header['nx'], 'nx does not match existing store'
+            self.nx = header['nx']
+            self.ns = header['ns']
+            self.chunk_size = header['chunk_size']
+            self.metadata = header['metadata']
+            if metadata is not None:
+                self.metadata.update(metadata)
+        else:
+            """ Check Constructor Inputs """
+            assert isinstance(nx, int) and nx > 0, 'nx must be int > 0 to create a new store'
+            assert isinstance(chunk_size, int) and chunk_size > 0, 'chunk_size must be int > 0'
+
+            makedirs(directory, exist_ok=True)
+            self.nx = nx
+            self.ns = 0
+            self.chunk_size = chunk_size
+            self.metadata = {} if metadata is None else dict(metadata)
+            self.flush()
+
+    @property
+    def shape(self):
+        return self.nx, self.ns
+
+    def _chunk_path(self, chunk_index):
+        return join(self.directory, 'chunk_{0:06d}.npy'.format(chunk_index))
+
+    def _open_chunk(self, chunk_index, mode='r'):
+        """ :return: memmap of the (nx, chunk_size) chunk, stored column major so appending a column is contiguous """
+        path = self._chunk_path(chunk_index)
+        if mode == 'w+':
+            if isfile(path):
+                return np.load(path, mmap_mode='r+')
+            return np.lib.format.open_memmap(path, mode='w+', shape=(self.nx, self.chunk_size), fortran_order=True)
+        return np.load(path, mmap_mode=mode)
+
+    def append(self, x):
+        """ Appends snapshot column x of shape (nx,) """
+        chunk_index, column = divmod(self.ns, self.chunk_size)
+        if self._chunk_index != chunk_index:
+            if self._chunk is not None:
+                self._chunk.flush()
+            self._chunk = self._open_chunk(chunk_index, mode='w+' if column == 0 else 'r+')
+            self._chunk_index = chunk_index
+
+        self._chunk[:, column] = x
+        self.ns += 1
+
+    def append_columns(self, X):
+        """ Appends all columns of X of shape (nx, k) """
+        for column in range(X.shape[1]):
+            self.append(X[:, column])
+
+    def flush(self):
+        """ Writes the appended columns and metadata to disk """
+        if self._chunk is not None:
+            self._chunk.flush()
+        with open(join(self.directory, 'metadata.json'), 'w') as file:
+            json.dump({'nx': self.nx, 'ns': self.ns, 'chunk_size': self.chunk_size, 'metadata': self.metadata}, file)
+
+    def iter_chunks(self):
+        """ Yields (first column, read-only memmap of the columns) of each chunk """
+        self.flush()
+        for chunk_index in range((self.ns + self.chunk_size - 1) // self.chunk_size):
+            first_column = chunk_index * self.chunk_size
+            yield first_column, self._open_chunk(chunk_index)[:, :min(self.chunk_size, self.ns - first_column)]
+
+    def to_array(self):
+        """ :return: full (nx, ns) snapshot matrix in memory """
+        X = np.empty(self.shape)
+        for first_column, chunk in self.iter_chunks():
+            X[:, first_column:first_column + chunk.shape[1]] = chunk
+        return X
+
+    def gram(self, C=None):
+        """
+        :param C: optional state to output matrix, dense or sparse
+        :return: (ns, ns) Gram matrix (C X)^T (C X) computed chunk pair by chunk pair
+        """
+        G = np.empty((self.ns, self.ns))
+        chunks = list(self.iter_chunks())
+        for i, (first_column_i, chunk_i) in enumerate(chunks):
+            Y_i = chunk_i if C is None else C @ chunk_i
+            columns_i = slice(first_column_i, first_column_i + chunk_i.shape[1])
+            for first_column_j, chunk_j in chunks[:i + 1]:
+                Y_j = chunk_j if C is None else C @ chunk_j
+                columns_j = slice(first_column_j, first_column_j + chunk_j.shape[1])
+                G[columns_i, columns_j] = Y_i.T @ Y_j
+                G[columns_j, columns_i] = G[columns_i, columns_j].T
+        return G
+
+    def right_multiply(self, Z):
+        """ :return: X @ Z accumulated chunk by chunk for Z of shape (ns, k) """
+        XZ = np.zeros((self.nx, Z.shape[1]))
+        for first_column, chunk in self.iter_chunks():
+            XZ += chunk @ Z[first_column:first_column + chunk.shape[1]]
+        return XZ
+
+    def compute_left_singular_vectors(self, r, C=None):
+        """
+        Method of snapshots: left singular vectors of C X mapped back to the state as X Z S^-1, from the eigen
+        decomposition of the (ns, ns) Gram matrix, so X is never loaded whole
+        :param r: number of singular vectors
+        :param C: optional state to output matrix weighting the decomposition
+        :return: (nx, r) matrix X Z S^-1 and the r singular values S
+        """
+        assert isinstance(r, int) and 0 < r <= self.ns, 'r must be int in (0, ns]'
+        Sigma_squared, Z = np.linalg.eigh(self.gram(C))
+        Sigma_squared = Sigma_squared[::-1][:r]
+        Z = Z[:, ::-1][:, :r]
+        S = np.sqrt(np.maximum(Sigma_squared, 0))
+        return self.right_multiply(Z / S), S
@@ -1,4 +1,5 @@
 import numpy as np
+from scipy.sparse import csr_matrix
 from sklearn.decomposition import TruncatedSVD
 from reduction.carlberg import Carlberg
 from reduction.test.utils import assert_left_singular_vectors_equal
@@ -72,3 +73,16 @@ class TestWeightedPODModelReduction(TestCase):
         orthogonal_error(X, C, V2, V2)
 
         assert np.linalg.norm(np.abs(np.divide(V1, V2)) - np.ones(V1.shape)) < 1e-10
+
+    def test_sparse_output_operator(self):
+        nx = 40
+        r = 3
+        X = np.random.random((nx, 12))
+        C = csr_matrix(2 * np.eye(nx)[[1, 5, 9, 20, 33]])
+
+        dense = Carlberg(X, r, C.toarray())
+        sparse = Carlberg(X, r, C)
+
+        assert isinstance(sparse.W, np.ndarray)
+        assert np.linalg.norm(sparse.W.T @ sparse.V - np.eye(r)) < 1e-8
+        assert np.linalg.norm(sparse.V @ sparse.W.T - dense.V @ dense.W.T) < 1e-8
@@ -1,6 +1,8 @@
 import numpy as np
+from tempfile import TemporaryDirectory
 from sklearn.decomposition import TruncatedSVD
 from reduction.gradient_descent_weighted_pod_model_reduction import GradientDescentWeightedPODModelReduction
+from reduction.snapshot_store import SnapshotStore
 from reduction.test.utils import assert_left_singular_vectors_equal
 from unittest import TestCase
 
@@ -49,3 +51,11 @@ class TestGradientDescentWeightedPODModelReduction(TestCase):
         r = GradientDescentWeightedPODModelReduction(X, r, np.eye(nx))
 
         assert_left_singular_vectors_equal(r.V, U, tol=1e-2)
+
+    def test_snapshot_store_rejected(self):
+        with TemporaryDirectory() as directory:
+            store = SnapshotStore(directory, nx=2, chunk_size=2)
+            store.append_columns(np.array([[3., 2, 2], [2, 3, -2]]))
+
+            with self.assertRaises(AssertionError):
+                GradientDescentWeightedPODModelReduction(store, 1, np.eye(2))
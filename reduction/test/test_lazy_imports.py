@@ -0,0 +1,20 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class TestLazyImports(TestCase):
+    def test_no_heavy_backend_at_import(self):
+        code = 'import sys\n' \
+               'import reduction, controllers.dlqr, controllers.heat_exchanger_mpc_controller, modeling.fem_model\n' \
+               'from reduction import PODModelReduction, Carlberg, BalancedTruncation, BuiThanh\n' \
+               'from reduction import GradientDescentWeightedPODModelReduction\n' \
+               'print(",".join(m for m in ["fenics", "dolfin", "matplotlib", "cvxpy", "tensorflow", "matlab", ' \
+               '"sklearn"] if m in sys.modules))'
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == '', 'eagerly imported ' + result.stdout.strip()
+
+    def test_unknown_attribute(self):
+        import reduction
+        with self.assertRaises(AttributeError):
+            reduction.NotAModelReduction
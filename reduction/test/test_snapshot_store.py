@@ -0,0 +1,65 @@
+import numpy as np
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from reduction.snapshot_store import SnapshotStore
+from reduction.pod_model_reduction import PODModelReduction
+from reduction.carlberg import Carlberg
+from reduction.test.utils import assert_left_singular_vectors_equal
+
+
+class TestSnapshotStore(TestCase):
+    def test_append_and_reopen(self):
+        X = np.random.random((7, 11))
+
+        with TemporaryDirectory() as directory:
+            store = SnapshotStore(directory, nx=7, chunk_size=3, metadata={'dt': 1})
+            for i in range(5):
+                store.append(X[:, i])
+            store.flush()
+
+            store = SnapshotStore(directory)
+            store.append_columns(X[:, 5:])
+
+            assert (7, 11) == store.shape
+            assert {'dt': 1} == store.metadata
+            assert np.array_equal(X, store.to_array())
+
+    def test_gram_and_right_multiply(self):
+        X = np.random.random((7, 11))
+        C = np.random.random((2, 7))
+        Z = np.random.random((11, 4))
+
+        with TemporaryDirectory() as directory:
+            store = SnapshotStore(directory, nx=7, chunk_size=4)
+            store.append_columns(X)
+
+            assert np.linalg.norm(store.gram() - X.T @ X) < 1e-10
+            assert np.linalg.norm(store.gram(C) - (C @ X).T @ (C @ X)) < 1e-10
+            assert np.linalg.norm(store.right_multiply(Z) - X @ Z) < 1e-10
+
+    def test_pod_from_store(self):
+        X = np.random.random((50, 20))
+        r = 5
+        U, S, ZT = np.linalg.svd(X)
+
+        with TemporaryDirectory() as directory:
+            store = SnapshotStore(directory, nx=50, chunk_size=6)
+            store.append_columns(X)
+
+            assert_left_singular_vectors_equal(PODModelReduction(store, r).V, U[:, :r], tol=1e-6)
+
+    def test_carlberg_from_store(self):
+        X = np.random.random((50, 20))
+        C = np.random.random((3, 50))
+        r = 3
+
+        with TemporaryDirectory() as directory:
+            store = SnapshotStore(directory, nx=50, chunk_size=6)
+            store.append_columns(X)
+
+            reduction = Carlberg(store, r, C)
+
+        assert np.linalg.norm(reduction.W.T @ reduction.V - np.eye(r)) < 1e-8
+        U, S, ZT = np.linalg.svd(C @ X)
+        assert_left_singular_vectors_equal(C @ reduction.V / np.linalg.norm(C @ reduction.V, axis=0), U[:, :r],
+                                           tol=1e-6)
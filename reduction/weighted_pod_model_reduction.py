@@ -1,5 +1,6 @@
 import numpy as np
 from abc import ABC
+from scipy.sparse import issparse
 from reduction.pod_model_reduction import PODModelReduction
 
 
@@ -8,14 +9,15 @@ class WeightedPODModelReduction(ABC, PODModelReduction):
     def __init__(self, X, r, C_full):
         """
         Constructor for weighted POD model reduction
-        :param X: snapshot matrix
+        :param X: snapshot matrix, or SnapshotStore read lazily chunk by chunk
         :param r: desired rank
-        :param C_full: state to output matrix of full order model
+        :param C_full: state to output matrix of full order model, dense or scipy sparse such as
+        FEMModel.output_operator
 
         """
 
         """ Check constructor inputs """
-        assert type(C_full) is np.ndarray
+        assert type(C_full) is np.ndarray or issparse(C_full), 'C_full must be a numpy array or scipy sparse matrix'
 
         self.C_full = C_full
 